@@ -0,0 +1,89 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+# Commands whose startup time is measured, by name
+COMMANDS = {
+  "cli_help": [sys.executable, "-m", "text_to_sql_package", "--help"],
+  "import_cli": [sys.executable, "-c", "import text_to_sql_package.cli"],
+  "import_text_to_sql": [sys.executable, "-c", "import text_to_sql_package.text_to_sql"],
+}
+
+# Modules that are slow to import and must not be imported by the CLI module itself
+HEAVY_MODULES = ["pandas", "pydantic", "litellm", "openpyxl", "pyarrow", "polars"]
+
+def time_command(command: List[str], runs: int) -> Dict:
+  """
+  Run a command several times and measure its wall time.
+
+  Parameters:
+  command (List[str]): Command and its arguments
+  runs (int): Number of runs
+
+  Returns:
+  Dict: Median, min and max wall time in seconds, or the error if the command failed
+  """
+
+  durations = []
+
+  for _ in range(runs):
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    durations.append(time.perf_counter() - start)
+
+    if process.returncode != 0:
+      return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}"}
+
+  return {"median": statistics.median(durations), "min": min(durations), "max": max(durations)}
+
+def heavy_modules_imported_by_cli() -> List[str]:
+  """
+  Get the heavy modules that are imported by importing the CLI module.
+
+  Returns:
+  List[str]: Names of the heavy modules in sys.modules after importing text_to_sql_package.cli
+  """
+
+  code = f"import sys, json, text_to_sql_package.cli; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+  process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+  return json.loads(process.stdout)
+
+def main() -> int:
+  """
+  Measure the startup time of the package, and fail if the CLI imports heavy modules or is slower than the budget.
+
+  Returns:
+  int: Exit code, 0 if within budget, 1 otherwise
+  """
+
+  parser = argparse.ArgumentParser(description="Measure the startup time of text_to_sql_package.")
+  parser.add_argument("--runs", type=int, default=5, help="Number of runs per command")
+  parser.add_argument("--max-cli-seconds", type=float, help="Fail if the median time of 'python -m text_to_sql_package --help' is above this")
+  args = parser.parse_args()
+
+  failed = False
+
+  for name, command in COMMANDS.items():
+    result = time_command(command=command, runs=args.runs)
+    if "error" in result:
+      print(f"{name:<20} failed: {result['error']}")
+      continue
+    print(f"{name:<20} median {result['median'] * 1000:7.1f} ms  (min {result['min'] * 1000:.1f} ms, max {result['max'] * 1000:.1f} ms)")
+
+    if name == "cli_help" and args.max_cli_seconds and result["median"] > args.max_cli_seconds:
+      print(f"CLI startup is above the budget of {args.max_cli_seconds * 1000:.0f} ms.")
+      failed = True
+
+  heavy_modules = heavy_modules_imported_by_cli()
+  if heavy_modules:
+    print(f"The CLI module imports heavy modules at startup: {', '.join(heavy_modules)}.")
+    failed = True
+
+  return 1 if failed else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,7 +1,4 @@
-from text_to_sql_package.data_loaders.data_loader import DataLoader 
-from text_to_sql_package.data_loaders.csv_loader import CSVLoader 
-from text_to_sql_package.data_loaders.tsv_loader import TSVLoader 
-from text_to_sql_package.data_loaders.excel_loader import ExcelLoader 
+from text_to_sql_package.data_loaders.data_loader_registry import DataLoaderRegistry 
 from text_to_sql_package.llm_providers.litellm_provider import LiteLLMProvider 
 from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector 
 from text_to_sql_package.data_validators.pydantic_validator import PydanticValidator 
@@ -15,25 +12,6 @@ path = "examples/sample_data/"
 file_path = f"{path}family.csv"
 user_prompt = "Give me information on all female members of my family."
 
-def create_data_loader(file_path: str) -> DataLoader:
-  """
-  Create data loader depending on specified file type.
-  
-  Parameters:
-  file_path (str): File path for given dataset
-  
-  Returns:
-  DataLoader: Depending on file type CSVLoader, TSVLoader or ExcelLoader
-  """
-  if file_path.lower().endswith('.csv'):
-    return CSVLoader()
-  elif file_path.lower().endswith('.tsv'):
-    return TSVLoader()
-  elif file_path.lower().endswith(('.xlsx', '.xls')):
-    return ExcelLoader()
-  else:
-    raise ValueError(f"Specified file format not accepted. Only accepts .csv, .tsv, .xlsx and .xls")
-
 if __name__ == "__main__":
    
   try:
@@ -45,7 +23,7 @@ if __name__ == "__main__":
   
   try: 
     # Initialize the components 
-    data_loader = create_data_loader(file_path=file_path)
+    data_loader = DataLoaderRegistry()
     llm_provider = LiteLLMProvider(model_name=model_name)
     database_connector = SQLiteDatabaseConnector(db_path=f"{path}example.db")
     data_validator = PydanticValidator()
@@ -0,0 +1,35 @@
+from text_to_sql_package.data_loaders.data_loader_registry import DataLoaderRegistry
+from text_to_sql_package.llm_providers.litellm_provider import LiteLLMProvider
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.data_validators.pydantic_validator import PydanticValidator
+from text_to_sql_package.catalogs.sqlite_catalog import SQLiteCatalog
+from text_to_sql_package.text_to_sql import TextToSQL
+from text_to_sql_package.servers.query_server import QueryServer
+from dotenv import load_dotenv
+import os
+load_dotenv(override=True)
+
+path = "examples/sample_data/"
+
+def create_text_to_sql() -> TextToSQL:
+  """
+  Create a TextToSQL object for the query server. All objects share the same database and catalog, so each file is only loaded once.
+
+  Returns:
+  TextToSQL: TextToSQL object
+  """
+
+  return TextToSQL(
+    data_loader=DataLoaderRegistry(),
+    llm_provider=LiteLLMProvider(model_name=os.getenv('MODEL_NAME')),
+    database_connector=SQLiteDatabaseConnector(db_path=f"{path}server.db"),
+    data_validator=PydanticValidator(),
+    catalog=SQLiteCatalog(),
+  )
+
+if __name__ == "__main__":
+
+  # Query with:
+  # curl -X POST localhost:8000/query -d '{"file_path": "family.csv", "user_prompt": "Give me information on all female members of my family."}'
+  server = QueryServer(text_to_sql_factory=create_text_to_sql, port=8000, max_concurrency=4, data_dir=path)
+  server.serve_forever()
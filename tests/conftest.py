@@ -0,0 +1,39 @@
+import os
+import json
+import pytest
+from text_to_sql_package.text_to_sql import TextToSQL
+from text_to_sql_package.data_loaders.csv_loader import CSVLoader
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.data_validators.pydantic_validator import PydanticValidator
+
+# Sample dataset of the repository
+FAMILY_CSV = os.path.join(os.path.dirname(__file__), "..", "examples", "sample_data", "family.csv")
+
+class StubLLMProvider:
+
+  """LLMProvider that returns a fixed SQL query (with {table} replaced by the table name of the schema), and records its calls."""
+
+  def __init__(self, query: str = "SELECT * FROM {table}"):
+    self.query = query
+    self.calls = []
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> str:
+    self.calls.append(user_prompt)
+    return self.query.format(table=schema.split()[2])
+
+@pytest.fixture
+def db_path(tmp_path):
+  return str(tmp_path / "test.db")
+
+@pytest.fixture
+def make_text_to_sql(db_path):
+  """Create a TextToSQL object with a CSVLoader, a stub LLM and a SQLite database in a temporary folder."""
+
+  def make(llm_provider=None, **kwargs):
+    kwargs.setdefault("data_loader", CSVLoader())
+    return TextToSQL(llm_provider=llm_provider or StubLLMProvider(), database_connector=SQLiteDatabaseConnector(db_path=db_path), data_validator=PydanticValidator(), **kwargs)
+
+  return make
+
+def rows(result: str):
+  return json.loads(result)
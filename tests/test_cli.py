@@ -0,0 +1,31 @@
+import os
+import sys
+import json
+import subprocess
+from text_to_sql_package.cli import main
+from tests.conftest import FAMILY_CSV
+
+# Root of the repository, so the package can be imported by a subprocess
+REPO_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+def test_query_exits_with_zero(db_path, capsys):
+  assert main([FAMILY_CSV, "--local", "--db", db_path, "-p", "members whose gender is Female"]) == 0
+  assert len(json.loads(capsys.readouterr().out)) == 3
+
+def test_failed_query_exits_with_non_zero(db_path, capsys):
+  # Negations aren't handled by the rules, and there is no fallback provider
+  assert main([FAMILY_CSV, "--local", "--db", db_path, "-p", "people whose name is not Tulio"]) == 1
+  assert "Query failed" in capsys.readouterr().err
+
+def test_help_does_not_import_heavy_modules():
+  # A fresh interpreter, since other tests already imported them in this one
+  code = (
+    "import sys, contextlib, io\n"
+    "from text_to_sql_package.cli import main\n"
+    "with contextlib.suppress(SystemExit), contextlib.redirect_stdout(io.StringIO()):\n"
+    "  main(['--help'])\n"
+    "print(','.join(module for module in ('pandas', 'pydantic', 'litellm') if module in sys.modules))\n"
+  )
+  result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+
+  assert result.stdout.strip() == ""
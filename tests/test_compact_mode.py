@@ -0,0 +1,62 @@
+import sqlite3
+import pandas as pd
+import pytest
+from text_to_sql_package.data_loaders.data_loader_registry import DataLoaderRegistry
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector, create_table_statement, insert_dataframe
+from text_to_sql_package.utils.dataframe_utils import compact_dataframe, sql_type_for_dtype
+
+@pytest.fixture
+def payments_csv(tmp_path):
+  path = tmp_path / "payments.csv"
+  path.write_text("id,method,amount,paid,created_at\n1,card,1.5,true,2024-01-01 10:00:00\n2,card,,,2024-01-02 11:30:00\n3,cash,2.25,false,\n4,card,4,true,2024-01-04 09:15:00\n")
+  return str(path)
+
+@pytest.mark.parametrize("values", [[True, None, False], ["true", None, "false"], [" True", None, "FALSE "]])
+def test_true_false_columns_are_boolean(values):
+  df = compact_dataframe(pd.DataFrame({"paid": pd.Series(values, dtype=object)}))
+
+  assert df["paid"].dtype == "boolean"
+  assert sql_type_for_dtype(df["paid"].dtype) == "BOOLEAN"
+  assert df["paid"].tolist() == [True, pd.NA, False]
+
+def test_compact_data_types(payments_csv):
+  df = DataLoaderRegistry(compact=True).load_data(payments_csv)
+
+  assert {col: dtype.name for col, dtype in df.dtypes.items()} == {"id": "int8", "method": "category", "amount": "float32", "paid": "boolean", "created_at": "datetime64[us]"}
+
+def test_memory_report(payments_csv):
+  df = DataLoaderRegistry(compact=True).load_data(payments_csv)
+  report = df.attrs["memory_report"]
+
+  assert list(report) == list(df.columns)
+  assert report["id"] == {"dtype_before": "int64", "dtype_after": "int8", "bytes_before": 32, "bytes_after": 4}
+  assert all(usage["bytes_after"] <= usage["bytes_before"] for usage in report.values())
+
+def test_compact_dataframe_round_trip_into_sqlite(payments_csv, db_path):
+  df = DataLoaderRegistry(compact=True).load_data(payments_csv)
+
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    db.create_table_from_df(df=df, table_name="payments")
+    columns = {row["name"]: row["type"] for row in db.execute_sql_query('PRAGMA table_info("payments")')}
+    result = db.execute_sql_query('SELECT * FROM "payments" ORDER BY id')
+
+  assert columns == {"id": "INTEGER", "method": "TEXT", "amount": "REAL", "paid": "BOOLEAN", "created_at": "DATETIME"}
+  assert result == [
+    {"id": 1, "method": "card", "amount": 1.5, "paid": 1, "created_at": "2024-01-01 10:00:00"},
+    {"id": 2, "method": "card", "amount": None, "paid": None, "created_at": "2024-01-02 11:30:00"},
+    {"id": 3, "method": "cash", "amount": 2.25, "paid": 0, "created_at": None},
+    {"id": 4, "method": "card", "amount": 4.0, "paid": 1, "created_at": "2024-01-04 09:15:00"},
+  ]
+
+def test_insert_dataframe_in_chunks():
+  df = pd.DataFrame({
+    "city": pd.Series(["Paris", None, "Lima", "Paris", "Lima"], dtype="category"),
+    "age": pd.Series([30, None, 41, 25, None], dtype="Int8"),
+    "name": pd.Series(["a", "b", None, "d", "e"], dtype="string"),
+  })
+  connection = sqlite3.connect(":memory:")
+  connection.execute(create_table_statement(df=df, table_name="people"))
+
+  insert_dataframe(connection=connection, df=df, table_name="people", chunk_size=2)
+
+  assert connection.execute('SELECT * FROM "people" ORDER BY rowid').fetchall() == [("Paris", 30, "a"), (None, None, "b"), ("Lima", 41, None), ("Paris", 25, "d"), ("Lima", None, "e")]
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+from text_to_sql_package.data_loaders.data_loader_registry import DataLoaderRegistry
+from tests.conftest import FAMILY_CSV
+
+# Engines for delimited text, with the module they need
+ENGINES = [("pandas", "pandas"), ("pyarrow", "pyarrow"), ("polars", "polars")]
+
+def load_with(engine: str, file_path: str) -> pd.DataFrame:
+  return DataLoaderRegistry(engines={"delimited": [engine]}).load_data(file_path)
+
+def as_values(df: pd.DataFrame):
+  return {"dtypes": {col: dtype.kind for col, dtype in df.dtypes.items()}, "rows": df.astype(object).where(df.notna(), None).values.tolist()}
+
+@pytest.fixture
+def events_csv(tmp_path):
+  path = tmp_path / "events.csv"
+  path.write_text("id,name,created_at,amount\n1,a,2024-01-01 10:00:00,1.5\n2,,2024-01-02 11:30:00,\n3,c,,2\n")
+  return str(path)
+
+@pytest.mark.parametrize("engine, module", ENGINES)
+def test_engines_infer_the_same_data_types(engine, module, events_csv):
+  pytest.importorskip(module)
+
+  for file_path in (FAMILY_CSV, events_csv):
+    assert as_values(load_with(engine, file_path)) == as_values(load_with("pandas", file_path))
+
+def test_dates_stay_strings_and_timestamps_are_parsed(events_csv):
+  df = load_with("pandas", FAMILY_CSV)
+  assert df["date_of_birth"].tolist()[0] == "1996-06-09"
+
+  df = load_with("pandas", events_csv)
+  assert df["created_at"].dtype.kind == "M"
+  assert pd.isna(df["created_at"].iloc[2])
@@ -0,0 +1,24 @@
+import pandas as pd
+from text_to_sql_package.utils.dataframe_utils import detect_foreign_keys, generate_schema_from_dataframe, parse_schema
+
+def test_detect_foreign_keys_ignores_surrogate_keys():
+  orders = pd.DataFrame({"id": [1, 2, 3], "customer_id": [1, 2, 2]})
+  customers = pd.DataFrame({"id": [1, 2, 3]})
+
+  foreign_keys = detect_foreign_keys({"orders": orders, "customers": customers})
+
+  assert [(fk["table"], fk["column"], fk["ref_table"], fk["ref_column"]) for fk in foreign_keys] == [("orders", "customer_id", "customers", "id")]
+
+def test_detect_foreign_keys_matches_named_keys_only():
+  payments = pd.DataFrame({"paid": [1, 2], "account_id": [10, 20]})
+  invoices = pd.DataFrame({"paid": [1, 2], "account_id": [10, 20]})
+
+  foreign_keys = detect_foreign_keys({"payments": payments, "invoices": invoices})
+
+  assert {fk["column"] for fk in foreign_keys} == {"account_id"}
+
+def test_schema_quotes_identifiers():
+  schema = generate_schema_from_dataframe(df=pd.DataFrame({"group": [1], "name": ["a"]}), table_name="order")
+
+  assert schema == 'CREATE TABLE "order" ("group" INTEGER, "name" TEXT);'
+  assert parse_schema(schema) == {"order": {"group": "INTEGER", "name": "TEXT"}}
@@ -0,0 +1,89 @@
+from tests.conftest import FAMILY_CSV, rows
+
+def test_full_incremental_load_keeps_last_line_without_newline(make_text_to_sql):
+  normal = rows(make_text_to_sql().extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone"))
+  incremental = rows(make_text_to_sql(incremental=True).extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone"))
+
+  assert len(normal) == 5
+  assert incremental == normal
+
+def test_append_after_last_line_without_newline(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("a,b\n1,2")
+  text_to_sql = make_text_to_sql(incremental=True)
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": 1, "b": 2}]
+
+  with open(file_path, "a") as file:
+    file.write("\n3,4\n")
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": 1, "b": 2}, {"a": 3, "b": 4}]
+
+def test_continued_last_line_rebuilds_table(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("a,b\n1,2")
+  text_to_sql = make_text_to_sql(incremental=True)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")
+
+  # The last line was still being written
+  with open(file_path, "a") as file:
+    file.write("5\n3,4\n")
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": 1, "b": 25}, {"a": 3, "b": 4}]
+
+def test_partial_last_line_is_left_for_next_append(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("a,b\n1,2\n")
+  text_to_sql = make_text_to_sql(incremental=True)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")
+
+  with open(file_path, "a") as file:
+    file.write("3,4\n5")
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": 1, "b": 2}, {"a": 3, "b": 4}]
+
+  with open(file_path, "a") as file:
+    file.write(",6\n")
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": 1, "b": 2}, {"a": 3, "b": 4}, {"a": 5, "b": 6}]
+
+def test_full_rebuild_uses_data_loader(make_text_to_sql, tmp_path):
+  from text_to_sql_package.data_loaders.csv_loader import CSVLoader
+
+  class RecordingLoader(CSVLoader):
+    def __init__(self):
+      self.loaded = []
+
+    def load_data(self, file_path):
+      self.loaded.append(file_path)
+      return super().load_data(file_path)
+
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("a,b\n1,2\n")
+  loader = RecordingLoader()
+  make_text_to_sql(incremental=True, data_loader=loader).extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")
+
+  assert loader.loaded == [str(file_path)]
+
+def test_appended_rows_keep_data_types_of_table(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("code,amount,paid\nA1,1.5,true\n")
+  text_to_sql = make_text_to_sql(incremental=True)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")
+
+  # A chunk of digits only in a text column, and a blank amount
+  with open(file_path, "a") as file:
+    file.write("00123,,false\n")
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [
+    {"code": "A1", "amount": 1.5, "paid": 1},
+    {"code": "00123", "amount": 0.0, "paid": 0},
+  ]
+
+def test_appended_rows_with_incompatible_types_rebuild_table(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "log.csv"
+  file_path.write_text("a\n1\n")
+  text_to_sql = make_text_to_sql(incremental=True)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")
+
+  with open(file_path, "a") as file:
+    file.write("x\n")
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(file_path), user_prompt="all")) == [{"a": "1"}, {"a": "x"}]
@@ -0,0 +1,143 @@
+import time
+import threading
+from types import SimpleNamespace
+import pytest
+from text_to_sql_package.llm_providers import llm_scheduler
+from text_to_sql_package.llm_providers.llm_scheduler import LLMScheduler, TokenBucket
+
+class FakeClock:
+
+  """Clock that only moves forward when advanced."""
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+  def advance(self, seconds: float) -> None:
+    self.now += seconds
+
+class RateLimitError(Exception):
+
+  """Rate limit error with the headers of the response."""
+
+  def __init__(self, headers=None):
+    super().__init__("rate limited")
+    self.response = SimpleNamespace(headers=headers or {})
+
+def flaky(failures: int, headers=None):
+  """Function that raises a RateLimitError the first failures calls, then returns "ok", and counts its calls."""
+
+  def func():
+    func.calls += 1
+    if func.calls <= failures:
+      raise RateLimitError(headers=headers)
+    return "ok"
+
+  func.calls = 0
+  return func
+
+@pytest.fixture
+def clock():
+  return FakeClock()
+
+@pytest.fixture
+def pauses(monkeypatch):
+  """Record the pauses of schedulers, and move their fake clock past each pause instead of waiting."""
+
+  recorded = []
+  pause = LLMScheduler.pause
+
+  def record(scheduler, model_name, seconds):
+    recorded.append(seconds)
+    pause(scheduler, model_name=model_name, seconds=seconds)
+    scheduler.clock.advance(seconds)
+
+  monkeypatch.setattr(LLMScheduler, "pause", record)
+  return recorded
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+  deadline = time.monotonic() + timeout
+  while not condition():
+    assert time.monotonic() < deadline
+    time.sleep(0.01)
+
+def test_token_bucket_refills_over_time():
+  bucket = TokenBucket(rate_per_minute=60, now=0.0)
+  bucket.consume(60)
+
+  assert bucket.time_until_available(1, now=0.0) == 1.0
+  assert bucket.time_until_available(1, now=0.5) == 0.5
+  assert bucket.time_until_available(1, now=1.0) == 0.0
+
+  # The bucket never holds more than its capacity, and larger amounts only need a full bucket
+  assert bucket.time_until_available(120, now=1000.0) == 0.0
+  assert bucket.available == 60
+
+def test_requests_wait_for_bucket(clock):
+  scheduler = LLMScheduler(limits={"model": {"requests_per_minute": 2}}, clock=clock)
+  scheduler.run(model_name="model", func=lambda: "ok")
+  scheduler.run(model_name="model", func=lambda: "ok")
+
+  assert scheduler.time_until_ready(model_name="model", estimated_tokens=0, now=clock()) == 30.0
+  clock.advance(30)
+  assert scheduler.time_until_ready(model_name="model", estimated_tokens=0, now=clock()) == 0.0
+
+def test_requests_run_by_priority(clock):
+  scheduler = LLMScheduler(limits={"model": {"requests_per_minute": 60}}, clock=clock)
+  scheduler.request_buckets["model"].consume(60)
+  order = []
+
+  threads = [threading.Thread(target=scheduler.run, kwargs={"model_name": "model", "func": lambda priority=priority: order.append(priority), "priority": priority}) for priority in (2, 0, 1)]
+  for thread in threads:
+    thread.start()
+  wait_until(lambda: scheduler.get_metrics()["queue_depth"]["model"] == 3)
+
+  # One request is allowed per second
+  for count in range(1, 4):
+    clock.advance(1)
+    with scheduler.condition:
+      scheduler.condition.notify_all()
+    wait_until(lambda: len(order) == count)
+
+  for thread in threads:
+    thread.join()
+  assert order == [0, 1, 2]
+
+def test_retry_after_is_honored(clock, pauses):
+  scheduler = LLMScheduler(clock=clock)
+  func = flaky(failures=1, headers={"retry-after": "7"})
+
+  assert scheduler.run(model_name="model", func=func, retry_on=(RateLimitError,)) == "ok"
+  assert pauses == [7.0]
+  assert scheduler.get_metrics()["rate_limited"] == 1
+
+def test_backoff_doubles_up_to_max_delay(clock, pauses, monkeypatch):
+  monkeypatch.setattr(llm_scheduler.random, "uniform", lambda low, high: high)
+  scheduler = LLMScheduler(base_delay=1.0, max_delay=5.0, clock=clock)
+  func = flaky(failures=4)
+
+  assert scheduler.run(model_name="model", func=func, retry_on=(RateLimitError,), max_retries=5) == "ok"
+  assert pauses == [1.0, 2.0, 4.0, 5.0]
+
+def test_last_rate_limit_error_is_raised(clock, pauses):
+  scheduler = LLMScheduler(clock=clock)
+  func = flaky(failures=3)
+
+  with pytest.raises(RateLimitError):
+    scheduler.run(model_name="model", func=func, retry_on=(RateLimitError,), max_retries=2)
+  assert func.calls == 2
+  assert scheduler.get_metrics()["failed"] == 1
+
+@pytest.mark.parametrize("failures", [0, 1])
+def test_zero_retries_makes_one_attempt(clock, failures):
+  scheduler = LLMScheduler(clock=clock)
+  func = flaky(failures=failures)
+
+  if failures:
+    with pytest.raises(RateLimitError):
+      scheduler.run(model_name="model", func=func, retry_on=(RateLimitError,), max_retries=0)
+  else:
+    assert scheduler.run(model_name="model", func=func, retry_on=(RateLimitError,), max_retries=0) == "ok"
+  assert func.calls == 1
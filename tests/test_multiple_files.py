@@ -0,0 +1,69 @@
+from text_to_sql_package.catalogs.sqlite_catalog import SQLiteCatalog
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.utils.file_utils import dataset_id_for_file
+from tests.conftest import StubLLMProvider, rows
+
+# Join of the orders of the first two tables of the schema, with the tables named as in the schema
+JOIN_QUERY = "SELECT c.name, o.total FROM {orders} o JOIN {customers} c ON o.customer_id = c.id ORDER BY o.total"
+
+class JoiningLLMProvider(StubLLMProvider):
+
+  """Stub LLMProvider that joins the orders and customers tables of the schema, and records the schemas it got."""
+
+  def __init__(self):
+    super().__init__(query=JOIN_QUERY)
+    self.schemas = []
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> str:
+    self.schemas.append(schema)
+    orders, customers = (line.split()[2] for line in schema.splitlines()[:2])
+    return self.query.format(orders=orders, customers=customers)
+
+def write_files(directory):
+  orders = directory / "orders.csv"
+  orders.write_text("id,customer_id,total\n1,1,10\n2,2,20\n")
+  customers = directory / "customers.csv"
+  customers.write_text("id,name\n1,Ana\n2,Luis\n")
+  return str(orders), str(customers)
+
+def test_files_are_joined(make_text_to_sql, tmp_path):
+  provider = JoiningLLMProvider()
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  result = rows(text_to_sql.extract_data_from_files_with_prompt(file_paths=list(write_files(tmp_path)), user_prompt="order totals"))
+
+  assert result == [{"total": 10, "name": "Ana"}, {"total": 20, "name": "Luis"}]
+  assert '-- JOIN "orders"."customer_id" = "customers"."id"' in provider.schemas[0]
+
+def test_files_get_leased_catalog_tables(make_text_to_sql, db_path, tmp_path):
+  orders, customers = write_files(tmp_path)
+  provider = JoiningLLMProvider()
+  text_to_sql = make_text_to_sql(llm_provider=provider, catalog=SQLiteCatalog())
+
+  # The second request reuses the tables of the catalog
+  for _ in range(2):
+    assert len(rows(text_to_sql.extract_data_from_files_with_prompt(file_paths=[orders, customers], user_prompt="order totals"))) == 2
+
+  orders_table, customers_table = f"orders_{dataset_id_for_file(orders)[:8]}", f"customers_{dataset_id_for_file(customers)[:8]}"
+  assert all(f'CREATE TABLE "{orders_table}"' in schema and f'-- JOIN "{orders_table}"."customer_id" = "{customers_table}"."id"' in schema for schema in provider.schemas)
+
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    assert {row["table_name"] for row in db.execute_sql_query("SELECT table_name FROM text_to_sql_catalog")} == {orders_table, customers_table}
+    assert db.execute_sql_query("SELECT COUNT(*) AS leases FROM text_to_sql_leases") == [{"leases": 0}]
+
+def test_files_with_same_table_name_are_rejected(make_text_to_sql, tmp_path):
+  (tmp_path / "2023").mkdir()
+  (tmp_path / "2024").mkdir()
+  file_paths = [write_files(tmp_path / year)[0] for year in ("2023", "2024")]
+  provider = StubLLMProvider()
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  assert rows(text_to_sql.extract_data_from_files_with_prompt(file_paths=file_paths, user_prompt="orders")) == []
+  assert "orders" in text_to_sql.last_error["message"]
+  assert provider.calls == []
+
+def test_keyword_file_name(make_text_to_sql, tmp_path):
+  file_path = tmp_path / "order.csv"
+  file_path.write_text("id,total\n1,10\n")
+
+  assert rows(make_text_to_sql().extract_data_from_files_with_prompt(file_paths=[str(file_path)], user_prompt="orders")) == [{"id": 1, "total": 10}]
@@ -0,0 +1,72 @@
+import threading
+from text_to_sql_package.prompt_builders import prompt_builder
+from text_to_sql_package.prompt_builders.prompt_builder import PromptBuilder
+from text_to_sql_package.prompt_builders.local_example_store import LocalExampleStore
+
+SCHEMA = 'CREATE TABLE "family" ("first_name" TEXT, "gender" TEXT);'
+OTHER_SCHEMA = 'CREATE TABLE "orders" ("id" INTEGER, "total" REAL);'
+
+def test_system_message_is_cached_and_copied():
+  builder = PromptBuilder(cache_control=True)
+  messages = builder.build_generation_messages(user_prompt="everyone", schema=SCHEMA, output_instructions="Answer with SQL.")
+
+  # Changing the returned messages doesn't change the cached system message
+  messages[0]["content"][0]["text"] = "changed"
+  again = builder.build_generation_messages(user_prompt="women", schema=SCHEMA, output_instructions="Answer with SQL.")
+
+  assert SCHEMA in again[0]["content"][0]["text"]
+  assert again[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+  assert again[1]["content"] == "Question: women"
+  assert len(builder.prefix_cache) == 1
+
+def test_prefix_cache_evicts_least_recently_used(monkeypatch):
+  monkeypatch.setattr(prompt_builder, "PREFIX_CACHE_SIZE", 2)
+  builder = PromptBuilder()
+
+  builder.build_system_message(schema="a", output_instructions="")
+  builder.build_system_message(schema="b", output_instructions="")
+  builder.build_system_message(schema="a", output_instructions="")
+  builder.build_system_message(schema="c", output_instructions="")
+
+  assert list(builder.prefix_cache) == [("a", ""), ("c", "")]
+
+def test_prefix_cache_is_thread_safe(monkeypatch):
+  monkeypatch.setattr(prompt_builder, "PREFIX_CACHE_SIZE", 4)
+  builder = PromptBuilder()
+
+  def build(worker):
+    for i in range(500):
+      assert builder.build_system_message(schema=f"schema {(worker + i) % 8}", output_instructions="")["role"] == "system"
+
+  threads = [threading.Thread(target=build, args=(worker,)) for worker in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert len(builder.prefix_cache) == 4
+
+def test_examples_are_ranked_by_tf_idf_similarity():
+  store = LocalExampleStore()
+  store.add_example(user_prompt="how many women are there", sql_query="SELECT COUNT(*) FROM family WHERE gender = 'Female'", schema=SCHEMA)
+  store.add_example(user_prompt="list the first names", sql_query="SELECT first_name FROM family", schema=SCHEMA)
+  store.add_example(user_prompt="how many men are there", sql_query="SELECT COUNT(*) FROM family WHERE gender = 'Male'", schema=SCHEMA)
+  store.add_example(user_prompt="how many women are there", sql_query="SELECT COUNT(*) FROM orders", schema=OTHER_SCHEMA)
+
+  examples = store.get_examples(user_prompt="how many women live here", schema=SCHEMA, k=2)
+
+  # Rare words (women) weigh more than words shared by most examples (how, many)
+  assert [example["user_prompt"] for example in examples] == ["how many women are there", "how many men are there"]
+  assert examples[0]["sql_query"].endswith("'Female'")
+
+def test_dissimilar_examples_are_not_returned():
+  store = LocalExampleStore(min_similarity=0.1)
+  store.add_example(user_prompt="list the first names", sql_query="SELECT first_name FROM family", schema=SCHEMA)
+
+  assert store.get_examples(user_prompt="average order total", schema=SCHEMA) == []
+
+def test_examples_are_persisted(tmp_path):
+  file_path = str(tmp_path / "examples.json")
+  LocalExampleStore(file_path=file_path).add_example(user_prompt="everyone", sql_query="SELECT * FROM family", schema=SCHEMA)
+
+  assert LocalExampleStore(file_path=file_path).get_examples(user_prompt="everyone", schema=SCHEMA) == [{"user_prompt": "everyone", "sql_query": "SELECT * FROM family"}]
@@ -0,0 +1,85 @@
+import json
+import shutil
+import urllib.error
+import urllib.request
+import pytest
+from text_to_sql_package import text_to_sql
+from text_to_sql_package.catalogs.sqlite_catalog import SQLiteCatalog
+from text_to_sql_package.servers.query_server import QueryServer
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from tests.conftest import FAMILY_CSV
+
+def post(url: str, body: dict):
+  request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}, method="POST")
+  try:
+    with urllib.request.urlopen(request, timeout=10) as response:
+      return response.status, response.read().decode()
+  except urllib.error.HTTPError as e:
+    return e.code, e.read().decode()
+
+@pytest.fixture
+def server(make_text_to_sql, tmp_path):
+  data_dir = tmp_path / "data"
+  data_dir.mkdir()
+  shutil.copy(FAMILY_CSV, data_dir / "family.csv")
+  (tmp_path / "secret.csv").write_text("value\n1\n")
+
+  query_server = QueryServer(text_to_sql_factory=lambda: make_text_to_sql(catalog=SQLiteCatalog()), port=0, max_concurrency=1, max_queue_size=0, queue_timeout=1.0, data_dir=str(data_dir))
+  host, port = query_server.start()
+  query_server.url = f"http://{host}:{port}"
+  yield query_server
+  query_server.shutdown()
+
+def test_query(server, db_path):
+  status, body = post(f"{server.url}/query", {"file_path": "family.csv", "user_prompt": "everyone"})
+
+  assert status == 200
+  result = json.loads(body)
+  assert len(result["rows"]) == 5
+  assert result["error"] is None
+
+  with urllib.request.urlopen(f"{server.url}/health", timeout=10) as response:
+    assert json.loads(response.read())["completed"] == 1
+
+  # The dataset was leased while in use, and released after the query
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    assert db.execute_sql_query("SELECT COUNT(*) AS leases FROM text_to_sql_leases") == [{"leases": 0}]
+
+def test_streaming_query(server):
+  status, body = post(f"{server.url}/query", {"file_path": "family.csv", "user_prompt": "everyone", "stream": True})
+
+  assert status == 200
+  events = [json.loads(line) for line in body.splitlines()]
+  assert [event["event"] for event in events] == ["queued", "running"] + ["row"] * 5 + ["done"]
+  assert events[-1]["row_count"] == 5
+
+def test_busy_server_rejects_requests(server):
+  # The only worker is busy and the queue has no room
+  worker = server.acquire_worker()
+  try:
+    status, body = post(f"{server.url}/query", {"file_path": "family.csv", "user_prompt": "everyone"})
+  finally:
+    server.release_worker(worker)
+
+  assert status == 503
+  assert server.get_status()["rejected"] == 1
+
+def test_files_outside_data_dir_are_rejected(server):
+  assert post(f"{server.url}/query", {"file_path": "../secret.csv", "user_prompt": "everyone"})[0] == 403
+  assert post(f"{server.url}/query", {"file_path": "missing.csv", "user_prompt": "everyone"})[0] == 404
+
+def test_dataset_is_leased_and_loaded_once_per_request(server, monkeypatch):
+  leases, fingerprints = [], []
+  acquire_lease, fingerprint_source = SQLiteCatalog.acquire_lease, text_to_sql.fingerprint_source
+  monkeypatch.setattr(SQLiteCatalog, "acquire_lease", lambda catalog, **kwargs: leases.append(kwargs["dataset_id"]) or acquire_lease(catalog, **kwargs))
+  monkeypatch.setattr(text_to_sql, "fingerprint_source", lambda file_path: fingerprints.append(file_path) or fingerprint_source(file_path))
+
+  assert post(f"{server.url}/query", {"file_path": "family.csv", "user_prompt": "everyone"})[0] == 200
+  assert len(leases) == 1
+  assert len(fingerprints) == 1
+
+def test_dataset_locks_are_removed_after_requests(server):
+  for _ in range(2):
+    assert post(f"{server.url}/query", {"file_path": "family.csv", "user_prompt": "everyone"})[0] == 200
+
+  assert server.dataset_locks == {}
@@ -0,0 +1,72 @@
+import time
+import pytest
+from text_to_sql_package.prompt_builders.local_example_store import LocalExampleStore
+from tests.conftest import FAMILY_CSV, StubLLMProvider, rows
+
+class RepairingLLMProvider(StubLLMProvider):
+
+  """Stub LLMProvider whose repairs return a fixed query after a delay, and record the timeout they got."""
+
+  def __init__(self, query: str, repaired_query: str, delay: float = 0.0):
+    super().__init__(query=query)
+    self.repaired_query = repaired_query
+    self.delay = delay
+    self.timeouts = []
+
+  def repair_sql_query(self, user_prompt: str, schema: str, query: str, error: str, max_retries: int = 3, initial_delay: int = 1, timeout=None) -> str:
+    self.timeouts.append(timeout)
+    time.sleep(self.delay)
+    return self.repaired_query.format(table=schema.split()[2])
+
+def test_failed_query_is_repaired_with_remaining_time_as_timeout(make_text_to_sql):
+  provider = RepairingLLMProvider(query="SELECT * FROM missing_table", repaired_query="SELECT * FROM {table}")
+  text_to_sql = make_text_to_sql(llm_provider=provider, repair_time_budget=5.0)
+
+  assert len(rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone"))) == 5
+  assert text_to_sql.metrics["repairs"] == 1
+  assert 0 < provider.timeouts[0] <= 5.0
+  assert len(text_to_sql.repair_cache) == 1
+
+def test_slow_repair_is_abandoned_when_budget_is_spent(make_text_to_sql):
+  provider = RepairingLLMProvider(query="SELECT * FROM missing_table", repaired_query="SELECT * FROM {table}", delay=1.0)
+  text_to_sql = make_text_to_sql(llm_provider=provider, repair_time_budget=0.1)
+
+  start = time.monotonic()
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone")) == []
+  assert time.monotonic() - start < 1.0
+  assert text_to_sql.metrics["repairs"] == 0
+  assert text_to_sql.metrics["failed_repairs"] == 1
+
+def test_empty_results_are_not_repaired_by_default(make_text_to_sql):
+  provider = RepairingLLMProvider(query="SELECT * FROM {table} WHERE gender = 'female'", repaired_query="SELECT * FROM {table}")
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="women")) == []
+  assert provider.timeouts == []
+
+def test_empty_result_repair_is_not_cached_or_stored_as_example(make_text_to_sql):
+  provider = RepairingLLMProvider(query="SELECT * FROM {table} WHERE gender = 'female'", repaired_query="SELECT * FROM {table} WHERE gender = 'Female'")
+  example_store = LocalExampleStore()
+  text_to_sql = make_text_to_sql(llm_provider=provider, repair_empty_results=True, example_store=example_store)
+
+  assert len(rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="women"))) == 3
+  assert text_to_sql.metrics["repairs"] == 1
+  assert len(text_to_sql.repair_cache) == 0
+  assert example_store.examples == []
+
+def test_attempts_are_counted(make_text_to_sql):
+  provider = RepairingLLMProvider(query="SELECT * FROM missing_table", repaired_query="SELECT * FROM {table}")
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  for user_prompt in ("everyone", "all the family"):
+    text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt=user_prompt)
+
+  # The second prompt uses the cached repair
+  assert text_to_sql.metrics == {"queries": 2, "attempts": 3, "repairs": 1, "repair_cache_hits": 1, "failed_repairs": 0}
+
+def test_close_shuts_down_repair_executor(make_text_to_sql):
+  with make_text_to_sql() as text_to_sql:
+    text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone")
+
+  with pytest.raises(RuntimeError):
+    text_to_sql.repair_executor.submit(print)
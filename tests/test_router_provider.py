@@ -0,0 +1,75 @@
+import time
+from text_to_sql_package.llm_providers.router_provider import RouterLLMProvider
+
+class FakeBackend:
+
+  """LLMProvider that answers with its name after a delay, or fails, and counts its calls."""
+
+  def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+    self.name = name
+    self.delay = delay
+    self.fail = fail
+    self.calls = 0
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> str:
+    self.calls += 1
+    time.sleep(self.delay)
+    if self.fail:
+      raise RuntimeError(f"{self.name} is down")
+    return f"SELECT '{self.name}'"
+
+def record(router: RouterLLMProvider, name: str, latency: float, success: bool, count: int = 5) -> None:
+  for _ in range(count):
+    router.stats[name].record(latency=latency, success=success)
+  router.stats[name].last_request = time.monotonic()
+
+def test_requests_go_to_fastest_backend():
+  router = RouterLLMProvider(providers={"slow": FakeBackend("slow"), "fast": FakeBackend("fast")})
+  record(router, "slow", latency=1.0, success=True)
+  record(router, "fast", latency=0.1, success=True)
+
+  assert router.rank_backends() == ["fast", "slow"]
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'fast'"
+
+def test_failover_to_next_backend_on_error():
+  router = RouterLLMProvider(providers={"down": FakeBackend("down", fail=True), "up": FakeBackend("up")})
+
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'up'"
+
+  metrics = router.get_metrics()
+  assert metrics["down"]["requests"] == 1
+  assert metrics["down"]["error_rate"] == 1.0
+  assert metrics["up"]["error_rate"] == 0.0
+
+def test_slow_request_is_hedged():
+  router = RouterLLMProvider(providers={"slow": FakeBackend("slow", delay=0.5), "fast": FakeBackend("fast")}, hedge=True, default_hedge_delay=0.05)
+
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'fast'"
+
+  metrics = router.get_metrics()
+  assert metrics["fast"]["hedges"] == 1
+  assert metrics["fast"]["hedge_wins"] == 1
+
+def test_unhealthy_backend_is_skipped_until_probed():
+  primary, secondary = FakeBackend("primary"), FakeBackend("secondary")
+  router = RouterLLMProvider(providers={"primary": primary, "secondary": secondary}, probe_interval=60.0)
+  record(router, "primary", latency=0.1, success=False)
+  record(router, "secondary", latency=1.0, success=True)
+
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'secondary'"
+  assert primary.calls == 0
+
+  # Once the probe interval is over, the unhealthy backend gets the next request, and is healthy again if it succeeds
+  router.stats["primary"].last_request -= 60.0
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'primary'"
+  assert router.get_metrics()["primary"]["recoveries"] == 1
+  assert router.rank_backends()[0] == "primary"
+
+def test_failed_probe_fails_over():
+  router = RouterLLMProvider(providers={"primary": FakeBackend("primary", fail=True), "secondary": FakeBackend("secondary")}, probe_interval=60.0)
+  record(router, "primary", latency=0.1, success=False)
+  router.stats["primary"].last_request -= 60.0
+
+  assert router.generate_sql_query(user_prompt="everyone", schema="") == "SELECT 'secondary'"
+  assert router.get_metrics()["primary"]["recoveries"] == 0
+  assert router.rank_backends() == ["secondary", "primary"]
@@ -0,0 +1,46 @@
+import pytest
+from text_to_sql_package.llm_providers.rule_based_provider import RuleBasedLLMProvider
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from tests.conftest import StubLLMProvider, rows
+
+def test_known_values_are_refreshed_when_table_is_replaced(make_text_to_sql, db_path, tmp_path):
+  first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+  first.write_text("name,city\nAna,Paris\nBob,Rome\n")
+  second.write_text("name,city\nAna,Lima\nBob,Oslo\n")
+
+  provider = RuleBasedLLMProvider(database_connector=SQLiteDatabaseConnector(db_path=db_path))
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(first), user_prompt="people in Paris")) == [{"name": "Ana", "city": "Paris"}]
+
+  # Same table name and row count, different values
+  assert rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(second), user_prompt="people in Lima")) == [{"name": "Ana", "city": "Lima"}]
+
+@pytest.mark.parametrize("user_prompt", [
+  "top 3 oldest",
+  "top 3 highest paid",
+  "first 2 in Boston alphabetically",
+  "how many distinct cities",
+  "average salary of Boston vs Paris",
+])
+def test_prompts_not_fully_explained_go_to_fallback(make_text_to_sql, db_path, tmp_path, user_prompt):
+  employees = tmp_path / "employees.csv"
+  employees.write_text("name,city,age,salary\nAna,Boston,34,5000\nBob,Paris,51,4000\nEve,Boston,28,6000\n")
+
+  fallback = StubLLMProvider()
+  provider = RuleBasedLLMProvider(database_connector=SQLiteDatabaseConnector(db_path=db_path), fallback_provider=fallback)
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=str(employees), user_prompt=user_prompt)
+
+  assert fallback.calls == [user_prompt]
+  assert provider.metrics == {"local": 0, "fallback": 1}
+
+def test_simple_prompt_is_answered_locally(make_text_to_sql, db_path, tmp_path):
+  employees = tmp_path / "employees.csv"
+  employees.write_text("name,city,age,salary\nAna,Boston,34,5000\nBob,Paris,51,4000\nEve,Boston,28,6000\n")
+
+  provider = RuleBasedLLMProvider(database_connector=SQLiteDatabaseConnector(db_path=db_path), fallback_provider=StubLLMProvider())
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  assert len(rows(text_to_sql.extract_data_from_file_with_prompt(file_path=str(employees), user_prompt="people in Boston with age over 30"))) == 1
+  assert provider.metrics == {"local": 1, "fallback": 0}
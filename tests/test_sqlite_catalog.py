@@ -0,0 +1,68 @@
+import pandas as pd
+from text_to_sql_package.catalogs.sqlite_catalog import SQLiteCatalog
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.utils.file_utils import dataset_id_for_file
+from tests.conftest import rows
+
+def table_names(db_path: str):
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    return {row["name"] for row in db.execute_sql_query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def write_csv(path, values):
+  path.write_text("value\n" + "".join(f"{value}\n" for value in values))
+  return str(path)
+
+def test_evicted_incremental_dataset_is_rebuilt(make_text_to_sql, tmp_path):
+  first = write_csv(tmp_path / "first.csv", [1, 2])
+  second = write_csv(tmp_path / "second.csv", [3])
+
+  # Every registration evicts the other dataset
+  text_to_sql = make_text_to_sql(catalog=SQLiteCatalog(max_size_bytes=0), incremental=True)
+  assert len(rows(text_to_sql.extract_data_from_file_with_prompt(file_path=first, user_prompt="all"))) == 2
+  assert len(rows(text_to_sql.extract_data_from_file_with_prompt(file_path=second, user_prompt="all"))) == 1
+
+  with open(first, "a") as file:
+    file.write("4\n")
+
+  assert [row["value"] for row in rows(text_to_sql.extract_data_from_file_with_prompt(file_path=first, user_prompt="all"))] == [1, 2, 4]
+
+def test_evict_deletes_ingestion_state(make_text_to_sql, db_path, tmp_path):
+  first = write_csv(tmp_path / "first.csv", [1, 2])
+  second = write_csv(tmp_path / "second.csv", [3])
+
+  text_to_sql = make_text_to_sql(catalog=SQLiteCatalog(max_size_bytes=0), incremental=True)
+  text_to_sql.extract_data_from_file_with_prompt(file_path=first, user_prompt="all")
+  text_to_sql.extract_data_from_file_with_prompt(file_path=second, user_prompt="all")
+
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    states = db.execute_sql_query("SELECT table_name FROM text_to_sql_ingestion_state")
+
+  assert [state["table_name"] for state in states] == [f"second_{dataset_id_for_file(second)[:8]}"]
+
+def test_ingestion_state_of_dropped_table_is_ignored(db_path):
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    db.create_table_from_df(df=pd.DataFrame({"value": [1]}), table_name="values_table")
+    db.save_ingestion_state(table_name="values_table", state={"offset": 8})
+    db.connection.execute("DROP TABLE values_table")
+
+    assert db.load_ingestion_state(table_name="values_table") is None
+
+def test_leased_dataset_is_not_evicted(make_text_to_sql, db_path, tmp_path):
+  first = write_csv(tmp_path / "first.csv", [1, 2])
+  second = write_csv(tmp_path / "second.csv", [3])
+
+  worker = make_text_to_sql(catalog=SQLiteCatalog(max_size_bytes=0))
+  other_worker = make_text_to_sql(catalog=SQLiteCatalog(max_size_bytes=0))
+  worker.extract_data_from_file_with_prompt(file_path=first, user_prompt="all")
+  first_table = f"first_{dataset_id_for_file(first)[:8]}"
+
+  # While a worker uses the first dataset, another worker loading a dataset doesn't evict it
+  lease_id = worker.acquire_dataset_lease(file_path=first)
+  other_worker.extract_data_from_file_with_prompt(file_path=second, user_prompt="all")
+  assert first_table in table_names(db_path)
+
+  worker.release_dataset_lease(lease_id=lease_id)
+  with open(second, "a") as file:
+    file.write("5\n")
+  other_worker.extract_data_from_file_with_prompt(file_path=second, user_prompt="all")
+  assert first_table not in table_names(db_path)
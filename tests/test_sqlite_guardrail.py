@@ -0,0 +1,83 @@
+import math
+import pytest
+import pandas as pd
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.sql_guardrails.sql_guardrail import SQLGuardrailError
+from text_to_sql_package.sql_guardrails import sqlite_guardrail
+from text_to_sql_package.sql_guardrails.sqlite_guardrail import SQLiteGuardrail
+
+@pytest.fixture
+def db(db_path):
+  with SQLiteDatabaseConnector(db_path=db_path) as db:
+    db.create_table_from_df(df=pd.DataFrame({"a": range(10)}), table_name="t")
+    yield db
+
+def test_select_runs_with_limit(db):
+  assert SQLiteGuardrail(max_rows=3).execute_query("SELECT a FROM t", db) == [{"a": 0}, {"a": 1}, {"a": 2}]
+
+@pytest.mark.parametrize("query", ["DELETE FROM t", "SELECT a FROM t; DROP TABLE t"])
+def test_writes_are_rejected(db, query):
+  with pytest.raises(SQLGuardrailError) as error:
+    SQLiteGuardrail().execute_query(query, db)
+  assert error.value.reason in ("not_read_only", "invalid_sql")
+
+def test_operations_blocked_at_runtime_are_structured_errors(db):
+  with pytest.raises(SQLGuardrailError) as error:
+    SQLiteGuardrail().execute_query("SELECT load_extension('x')", db)
+  assert error.value.reason == "not_read_only"
+
+def test_timeout_interrupts_query(db):
+  query = "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT COUNT(*) FROM r"
+  with pytest.raises(SQLGuardrailError) as error:
+    SQLiteGuardrail(timeout=0.1, max_estimated_cost=float("inf")).execute_query(query, db)
+  assert error.value.reason == "timeout"
+
+# Plans of queries on a table with 5M rows, as returned by EXPLAIN QUERY PLAN
+LARGE_TABLE_ROWS = {"t": 5_000_000}
+GROUP_BY_PLAN = [(2, 0, 0, "SCAN t"), (4, 0, 0, "USE TEMP B-TREE FOR GROUP BY")]
+ORDER_BY_PLAN = [(2, 0, 0, "SCAN t"), (4, 0, 0, "USE TEMP B-TREE FOR ORDER BY")]
+CROSS_JOIN_PLAN = [(2, 0, 0, "SCAN t1"), (3, 0, 0, "SCAN t2")]
+
+@pytest.fixture
+def mock_plan(monkeypatch):
+  def mock(plan):
+    monkeypatch.setattr(sqlite_guardrail, "explain_query_plan", lambda connection, query: plan)
+    monkeypatch.setattr(sqlite_guardrail, "get_table_row_counts", lambda connection: LARGE_TABLE_ROWS)
+  return mock
+
+@pytest.mark.parametrize("query, plan", [
+  ("SELECT a, COUNT(*) FROM t GROUP BY a", GROUP_BY_PLAN),
+  ("SELECT a FROM t ORDER BY a LIMIT 10", ORDER_BY_PLAN),
+])
+def test_aggregates_and_top_k_on_large_table_are_accepted(db, mock_plan, query, plan):
+  mock_plan(plan)
+  safe_query, cost = SQLiteGuardrail().check_query(query, db)
+  assert cost["estimated_rows_examined"] < 1e8
+
+def test_top_k_sort_is_cheaper_than_full_sort(db, mock_plan):
+  mock_plan(ORDER_BY_PLAN)
+  guardrail = SQLiteGuardrail(max_rows=None, max_estimated_cost=float("inf"))
+  top_k = guardrail.estimate_cost("SELECT a FROM t ORDER BY a LIMIT 10", db)["estimated_rows_examined"]
+  full = guardrail.estimate_cost("SELECT a FROM t ORDER BY a", db)["estimated_rows_examined"]
+  assert top_k == pytest.approx(5_000_000 * (1 + math.log2(11)))
+  assert full == pytest.approx(5_000_000 * (1 + math.log2(5_000_001)))
+
+def test_cartesian_join_is_too_expensive(db, mock_plan):
+  mock_plan(CROSS_JOIN_PLAN)
+  with pytest.raises(SQLGuardrailError) as error:
+    SQLiteGuardrail().check_query("SELECT * FROM t t1, t t2", db)
+  assert error.value.reason == "too_expensive"
+  assert error.value.details["max_nested_loops"] == 2
+
+@pytest.mark.parametrize("query, expected", [
+  ("SELECT a FROM t", "SELECT a FROM t LIMIT 5"),
+  ("SELECT a FROM t LIMIT 100", "SELECT a FROM t LIMIT 5"),
+  ("SELECT a FROM t LIMIT 10, 100", "SELECT a FROM t LIMIT 10, 5"),
+  ("SELECT a FROM t WHERE a IN (SELECT a FROM t LIMIT 2)", "SELECT a FROM t WHERE a IN (SELECT a FROM t LIMIT 2) LIMIT 5"),
+  ("SELECT a FROM t LIMIT (SELECT 3)", "SELECT * FROM (SELECT a FROM t LIMIT (SELECT 3)) LIMIT 5"),
+])
+def test_apply_limit(db, query, expected):
+  assert SQLiteGuardrail(max_rows=5).apply_limit(query) == expected
+
+def test_non_numeric_limit_is_capped(db):
+  assert len(SQLiteGuardrail(max_rows=2).execute_query("SELECT a FROM t LIMIT (SELECT 5)", db)) == 2
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from text_to_sql_package.llm_providers.litellm_provider import LiteLLMProvider
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult
+from tests.conftest import FAMILY_CSV, StubLLMProvider, rows
+
+class StructuredLLMProvider(StubLLMProvider):
+
+  """Stub LLMProvider that returns a SQLQueryResult."""
+
+  def __init__(self, query: str, referenced_columns=(), expects_aggregate: bool = False):
+    super().__init__(query=query)
+    self.referenced_columns = list(referenced_columns)
+    self.expects_aggregate = expects_aggregate
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> SQLQueryResult:
+    return SQLQueryResult(sql=super().generate_sql_query(user_prompt=user_prompt, schema=schema), referenced_columns=self.referenced_columns, expects_aggregate=self.expects_aggregate)
+
+def test_litellm_structured_output_is_returned_not_stored(monkeypatch):
+  provider = LiteLLMProvider(model_name="stub", output_mode='json_schema')
+  content = '{"sql": "SELECT first_name FROM family", "referenced_columns": ["first_name"], "expects_aggregate": false}'
+  monkeypatch.setattr(provider, "complete", lambda **kwargs: SimpleNamespace(content=content))
+
+  result = provider.generate_sql_query(user_prompt="names", schema="Table: family")
+
+  assert result == SQLQueryResult(sql="SELECT first_name FROM family", referenced_columns=["first_name"])
+  assert not hasattr(provider, "last_result")
+
+def test_only_referenced_columns_are_validated(make_text_to_sql):
+  provider = StructuredLLMProvider(query="SELECT first_name FROM {table}", referenced_columns=["first_name"])
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  result = rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="names"))
+
+  assert result[0] == {"first_name": "Valentina"}
+
+def test_aggregated_values_are_kept(make_text_to_sql):
+  provider = StructuredLLMProvider(query="SELECT gender, COUNT(*) AS total FROM {table} GROUP BY gender ORDER BY gender", referenced_columns=["gender"], expects_aggregate=True)
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  result = rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="members by gender"))
+
+  assert result == [{"gender": "Female", "total": 3}, {"gender": "Male", "total": 2}]
+
+def test_columns_missing_from_referenced_columns_are_kept(make_text_to_sql):
+  provider = StructuredLLMProvider(query="SELECT * FROM {table}", referenced_columns=["first_name"])
+  text_to_sql = make_text_to_sql(llm_provider=provider)
+
+  result = rows(text_to_sql.extract_data_from_file_with_prompt(file_path=FAMILY_CSV, user_prompt="everyone"))
+
+  assert result[0] == {"first_name": "Valentina", "middle_name": "Teresita", "first_last_name": "Cano", "second_last_name": "Arcay", "date_of_birth": "1996-06-09", "gender": "Female"}
@@ -0,0 +1,5 @@
+import sys
+from text_to_sql_package.cli import main
+
+if __name__ == "__main__":
+  sys.exit(main())
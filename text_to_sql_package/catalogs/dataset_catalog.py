@@ -0,0 +1,80 @@
+from typing import Protocol, List, Dict, Optional
+from text_to_sql_package.database_connectors.sql_database_connector import SQLDatabaseConnector
+
+class DatasetCatalog(Protocol):
+  
+  """Interface for classes that keep track of the datasets stored as tables in a long-lived database (table names, schemas, statistics, source fingerprints and access times)."""
+  
+  def get_dataset(self, dataset_id: str, fingerprint: str, database_connector: SQLDatabaseConnector) -> Optional[Dict]:
+    """
+    Get a dataset from the catalog if its table is up to date with the source file, and record the access.
+    
+    Parameters:
+    dataset_id (str): Dataset identifier
+    fingerprint (str): Fingerprint of the source file
+    database_connector (SQLDatabaseConnector): Connected database
+
+    Returns:
+    Optional[Dict]: Dataset with keys dataset_id, table_name, schema, dtypes and statistics, or None if it isn't stored or is outdated
+    """
+    ...
+    
+  def register_dataset(self, dataset_id: str, table_name: str, schema: str, dtypes: Dict[str, str], statistics: Dict, fingerprint: str, database_connector: SQLDatabaseConnector) -> None:
+    """
+    Add or update a dataset in the catalog, once its table was created.
+    
+    Parameters:
+    dataset_id (str): Dataset identifier
+    table_name (str): Name of the SQL table with the dataset
+    schema (str): Schema of the table
+    dtypes (Dict[str, str]): Pandas data type by column name
+    statistics (Dict): Column statistics
+    fingerprint (str): Fingerprint of the source file
+    database_connector (SQLDatabaseConnector): Connected database
+    """
+    ...
+    
+  def acquire_lease(self, dataset_id: str, database_connector: SQLDatabaseConnector) -> str:
+    """
+    Mark a dataset as in use, so that it isn't evicted by this or another process sharing the database until the lease is released or expires.
+    
+    Parameters:
+    dataset_id (str): Dataset identifier
+    database_connector (SQLDatabaseConnector): Connected database
+
+    Returns:
+    str: Lease identifier, to give back with release_lease
+    """
+    ...
+    
+  def release_lease(self, lease_id: str, database_connector: SQLDatabaseConnector) -> None:
+    """
+    Release the lease of a dataset, once it isn't in use anymore.
+    
+    Parameters:
+    lease_id (str): Lease identifier returned by acquire_lease
+    database_connector (SQLDatabaseConnector): Connected database
+    """
+    ...
+    
+  def evict_cold_datasets(self, database_connector: SQLDatabaseConnector, keep: Optional[List[str]] = None) -> List[str]:
+    """
+    Drop the tables of the least recently used datasets (and their stored state) until the database is within its size limit. Datasets with a lease are never evicted.
+    
+    Parameters:
+    database_connector (SQLDatabaseConnector): Connected database
+    keep (Optional[List[str]]): Dataset identifiers that must not be evicted (e.g. the one in use). Optional
+
+    Returns:
+    List[str]: Identifiers of the evicted datasets
+    """
+    ...
+    
+  def run_maintenance(self, database_connector: SQLDatabaseConnector) -> None:
+    """
+    Run the scheduled database maintenance that is due (e.g. updating planner statistics, reclaiming free space).
+    
+    Parameters:
+    database_connector (SQLDatabaseConnector): Connected database
+    """
+    ...
@@ -0,0 +1,271 @@
+import json
+import time
+import uuid
+import sqlite3
+from typing import List, Dict, Optional
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector, INGESTION_STATE_TABLE
+from text_to_sql_package.catalogs.dataset_catalog import DatasetCatalog
+
+# Tables with the catalog of datasets, the maintenance schedule, and the leases of the datasets in use
+CATALOG_TABLE = "text_to_sql_catalog"
+MAINTENANCE_TABLE = "text_to_sql_maintenance"
+LEASE_TABLE = "text_to_sql_leases"
+
+class SQLiteCatalog:
+
+  def __init__(self, max_size_bytes: int = 1024 ** 3, analyze_every: int = 5, analyze_interval: float = 24 * 3600, vacuum_interval: float = 3600, vacuum_min_free_ratio: float = 0.25, lease_duration: float = 600.0):
+    """
+    Class constructor.
+
+    Parameters:
+    max_size_bytes (int): Max size of the data in the database. Least recently used datasets are evicted above it. Optional
+    analyze_every (int): Number of created or dropped tables after which ANALYZE is run. Optional
+    analyze_interval (float): Max time in seconds between two ANALYZE, if any table changed. Optional
+    vacuum_interval (float): Min time in seconds between two VACUUM. Optional
+    vacuum_min_free_ratio (float): Share of free pages in the database file above which VACUUM is run. Optional
+    lease_duration (float): Time in seconds after which the lease of a dataset in use expires, if it isn't released (e.g. the process crashed). Optional
+    """
+
+    self.max_size_bytes = max_size_bytes
+    self.analyze_every = analyze_every
+    self.analyze_interval = analyze_interval
+    self.vacuum_interval = vacuum_interval
+    self.vacuum_min_free_ratio = vacuum_min_free_ratio
+    self.lease_duration = lease_duration
+
+  def create_catalog_tables(self, connection: sqlite3.Connection) -> None:
+    """
+    Create the catalog, maintenance and lease tables if they don't exist.
+
+    Parameters:
+    connection (sqlite3.Connection): Connection to the SQLite database
+    """
+
+    with connection as conn:
+      conn.execute(f"""CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+        dataset_id TEXT PRIMARY KEY, table_name TEXT UNIQUE, schema TEXT, dtypes TEXT, statistics TEXT,
+        fingerprint TEXT, size_bytes INTEGER, created_at REAL, last_access REAL)""")
+      conn.execute(f"CREATE TABLE IF NOT EXISTS {MAINTENANCE_TABLE} (task TEXT PRIMARY KEY, last_run REAL, changes INTEGER)")
+      conn.execute(f"CREATE TABLE IF NOT EXISTS {LEASE_TABLE} (lease_id TEXT PRIMARY KEY, dataset_id TEXT, expires_at REAL)")
+
+  def get_dataset(self, dataset_id: str, fingerprint: str, database_connector: SQLiteDatabaseConnector) -> Optional[Dict]:
+    """
+    Get a dataset from the catalog if its table is up to date with the source file, and record the access.
+
+    Parameters:
+    dataset_id (str): Dataset identifier
+    fingerprint (str): Fingerprint of the source file
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+
+    Returns:
+    Optional[Dict]: Dataset with keys dataset_id, table_name, schema, dtypes and statistics, or None if it isn't stored or is outdated
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+
+    with connection as conn:
+      row = conn.execute(f"SELECT table_name, schema, dtypes, statistics, fingerprint FROM {CATALOG_TABLE} WHERE dataset_id = ?", (dataset_id,)).fetchone()
+
+      if row is None or row[4] != fingerprint:
+        print(f"Dataset {dataset_id} not found in catalog or outdated.")
+        return None
+
+      conn.execute(f"UPDATE {CATALOG_TABLE} SET last_access = ? WHERE dataset_id = ?", (time.time(), dataset_id))
+
+    print(f"Dataset {dataset_id} found in catalog: table {row[0]}.")
+    return {"dataset_id": dataset_id, "table_name": row[0], "schema": row[1], "dtypes": json.loads(row[2]), "statistics": json.loads(row[3])}
+
+  def register_dataset(self, dataset_id: str, table_name: str, schema: str, dtypes: Dict[str, str], statistics: Dict, fingerprint: str, database_connector: SQLiteDatabaseConnector) -> None:
+    """
+    Add or update a dataset in the catalog, once its table was created.
+
+    Parameters:
+    dataset_id (str): Dataset identifier
+    table_name (str): Name of the SQL table with the dataset
+    schema (str): Schema of the table
+    dtypes (Dict[str, str]): Pandas data type by column name
+    statistics (Dict): Column statistics
+    fingerprint (str): Fingerprint of the source file
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+    size_bytes = get_table_size(connection, table_name)
+    now = time.time()
+
+    with connection as conn:
+      conn.execute(
+        f"""INSERT INTO {CATALOG_TABLE} (dataset_id, table_name, schema, dtypes, statistics, fingerprint, size_bytes, created_at, last_access)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(dataset_id) DO UPDATE SET table_name = excluded.table_name, schema = excluded.schema, dtypes = excluded.dtypes,
+        statistics = excluded.statistics, fingerprint = excluded.fingerprint, size_bytes = excluded.size_bytes, created_at = excluded.created_at, last_access = excluded.last_access""",
+        (dataset_id, table_name, schema, json.dumps(dtypes), json.dumps(statistics), fingerprint, size_bytes, now, now)
+      )
+
+    self.count_change(connection)
+    print(f"Dataset {dataset_id} registered in catalog: table {table_name} ({size_bytes} bytes).")
+
+  def acquire_lease(self, dataset_id: str, database_connector: SQLiteDatabaseConnector) -> str:
+    """
+    Mark a dataset as in use, so that it isn't evicted by this or another process sharing the database until the lease is released or expires.
+    A dataset can be leased before it is registered.
+
+    Parameters:
+    dataset_id (str): Dataset identifier
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+
+    Returns:
+    str: Lease identifier, to give back with release_lease
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+    lease_id = uuid.uuid4().hex
+    now = time.time()
+
+    with connection as conn:
+      conn.execute(f"DELETE FROM {LEASE_TABLE} WHERE expires_at <= ?", (now,))
+      conn.execute(f"INSERT INTO {LEASE_TABLE} (lease_id, dataset_id, expires_at) VALUES (?, ?, ?)", (lease_id, dataset_id, now + self.lease_duration))
+
+    return lease_id
+
+  def release_lease(self, lease_id: str, database_connector: SQLiteDatabaseConnector) -> None:
+    """
+    Release the lease of a dataset, once it isn't in use anymore.
+
+    Parameters:
+    lease_id (str): Lease identifier returned by acquire_lease
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+
+    with connection as conn:
+      conn.execute(f"DELETE FROM {LEASE_TABLE} WHERE lease_id = ?", (lease_id,))
+
+  def evict_cold_datasets(self, database_connector: SQLiteDatabaseConnector, keep: Optional[List[str]] = None) -> List[str]:
+    """
+    Drop the tables of the least recently used datasets until the data in the database is within max_size_bytes.
+    Datasets with an unexpired lease are in use, and are never evicted.
+
+    Parameters:
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+    keep (Optional[List[str]]): Dataset identifiers that must not be evicted (e.g. the one in use). Optional
+
+    Returns:
+    List[str]: Identifiers of the evicted datasets
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+    keep = set(keep or [])
+    evicted = []
+
+    # Sizes are measured when datasets are registered, so the total doesn't need a scan of the database
+    rows = connection.execute(f"SELECT dataset_id, table_name, size_bytes FROM {CATALOG_TABLE} ORDER BY last_access ASC").fetchall()
+    total_size = sum(size_bytes or 0 for _, _, size_bytes in rows)
+
+    for dataset_id, table_name, size_bytes in rows:
+      if total_size <= self.max_size_bytes:
+        break
+      if dataset_id in keep:
+        continue
+
+      # The lease check and the drop run in the same write transaction, so the dataset can't be leased in between
+      with connection as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute(f"SELECT 1 FROM {LEASE_TABLE} WHERE dataset_id = ? AND expires_at > ?", (dataset_id, time.time())).fetchone():
+          print(f"Dataset {dataset_id} is in use: not evicted.")
+          continue
+
+        # The ingestion state goes with the table, so an incremental ingestion doesn't append to a table that no longer exists
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE dataset_id = ?", (dataset_id,))
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {INGESTION_STATE_TABLE} (table_name TEXT PRIMARY KEY, state TEXT)")
+        conn.execute(f"DELETE FROM {INGESTION_STATE_TABLE} WHERE table_name = ?", (table_name,))
+
+      total_size -= size_bytes or 0
+      evicted.append(dataset_id)
+      self.count_change(connection)
+      print(f"Dataset {dataset_id} evicted from catalog: table {table_name} dropped.")
+
+    return evicted
+
+  def run_maintenance(self, database_connector: SQLiteDatabaseConnector) -> None:
+    """
+    Run ANALYZE when enough tables changed (or some changed a while ago), and VACUUM when the file has too many free pages, at most once per vacuum_interval.
+
+    Parameters:
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database
+    """
+
+    connection = database_connector.connection
+    self.create_catalog_tables(connection)
+    now = time.time()
+
+    last_analyze, changes = connection.execute(f"SELECT last_run, changes FROM {MAINTENANCE_TABLE} WHERE task = 'analyze'").fetchone() or (now, 0)
+    if changes >= self.analyze_every or (changes > 0 and now - last_analyze >= self.analyze_interval):
+      print("Running ANALYZE on SQLite database...")
+      with connection as conn:
+        conn.execute("ANALYZE")
+        conn.execute(f"INSERT OR REPLACE INTO {MAINTENANCE_TABLE} (task, last_run, changes) VALUES ('analyze', ?, 0)", (now,))
+
+    last_vacuum = (connection.execute(f"SELECT last_run FROM {MAINTENANCE_TABLE} WHERE task = 'vacuum'").fetchone() or (0,))[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+    if page_count and freelist_count / page_count >= self.vacuum_min_free_ratio and now - last_vacuum >= self.vacuum_interval:
+      print(f"Running VACUUM on SQLite database ({freelist_count} of {page_count} pages free)...")
+      # VACUUM can't run inside a transaction
+      connection.commit()
+      connection.execute("VACUUM")
+      with connection as conn:
+        conn.execute(f"INSERT OR REPLACE INTO {MAINTENANCE_TABLE} (task, last_run, changes) VALUES ('vacuum', ?, 0)", (now,))
+
+  def count_change(self, connection: sqlite3.Connection) -> None:
+    """
+    Count a created or dropped table towards the next ANALYZE.
+
+    Parameters:
+    connection (sqlite3.Connection): Connection to the SQLite database
+    """
+
+    with connection as conn:
+      conn.execute(f"INSERT OR IGNORE INTO {MAINTENANCE_TABLE} (task, last_run, changes) VALUES ('analyze', ?, 0)", (time.time(),))
+      conn.execute(f"UPDATE {MAINTENANCE_TABLE} SET changes = changes + 1 WHERE task = 'analyze'")
+
+def get_table_size(connection: sqlite3.Connection, table_name: str) -> int:
+  """
+  Get the size of a table (with its indexes) in the SQLite database file.
+  Uses the dbstat virtual table, or the approximate number of rows times the average row size if SQLite was compiled without it.
+
+  Parameters:
+  connection (sqlite3.Connection): Connection to the SQLite database
+  table_name (str): Name of SQL table
+
+  Returns:
+  int: Size in bytes
+  """
+
+  try:
+    return connection.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ? OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = ?)", (table_name, table_name)).fetchone()[0]
+
+  except sqlite3.OperationalError:
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    total_rows = 0
+    table_rows = 0
+
+    for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+      try:
+        rows = connection.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM "{name}"').fetchone()[0]
+      except sqlite3.OperationalError:
+        # WITHOUT ROWID tables
+        rows = 0
+      total_rows += rows
+      table_rows += rows if name == table_name else 0
+
+    return int(page_size * page_count * table_rows / total_rows) if total_rows else 0
@@ -0,0 +1,122 @@
+import os
+import sys
+import argparse
+import contextlib
+from typing import List, Optional
+
+# Only the standard library is imported at module level, so --help and argument errors are fast.
+# pandas, pydantic, LiteLLM and the file reading engines are imported when a query actually runs, and only the ones it needs.
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+  """
+  Parse the command-line arguments.
+
+  Parameters:
+  argv (Optional[List[str]]): Arguments, without the program name. Defaults to sys.argv. Optional
+
+  Returns:
+  argparse.Namespace: Parsed arguments
+  """
+
+  parser = argparse.ArgumentParser(prog="text_to_sql", description="Query CSV, TSV and Excel files (possibly compressed with gzip or zstd) with a natural language prompt.")
+  parser.add_argument("file_paths", nargs="+", help="Dataset files. Several files are queried together as related tables")
+  parser.add_argument("-p", "--prompt", required=True, help="Natural language prompt to query the dataset")
+  parser.add_argument("-m", "--model", default=os.getenv("MODEL_NAME"), help="LiteLLM model name (defaults to the MODEL_NAME environment variable)")
+  parser.add_argument("--local", action="store_true", help="Answer simple prompts with local rules, and only call the LLM (if --model is set) for the others")
+  parser.add_argument("--db", default="text_to_sql.db", help="SQLite database file")
+  parser.add_argument("--catalog", action="store_true", help="Keep each file in its own table and reuse it while the file doesn't change")
+  parser.add_argument("--incremental", action="store_true", help="Only ingest the new lines of append-only CSV/TSV files")
+  parser.add_argument("-o", "--output", help="JSON file where the result is saved")
+  parser.add_argument("-v", "--verbose", action="store_true", help="Print progress messages (to stderr)")
+
+  args = parser.parse_args(argv)
+
+  if not args.model and not args.local:
+    parser.error("a model is needed: use --model, set MODEL_NAME, or use --local")
+
+  return args
+
+def create_text_to_sql(args: argparse.Namespace):
+  """
+  Create the TextToSQL object for the arguments, importing only the components it uses.
+
+  Parameters:
+  args (argparse.Namespace): Parsed arguments
+
+  Returns:
+  TextToSQL: TextToSQL object
+  """
+
+  from text_to_sql_package.text_to_sql import TextToSQL
+  from text_to_sql_package.data_loaders.data_loader_registry import DataLoaderRegistry
+  from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+  from text_to_sql_package.data_validators.pydantic_validator import PydanticValidator
+
+  database_connector = SQLiteDatabaseConnector(db_path=args.db)
+
+  llm_provider = None
+  if args.model:
+    from text_to_sql_package.llm_providers.litellm_provider import LiteLLMProvider
+    llm_provider = LiteLLMProvider(model_name=args.model)
+
+  if args.local:
+    from text_to_sql_package.llm_providers.rule_based_provider import RuleBasedLLMProvider
+    llm_provider = RuleBasedLLMProvider(database_connector=database_connector, fallback_provider=llm_provider)
+
+  catalog = None
+  if args.catalog:
+    from text_to_sql_package.catalogs.sqlite_catalog import SQLiteCatalog
+    catalog = SQLiteCatalog()
+
+  return TextToSQL(
+    data_loader=DataLoaderRegistry(),
+    llm_provider=llm_provider,
+    database_connector=database_connector,
+    data_validator=PydanticValidator(),
+    incremental=args.incremental,
+    catalog=catalog,
+  )
+
+def main(argv: Optional[List[str]] = None) -> int:
+  """
+  Run a query from the command line, and print the result (list of JSONs) to stdout.
+
+  Parameters:
+  argv (Optional[List[str]]): Arguments, without the program name. Defaults to sys.argv. Optional
+
+  Returns:
+  int: Exit code, 0 if the query ran, 1 if it failed or was rejected
+  """
+
+  args = parse_args(argv)
+
+  # Progress messages go to stderr (or nowhere), so stdout only has the result
+  log_file = sys.stderr if args.verbose else open(os.devnull, "w")
+
+  try:
+    with contextlib.redirect_stdout(log_file):
+      with create_text_to_sql(args) as text_to_sql:
+        if len(args.file_paths) == 1:
+          result = text_to_sql.extract_data_from_file_with_prompt(file_path=args.file_paths[0], user_prompt=args.prompt)
+        else:
+          result = text_to_sql.extract_data_from_files_with_prompt(file_paths=args.file_paths, user_prompt=args.prompt)
+
+      if args.output:
+        from text_to_sql_package.utils.file_utils import save_json_to_file
+        save_json_to_file(json_str=result, file_path=args.output)
+
+  except Exception as e:
+    print(f"Error running query: {e}", file=sys.stderr)
+    return 1
+
+  finally:
+    if log_file is not sys.stderr:
+      log_file.close()
+
+  print(result)
+
+  if text_to_sql.last_error:
+    print(f"Query failed: {text_to_sql.last_error['message']}", file=sys.stderr)
+    return 1
+
+  return 0
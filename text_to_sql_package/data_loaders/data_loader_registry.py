@@ -0,0 +1,209 @@
+import csv
+import importlib.util
+import pandas as pd
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from text_to_sql_package.utils.dataframe_utils import clean_dataframe
+from text_to_sql_package.utils.file_utils import check_file_exists
+from text_to_sql_package.utils.format_utils import sniff_file_format, open_decompressed
+
+# A reader takes a binary stream with the (decompressed) content of the file and the delimiter (None for Excel), and returns a dataframe
+Reader = Callable[[BinaryIO, Optional[str]], pd.DataFrame]
+
+# Values read as null by the pyarrow and polars engines, the same as the default of pandas.read_csv
+NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+class DataLoaderRegistry:
+
+  """
+  DataLoader for every supported file type. The format, compression and delimiter of a file are sniffed from its content,
+  and the file is read with the fastest installed engine for its format (e.g. pyarrow, then polars, then pandas for delimited text).
+  If an engine fails on a file, the next one is tried.
+  """
+
+  def __init__(self, engines: Optional[Dict[str, List[str]]] = None, compact: bool = False):
+    """
+    Class constructor.
+
+    Parameters:
+    engines (Optional[Dict[str, List[str]]]): Names of the engines to use by format ('delimited' or 'excel'), fastest first. Defaults to all registered engines. Optional
+    compact (bool): If True, dataframes use memory-compact data types (downcast numbers, category or Arrow-backed strings, nullable types instead of filled null values). Optional
+    """
+
+    # Registered engines by format, fastest first: (name, module that must be installed, reader)
+    self.readers: Dict[str, List[Tuple[str, Optional[str], Reader]]] = {"delimited": [], "excel": []}
+    self.engines = engines or {}
+    self.compact = compact
+
+    self.register_reader("delimited", "pyarrow", read_delimited_with_pyarrow, required_module="pyarrow")
+    self.register_reader("delimited", "polars", read_delimited_with_polars, required_module="polars")
+    self.register_reader("delimited", "pandas", read_delimited_with_pandas)
+    self.register_reader("excel", "calamine", read_excel_with_calamine, required_module="python_calamine")
+    self.register_reader("excel", "pandas", read_excel_with_pandas)
+
+  def register_reader(self, file_format: str, name: str, reader: Reader, required_module: Optional[str] = None, first: bool = False) -> None:
+    """
+    Register an engine to read a file format.
+
+    Parameters:
+    file_format (str): File format ('delimited', 'excel', or a new one)
+    name (str): Engine name
+    reader (Reader): Function that reads a binary stream (and delimiter) into a dataframe
+    required_module (Optional[str]): Module that must be installed to use the engine. Optional
+    first (bool): If True, the engine is tried before the ones already registered. Otherwise, after them. Optional
+    """
+
+    readers = self.readers.setdefault(file_format, [])
+    readers = [reader_entry for reader_entry in readers if reader_entry[0] != name]
+    entry = (name, required_module, reader)
+    self.readers[file_format] = [entry] + readers if first else readers + [entry]
+
+  def available_readers(self, file_format: str) -> List[Tuple[str, Reader]]:
+    """
+    Get the engines that can read a file format, in the order they are tried. Only installed engines are returned, and the modules are not imported.
+
+    Parameters:
+    file_format (str): File format
+
+    Returns:
+    List[Tuple[str, Reader]]: Engine names and readers
+    """
+
+    readers = [(name, reader) for name, required_module, reader in self.readers.get(file_format, []) if required_module is None or importlib.util.find_spec(required_module)]
+
+    if file_format in self.engines:
+      readers = [(name, reader) for engine in self.engines[file_format] for name, reader in readers if name == engine]
+
+    return readers
+
+  def load_data(self, file_path: str) -> pd.DataFrame:
+    """
+    Loads data from the specified file path into a Pandas dataframe, whatever its type.
+
+    Parameters:
+    file_path (str): File path to given dataset (Excel/csv/tsv file, possibly compressed with gzip or zstd)
+
+    Returns:
+    pd.DataFrame: Content of dataset in a Pandas dataframe
+    """
+
+    # Check if the file exists
+    check_file_exists(file_path=file_path)
+
+    file_format, compression, delimiter = sniff_file_format(file_path)
+    print(f"Detected file format: {file_format} (compression: {compression}, delimiter: {delimiter!r}).")
+
+    readers = self.available_readers(file_format)
+    if not readers:
+      raise ValueError(f"No engine available to read {file_format} files")
+
+    df = None
+    for name, reader in readers:
+      print(f"Loading {file_format} file with {name}: {file_path}...")
+
+      try:
+        # The file is opened again for each engine, since a stream can only be read once
+        with open_decompressed(file_path, compression) as stream:
+          df = reader(stream, delimiter)
+        break
+
+      except Exception as e:
+        print(f"Error reading file with {name}: {e}")
+        last_error = e
+
+    if df is None:
+      raise last_error
+
+    # Dataframe cleanup
+    df = clean_dataframe(df, compact=self.compact)
+
+    print("File loaded onto dataframe and cleaned.")
+
+    return df
+
+def read_delimited_with_pyarrow(stream: BinaryIO, delimiter: Optional[str]) -> pd.DataFrame:
+  """
+  Read delimited text with the multithreaded pyarrow CSV reader.
+  Every column is read as a string, so that data types are inferred by clean_dataframe as with the other engines (e.g. dates stay strings).
+
+  Parameters:
+  stream (BinaryIO): Binary stream with the content of the file
+  delimiter (Optional[str]): Delimiter
+
+  Returns:
+  pd.DataFrame: Content of the file
+  """
+
+  import pyarrow
+  from pyarrow import csv as arrow_csv
+
+  delimiter = delimiter or ','
+
+  # The column names are needed to set the type of every column, so the header is read first
+  column_names = next(csv.reader([stream.readline().decode('utf-8-sig')], delimiter=delimiter))
+
+  table = arrow_csv.read_csv(
+    stream,
+    read_options=arrow_csv.ReadOptions(column_names=column_names),
+    parse_options=arrow_csv.ParseOptions(delimiter=delimiter),
+    convert_options=arrow_csv.ConvertOptions(column_types={name: pyarrow.string() for name in column_names}, null_values=NULL_VALUES, strings_can_be_null=True),
+  )
+  return table.to_pandas()
+
+def read_delimited_with_polars(stream: BinaryIO, delimiter: Optional[str]) -> pd.DataFrame:
+  """
+  Read delimited text with polars.
+  Every column is read as a string, so that data types are inferred by clean_dataframe as with the other engines (e.g. dates stay strings).
+
+  Parameters:
+  stream (BinaryIO): Binary stream with the content of the file
+  delimiter (Optional[str]): Delimiter
+
+  Returns:
+  pd.DataFrame: Content of the file
+  """
+
+  import polars
+
+  return polars.read_csv(stream, separator=delimiter or ',', infer_schema=False, null_values=NULL_VALUES).to_pandas()
+
+def read_delimited_with_pandas(stream: BinaryIO, delimiter: Optional[str]) -> pd.DataFrame:
+  """
+  Read delimited text with pandas.
+
+  Parameters:
+  stream (BinaryIO): Binary stream with the content of the file
+  delimiter (Optional[str]): Delimiter
+
+  Returns:
+  pd.DataFrame: Content of the file
+  """
+
+  return pd.read_csv(stream, sep=delimiter or ',')
+
+def read_excel_with_calamine(stream: BinaryIO, delimiter: Optional[str]) -> pd.DataFrame:
+  """
+  Read the first sheet of an Excel file with the calamine engine (written in Rust).
+
+  Parameters:
+  stream (BinaryIO): Binary stream with the content of the file
+  delimiter (Optional[str]): Unused
+
+  Returns:
+  pd.DataFrame: Content of the file
+  """
+
+  return pd.read_excel(stream, engine='calamine')
+
+def read_excel_with_pandas(stream: BinaryIO, delimiter: Optional[str]) -> pd.DataFrame:
+  """
+  Read the first sheet of an Excel file with the default pandas engine (openpyxl or xlrd).
+
+  Parameters:
+  stream (BinaryIO): Binary stream with the content of the file
+  delimiter (Optional[str]): Unused
+
+  Returns:
+  pd.DataFrame: Content of the file
+  """
+
+  return pd.read_excel(stream)
@@ -81,10 +81,10 @@ class PydanticValidator:
     fields = {}
     
     for col in df.columns:
-      dtype_str = df[col].dtype.name
+      dtype_str = df[col].dtype.name.lower()
       
       # Map dtype and column name to Pydantic model
-      # Note: Using startswith because Pandas can have int32, int64, datetime64[ns], etc.  
+      # Note: Using startswith (on the lowercase name) because Pandas can have int32, int64, datetime64[ns], nullable Int8, etc.  
       if dtype_str.startswith('int'):
         fields[col] = (Optional[int], None)
       elif dtype_str.startswith('float'):
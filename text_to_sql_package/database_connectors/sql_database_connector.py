@@ -1,4 +1,4 @@
-from typing import Protocol, List, Dict
+from typing import Protocol, List, Dict, Optional
 import pandas as pd
 
 class SQLDatabaseConnector(Protocol):
@@ -33,4 +33,36 @@ class SQLDatabaseConnector(Protocol):
     df (pd.DataFrame): Pandas dataframe to create table
     table_name (str): Name of SQL table
     """
+    ...
+    
+  def append_df_to_table(self, df: pd.DataFrame, table_name: str) -> None:
+    """
+    Append the rows of a Pandas dataframe to an existing SQL table.
+
+    Parameters:
+    df (pd.DataFrame): Pandas dataframe with the new rows
+    table_name (str): Name of SQL table
+    """
+    ...
+    
+  def load_ingestion_state(self, table_name: str) -> Optional[Dict]:
+    """
+    Load the state of the last incremental ingestion into a SQL table.
+
+    Parameters:
+    table_name (str): Name of SQL table
+
+    Returns:
+    Optional[Dict]: Ingestion state, or None if the table was never ingested incrementally or doesn't exist anymore
+    """
+    ...
+    
+  def save_ingestion_state(self, table_name: str, state: Dict) -> None:
+    """
+    Save the state of the last incremental ingestion into a SQL table.
+
+    Parameters:
+    table_name (str): Name of SQL table
+    state (Dict): Ingestion state (JSON serializable)
+    """
     ...
\ No newline at end of file
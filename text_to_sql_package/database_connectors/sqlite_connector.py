@@ -1,7 +1,15 @@
 import sqlite3
-from typing import List, Dict, Self
+import json
+from typing import List, Dict, Optional, Self
 import pandas as pd
 from text_to_sql_package.database_connectors.sql_database_connector import SQLDatabaseConnector
+from text_to_sql_package.utils.dataframe_utils import sql_type_for_dtype
+
+# Table that stores the state of incremental ingestions (offset, fingerprint, statistics)
+INGESTION_STATE_TABLE = "text_to_sql_ingestion_state"
+
+# Number of rows converted to Python values and inserted at a time
+INSERT_CHUNK_SIZE = 50000
 
 class SQLiteDatabaseConnector:
   
@@ -114,14 +122,136 @@ class SQLiteDatabaseConnector:
     try:
       # Create SQL table
       with self.connection as conn:
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        conn.execute(create_table_statement(df=df, table_name=table_name))
+        insert_dataframe(connection=conn, df=df, table_name=table_name)
+        
+        # A replaced table invalidates any previous incremental ingestion
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {INGESTION_STATE_TABLE} (table_name TEXT PRIMARY KEY, state TEXT)")
+        conn.execute(f"DELETE FROM {INGESTION_STATE_TABLE} WHERE table_name = ?", (table_name,))
         print(f"Table {table_name} created.")
       
     except Exception as e:
       print(f"Error creating table {table_name}: {e}")
       raise
     
+  def append_df_to_table(self, df: pd.DataFrame, table_name: str) -> None:
+    """
+    Append the rows of a Pandas dataframe to an existing SQL table.
+
+    Parameters:
+    df (pd.DataFrame): Pandas dataframe with the new rows
+    table_name (str): Name of SQL table
+    """
+    
+    print(f"Appending {len(df)} rows to table {table_name}...")
+
+    try:
+      with self.connection as conn:
+        insert_dataframe(connection=conn, df=df, table_name=table_name)
+        print(f"Rows appended to table {table_name}.")
+      
+    except Exception as e:
+      print(f"Error appending rows to table {table_name}: {e}")
+      raise
+    
+  def load_ingestion_state(self, table_name: str) -> Optional[Dict]:
+    """
+    Load the state of the last incremental ingestion into a SQL table.
+
+    Parameters:
+    table_name (str): Name of SQL table
+
+    Returns:
+    Optional[Dict]: Ingestion state, or None if the table was never ingested incrementally or doesn't exist anymore
+    """
+    
+    try:
+      with self.connection as conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {INGESTION_STATE_TABLE} (table_name TEXT PRIMARY KEY, state TEXT)")
+        row = conn.execute(f"SELECT state FROM {INGESTION_STATE_TABLE} WHERE table_name = ?", (table_name,)).fetchone()
+        
+        # The state of a table that was dropped (e.g. evicted) can't be trusted
+        table_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+      
+    except sqlite3.Error as e:
+      print(f"Error loading ingestion state of table {table_name}: {e}")
+      raise
+    
+    if row and not table_exists:
+      print(f"Ingestion state of table {table_name} ignored: the table doesn't exist.")
+      return None
     
+    return json.loads(row[0]) if row else None
     
+  def save_ingestion_state(self, table_name: str, state: Dict) -> None:
+    """
+    Save the state of the last incremental ingestion into a SQL table.
+
+    Parameters:
+    table_name (str): Name of SQL table
+    state (Dict): Ingestion state (JSON serializable)
+    """
     
-    
\ No newline at end of file
+    try:
+      with self.connection as conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {INGESTION_STATE_TABLE} (table_name TEXT PRIMARY KEY, state TEXT)")
+        conn.execute(f"INSERT OR REPLACE INTO {INGESTION_STATE_TABLE} (table_name, state) VALUES (?, ?)", (table_name, json.dumps(state)))
+      
+    except sqlite3.Error as e:
+      print(f"Error saving ingestion state of table {table_name}: {e}")
+      raise
+
+def create_table_statement(df: pd.DataFrame, table_name: str) -> str:
+  """
+  Create the SQL statement that creates a table for a Pandas dataframe.
+
+  Parameters:
+  df (pd.DataFrame): Pandas dataframe
+  table_name (str): Name of SQL table
+
+  Returns:
+  str: CREATE TABLE statement
+  """
+
+  columns = ", ".join(f'"{col}" {sql_type_for_dtype(dtype)}' for col, dtype in df.dtypes.items())
+  return f'CREATE TABLE "{table_name}" ({columns})'
+
+def insert_dataframe(connection: sqlite3.Connection, df: pd.DataFrame, table_name: str, chunk_size: int = INSERT_CHUNK_SIZE) -> None:
+  """
+  Insert the rows of a Pandas dataframe into an existing SQL table.
+  Rows are converted to Python values one chunk at a time, so compact data types (category, nullable, Arrow-backed strings)
+  are never expanded for the whole dataframe. Null values are inserted as NULL.
+
+  Parameters:
+  connection (sqlite3.Connection): Connection to the SQLite database
+  df (pd.DataFrame): Pandas dataframe with the rows
+  table_name (str): Name of SQL table
+  chunk_size (int): Number of rows inserted at a time. Optional
+  """
+
+  if df.columns.empty:
+    return
+
+  columns = ", ".join(f'"{col}"' for col in df.columns)
+  placeholders = ", ".join("?" for _ in df.columns)
+  statement = f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})'
+
+  # Distinct values of category columns, converted once. Rows only reference them
+  categories = {col: df[col].cat.categories.to_numpy(dtype=object) for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+
+  for start in range(0, len(df), chunk_size):
+    chunk = df.iloc[start:start + chunk_size]
+    values = []
+
+    for col in chunk.columns:
+      series = chunk[col]
+
+      if col in categories:
+        values.append([categories[col][code] if code >= 0 else None for code in series.cat.codes.to_numpy()])
+      elif pd.api.types.is_datetime64_any_dtype(series):
+        values.append([str(value) if not pd.isna(value) else None for value in series])
+      else:
+        values.append(series.to_numpy(dtype=object, na_value=None).tolist())
+
+    connection.executemany(statement, zip(*values))
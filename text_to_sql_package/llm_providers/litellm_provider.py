@@ -1,20 +1,41 @@
-import litellm
-import time
+import re
+from typing import List, Dict, Optional, Union
 from text_to_sql_package.llm_providers.llm_provider import LLMProvider
+from text_to_sql_package.llm_providers.llm_scheduler import LLMScheduler, default_scheduler
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult, SQL_QUERY_RESULT_SCHEMA
+from text_to_sql_package.prompt_builders.prompt_builder import PromptBuilder
+
+# Output modes: free text, tool (function) calling, or JSON schema response format
+OUTPUT_MODES = ('text', 'tool', 'json_schema')
 
 class LiteLLMProvider():
     
-  def __init__(self, model_name: str):
+  def __init__(self, model_name: str, output_mode: str = 'text', max_tokens: Optional[int] = 512, scheduler: Optional[LLMScheduler] = None, priority: int = 0, prompt_builder: Optional[PromptBuilder] = None):
     """
     Class constructor.
     
     Parameters:
     model_name (str): Name of the LLM model
+    output_mode (str): 'text' for a raw SQL answer, 'tool' for tool calling, or 'json_schema' for a JSON schema response format. 
+    The last two return a SQLQueryResult (sql, referenced_columns, expects_aggregate) instead of the SQL query. Optional
+    max_tokens (Optional[int]): Max number of tokens in the LLM answer. Optional
+    scheduler (Optional[LLMScheduler]): Scheduler that coordinates calls with rate limits and backoff. Defaults to the scheduler shared by all providers. Optional
+    priority (int): Priority of this provider's calls in the scheduler queues, lower runs first. Optional
+    prompt_builder (Optional[PromptBuilder]): Builds the messages for the LLM, with a cacheable prefix and few-shot examples. Optional
     """
+    
+    if output_mode not in OUTPUT_MODES:
+      raise ValueError(f"Output mode not accepted: {output_mode}. Only accepts {', '.join(OUTPUT_MODES)}")
+    
     print(f"LiteLLM provider using the following model: {model_name}.")
     self.model_name = model_name
+    self.output_mode = output_mode
+    self.max_tokens = max_tokens
+    self.scheduler = scheduler or default_scheduler
+    self.priority = priority
+    self.prompt_builder = prompt_builder or PromptBuilder()
   
-  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> str:
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> Union[str, SQLQueryResult]:
     """
     Using an LLM, generate a SQL to query a dataset based on a user prompt.
     
@@ -25,40 +46,178 @@ class LiteLLMProvider():
     initial_delay (int): Initial delay between each retry. Optional
 
     Returns:
-    str: SQL query
+    Union[str, SQLQueryResult]: SQL query, or structured output in the 'tool' and 'json_schema' output modes
     """
     
     print(f"Generating SQL query using LiteLLM for user prompt '{user_prompt}'...")
 
-    # Create the message for the LLM in LiteLLM format
-    message = f"""
-    Generate a SQL query for the prompt "{user_prompt}", based on the following table schema:
-    {schema}
+    # Create the messages for the LLM in LiteLLM format
+    messages = self.prompt_builder.build_generation_messages(user_prompt=user_prompt, schema=schema, output_instructions=self.output_instructions())
     
-    Provide ONLY the query, without any explanation. I need to be able to copy paste it into a SQL engine.
-    Do not add any backticks and do not start with the word sql.
+    return self.get_sql_query(messages=messages, max_retries=max_retries, initial_delay=initial_delay)
+  
+  def repair_sql_query(self, user_prompt: str, schema: str, query: str, error: str, max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> Union[str, SQLQueryResult]:
     """
+    Using an LLM, fix a SQL query that failed or returned no rows, based on the error it produced.
+    
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    query (str): SQL query that failed
+    error (str): Error message from the database, or a description of why the result was rejected
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds the repair can take, after which the LLM request is abandoned. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: Fixed SQL query, or structured output in the 'tool' and 'json_schema' output modes
+    """
+    
+    print(f"Repairing SQL query using LiteLLM for user prompt '{user_prompt}'...")
+
+    # Create the messages for the LLM in LiteLLM format
+    messages = self.prompt_builder.build_repair_messages(user_prompt=user_prompt, schema=schema, query=query, error=error, output_instructions=self.output_instructions())
+    
+    return self.get_sql_query(messages=messages, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout)
+  
+  def output_instructions(self) -> str:
+    """
+    Instructions for the LLM on how to format its answer, depending on the output mode.
+    
+    Returns:
+    str: Instructions to add to the messages
+    """
+    
+    if self.output_mode == 'text':
+      return "Provide ONLY the query, without any explanation. Do not add any backticks and do not start with the word sql."
+    
+    return "Return the query, the columns it references and whether it aggregates rows in the requested structured format."
+  
+  def get_sql_query(self, messages: List[Dict], max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> Union[str, SQLQueryResult]:
+    """
+    Send messages to the LLM and extract the SQL query from its answer, depending on the output mode.
+    
+    Parameters:
+    messages (List[Dict]): Messages for the LLM in LiteLLM format
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds after which the LLM request is abandoned. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: SQL query, or structured output in the 'tool' and 'json_schema' output modes
+    """
+    
+    if self.output_mode == 'text':
+      response_message = self.complete(messages=messages, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout)
+      result = clean_sql_response(response_message.content)
+      print(f"SQL query generated: {result}")
+      return result
     
-    # To avoid rate limit, only retry a set number of times
-    for i in range(max_retries):
-      try:
-        # Send message to the LLM
-        response = litellm.completion(model=self.model_name, messages=[{"content": message, "role": "user"}])
-        
-        # Grab first choice from the LLM and access the text content
-        result = response.choices[0].message.content
-        
-        print(f"SQL query generated: {result}")
+    # The structured output is returned to the caller, not kept in the provider, since a provider can be shared between threads
+    result = self.generate_structured_output(messages=messages, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout)
+    print(f"SQL query generated: {result.sql}")
+    return result
+  
+  def generate_structured_output(self, messages: List[Dict], max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> SQLQueryResult:
+    """
+    Send messages to the LLM, forcing a structured answer through tool calling or a JSON schema response format.
+    
+    Parameters:
+    messages (List[Dict]): Messages for the LLM in LiteLLM format
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds after which the LLM request is abandoned. Optional
+
+    Returns:
+    SQLQueryResult: SQL query, referenced columns and whether the query aggregates rows
+    """
+    
+    if self.output_mode == 'tool':
+      tool = {"type": "function", "function": {"name": "return_sql_query", "description": "Return the generated SQL query", "parameters": SQL_QUERY_RESULT_SCHEMA}}
+      response_message = self.complete(messages=messages, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout, tools=[tool], tool_choice={"type": "function", "function": {"name": "return_sql_query"}})
       
-        return result
+      if not response_message.tool_calls:
+        raise ValueError(f"LLM {self.model_name} did not call the return_sql_query tool")
       
-      except litellm.RateLimitError as e:
-        time.sleep(initial_delay)
-        #Increase delay
-        initial_delay *= 2
+      arguments = response_message.tool_calls[0].function.arguments
       
-      except Exception as e:
-        print(f"Error querying LLM {self.model_name}: {e}") 
-        raise
+    else:
+      response_format = {"type": "json_schema", "json_schema": {"name": "sql_query", "schema": SQL_QUERY_RESULT_SCHEMA, "strict": True}}
+      response_message = self.complete(messages=messages, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout, response_format=response_format)
+      arguments = response_message.content
+      
+    result = SQLQueryResult.model_validate_json(arguments)
+    print(f"Structured output from LLM: {result}")
+    return result
+  
+  def complete(self, messages: List[Dict], max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None, **kwargs):
+    """
+    Send messages to the LLM and return the first choice of its answer.
+    
+    Parameters:
+    messages (List[Dict]): Messages for the LLM in LiteLLM format
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds after which the LLM request is abandoned. Optional
+    kwargs: Additional arguments for litellm.completion (e.g. tools, response_format). Optional
 
+    Returns:
+    Message: First choice of the LLM answer
+    """
+    
+    # LiteLLM is slow to import, so it is only imported on the first call to the LLM
+    import litellm
+    
+    # Rough estimate of the tokens of the call (about 4 characters per token), used by the tokens/min limit
+    estimated_tokens = len(str(messages)) // 4 + (self.max_tokens or 0)
+    
+    if timeout is not None:
+      kwargs["timeout"] = timeout
+    
+    try:
+      # Send message to the LLM once the rate limits allow it. Rate limit errors are retried with backoff
+      response = self.scheduler.run(
+        model_name=self.model_name,
+        func=lambda: litellm.completion(model=self.model_name, messages=messages, max_tokens=self.max_tokens, **kwargs),
+        estimated_tokens=estimated_tokens,
+        priority=self.priority,
+        retry_on=(litellm.RateLimitError,),
+        max_retries=max_retries,
+        base_delay=initial_delay
+      )
+      
+    except Exception as e:
+      print(f"Error querying LLM {self.model_name}: {e}") 
+      raise
+    
+    # Correct the tokens/min limit with the actual usage
+    usage = getattr(response, 'usage', None)
+    if getattr(usage, 'total_tokens', None):
+      self.scheduler.record_usage(model_name=self.model_name, estimated_tokens=estimated_tokens, used_tokens=usage.total_tokens)
+    
+    # Grab first choice from the LLM
+    return response.choices[0].message
 
+def clean_sql_response(text: str) -> str:
+  """
+  Extract the SQL query from a free text LLM answer, removing code fences and a leading 'sql' word.
+  
+  Parameters:
+  text (str): Text content of the LLM answer
+  
+  Returns:
+  str: SQL query
+  """
+  
+  if text is None:
+    return text
+  
+  # Keep only the content of the first code fence, if any
+  match = re.search(r'```(?:[A-Za-z]+\s*\n)?\s*(.*?)```', text, flags=re.DOTALL | re.IGNORECASE)
+  if match:
+    text = match.group(1)
+  
+  text = text.strip()
+  text = re.sub(r'^sql\s+', '', text, flags=re.IGNORECASE)
+  
+  return text.strip()
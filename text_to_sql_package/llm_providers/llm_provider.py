@@ -1,10 +1,11 @@
-from typing import Protocol
+from typing import Optional, Protocol, Union
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult
 
 class LLMProvider(Protocol):
   
   """Interface for classes that handle LLM provisions and natural language prompt to SQL query conversion."""
     
-  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> str:
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> Union[str, SQLQueryResult]:
     """
     Using an LLM, generate a SQL to query a dataset based on a user prompt.
     
@@ -15,6 +16,24 @@ class LLMProvider(Protocol):
     initial_delay (int): Initial delay between each retry. Optional
 
     Returns:
-    str: SQL query
+    Union[str, SQLQueryResult]: SQL query, or structured output with the SQL query, its referenced columns and whether it aggregates rows
+    """
+    ...
+    
+  def repair_sql_query(self, user_prompt: str, schema: str, query: str, error: str, max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> Union[str, SQLQueryResult]:
+    """
+    Using an LLM, fix a SQL query that failed or returned no rows, based on the error it produced.
+    
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    query (str): SQL query that failed
+    error (str): Error message from the database, or a description of why the result was rejected
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds the repair can take, after which the LLM request is abandoned. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: Fixed SQL query, or structured output with the fixed SQL query, its referenced columns and whether it aggregates rows
     """
     ...
\ No newline at end of file
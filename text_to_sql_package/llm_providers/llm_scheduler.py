@@ -0,0 +1,323 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, Optional, Tuple, Type, TypeVar
+
+T = TypeVar('T')
+
+# Number of recent wait times kept to compute wait time metrics
+WAIT_TIME_WINDOW = 1000
+
+class TokenBucket:
+
+  """Token bucket that refills continuously at a rate per minute, with a burst capacity of one minute."""
+
+  def __init__(self, rate_per_minute: float, now: Optional[float] = None):
+    """
+    Class constructor.
+
+    Parameters:
+    rate_per_minute (float): Number of units (requests or tokens) allowed per minute
+    now (Optional[float]): Current time. Defaults to time.monotonic(). Optional
+    """
+
+    self.rate_per_minute = rate_per_minute
+    self.capacity = rate_per_minute
+    self.available = rate_per_minute
+    self.updated_at = time.monotonic() if now is None else now
+
+  def refill(self, now: float) -> None:
+    """
+    Add the units earned since the last update.
+
+    Parameters:
+    now (float): Current time
+    """
+
+    self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate_per_minute / 60)
+    self.updated_at = now
+
+  def time_until_available(self, amount: float, now: float) -> float:
+    """
+    Time to wait until the bucket has enough units. Amounts larger than the capacity only need a full bucket.
+
+    Parameters:
+    amount (float): Number of units needed
+    now (float): Current time
+
+    Returns:
+    float: Time to wait in seconds (0 if available now)
+    """
+
+    self.refill(now)
+    missing = min(amount, self.capacity) - self.available
+    return max(0.0, missing * 60 / self.rate_per_minute)
+
+  def consume(self, amount: float) -> None:
+    """
+    Take units from the bucket. The bucket can go negative to account for usage that was underestimated.
+
+    Parameters:
+    amount (float): Number of units to take
+    """
+
+    self.available -= amount
+
+class LLMScheduler:
+
+  """
+  Scheduler shared by LLM providers to coordinate calls to rate-limited models.
+  Requests for a model wait in a priority queue until the model's requests/min and tokens/min buckets allow them.
+  Rate limit errors pause the model for every caller, with jittered exponential backoff or the delay given by Retry-After.
+  """
+
+  def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0, clock: Callable[[], float] = time.monotonic):
+    """
+    Class constructor.
+
+    Parameters:
+    limits (Optional[Dict[str, Dict[str, float]]]): Limits by model name, with keys requests_per_minute and tokens_per_minute. Models without limits are not throttled. Optional
+    max_retries (int): Default max number of attempts per request when rate limited. Optional
+    base_delay (float): Default initial backoff delay in seconds, doubled on each retry. Optional
+    max_delay (float): Max backoff delay in seconds. Optional
+    clock (Callable[[], float]): Function that returns the current time in seconds, used for rate limits, pauses and wait times. Optional
+    """
+
+    self.clock = clock
+    self.max_retries = max_retries
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+
+    self.condition = threading.Condition()
+    self.request_buckets: Dict[str, TokenBucket] = {}
+    self.token_buckets: Dict[str, TokenBucket] = {}
+    self.queues: Dict[str, list] = {}
+    self.paused_until: Dict[str, float] = {}
+    self.sequence = itertools.count()
+
+    self.wait_times: Deque[float] = deque(maxlen=WAIT_TIME_WINDOW)
+    self.counters = {"requests": 0, "rate_limited": 0, "failed": 0}
+
+    for model_name, model_limits in (limits or {}).items():
+      self.set_limits(model_name=model_name, **model_limits)
+
+  def set_limits(self, model_name: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> None:
+    """
+    Set the rate limits of a model.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    requests_per_minute (Optional[float]): Max number of requests per minute. None for no limit. Optional
+    tokens_per_minute (Optional[float]): Max number of tokens per minute. None for no limit. Optional
+    """
+
+    with self.condition:
+      for buckets, rate in ((self.request_buckets, requests_per_minute), (self.token_buckets, tokens_per_minute)):
+        if rate is None:
+          buckets.pop(model_name, None)
+        else:
+          buckets[model_name] = TokenBucket(rate_per_minute=rate, now=self.clock())
+
+      self.condition.notify_all()
+
+  def run(self, model_name: str, func: Callable[[], T], estimated_tokens: int = 0, priority: int = 0, retry_on: Tuple[Type[Exception], ...] = (), max_retries: Optional[int] = None, base_delay: Optional[float] = None) -> T:
+    """
+    Run a call to an LLM model once its rate limits allow it, retrying with backoff on rate limit errors.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    func (Callable[[], T]): Function that calls the LLM
+    estimated_tokens (int): Estimated number of tokens of the call (prompt and answer). Optional
+    priority (int): Priority of the call, lower runs first. Optional
+    retry_on (Tuple[Type[Exception], ...]): Rate limit exceptions that trigger a retry. Optional
+    max_retries (Optional[int]): Max number of attempts, instead of the scheduler default. There is always at least one attempt. Optional
+    base_delay (Optional[float]): Initial backoff delay in seconds, instead of the scheduler default. Optional
+
+    Returns:
+    T: Result of func
+
+    Raises:
+    Exception: The last rate limit error once max_retries is reached, or any other error raised by func
+    """
+
+    max_retries = max(1, self.max_retries if max_retries is None else max_retries)
+    delay = self.base_delay if base_delay is None else base_delay
+
+    for attempt in range(max_retries):
+      self.acquire(model_name=model_name, estimated_tokens=estimated_tokens, priority=priority)
+
+      try:
+        return func()
+
+      except retry_on as e:
+        with self.condition:
+          self.counters["rate_limited"] += 1
+
+        if attempt == max_retries - 1:
+          with self.condition:
+            self.counters["failed"] += 1
+          print(f"LLM {model_name} still rate limited after {max_retries} attempts.")
+          raise
+
+        # Honor Retry-After if the provider sent it, otherwise use exponential backoff with full jitter
+        retry_after = get_retry_after(e)
+        backoff = retry_after if retry_after is not None else random.uniform(0, min(self.max_delay, delay * 2 ** attempt))
+        print(f"LLM {model_name} rate limited. Pausing requests for {backoff:.2f} seconds...")
+        self.pause(model_name=model_name, seconds=backoff)
+
+  def acquire(self, model_name: str, estimated_tokens: int = 0, priority: int = 0) -> None:
+    """
+    Wait in the model's priority queue until the request can be sent, then take it from the buckets.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    estimated_tokens (int): Estimated number of tokens of the request. Optional
+    priority (int): Priority of the request, lower runs first. Optional
+    """
+
+    enqueued_at = self.clock()
+    ticket = (priority, next(self.sequence))
+
+    with self.condition:
+      queue = self.queues.setdefault(model_name, [])
+      heapq.heappush(queue, ticket)
+
+      try:
+        while True:
+          # Only the head of the queue can go, once the model is not paused and the buckets allow it
+          if queue[0] == ticket:
+            wait = self.time_until_ready(model_name=model_name, estimated_tokens=estimated_tokens, now=self.clock())
+            if wait <= 0:
+              break
+            self.condition.wait(timeout=wait)
+          else:
+            self.condition.wait()
+
+        heapq.heappop(queue)
+
+        if model_name in self.request_buckets:
+          self.request_buckets[model_name].consume(1)
+        if model_name in self.token_buckets:
+          self.token_buckets[model_name].consume(estimated_tokens)
+
+        self.counters["requests"] += 1
+        self.wait_times.append(self.clock() - enqueued_at)
+
+      except BaseException:
+        # Leave the queue if interrupted while waiting
+        if ticket in queue:
+          queue.remove(ticket)
+          heapq.heapify(queue)
+        raise
+
+      finally:
+        self.condition.notify_all()
+
+  def time_until_ready(self, model_name: str, estimated_tokens: int, now: float) -> float:
+    """
+    Time to wait until a request for the model can be sent. Must be called with the condition held.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    estimated_tokens (int): Estimated number of tokens of the request
+    now (float): Current time
+
+    Returns:
+    float: Time to wait in seconds (0 if the request can be sent now)
+    """
+
+    waits = [self.paused_until.get(model_name, 0) - now]
+
+    if model_name in self.request_buckets:
+      waits.append(self.request_buckets[model_name].time_until_available(1, now))
+    if model_name in self.token_buckets:
+      waits.append(self.token_buckets[model_name].time_until_available(estimated_tokens, now))
+
+    return max(waits)
+
+  def pause(self, model_name: str, seconds: float) -> None:
+    """
+    Pause all requests for a model, for example after a rate limit error.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    seconds (float): Duration of the pause in seconds
+    """
+
+    with self.condition:
+      self.paused_until[model_name] = max(self.paused_until.get(model_name, 0), self.clock() + seconds)
+      self.condition.notify_all()
+
+  def record_usage(self, model_name: str, estimated_tokens: int, used_tokens: int) -> None:
+    """
+    Correct the tokens/min bucket of a model with the actual usage of a request.
+
+    Parameters:
+    model_name (str): Name of the LLM model
+    estimated_tokens (int): Number of tokens taken from the bucket for the request
+    used_tokens (int): Number of tokens actually used by the request
+    """
+
+    with self.condition:
+      if model_name in self.token_buckets:
+        self.token_buckets[model_name].consume(used_tokens - estimated_tokens)
+      self.condition.notify_all()
+
+  def get_metrics(self) -> Dict:
+    """
+    Get the scheduler metrics.
+
+    Returns:
+    Dict: Queue depth by model, request counters, and wait time statistics (in seconds) of recent requests
+    """
+
+    with self.condition:
+      wait_times = sorted(self.wait_times)
+
+      return {
+        "queue_depth": {model_name: len(queue) for model_name, queue in self.queues.items()},
+        **self.counters,
+        "wait_time": {
+          "avg": sum(wait_times) / len(wait_times) if wait_times else 0.0,
+          "p95": wait_times[int(0.95 * (len(wait_times) - 1))] if wait_times else 0.0,
+          "max": wait_times[-1] if wait_times else 0.0,
+        },
+      }
+
+def get_retry_after(error: Exception) -> Optional[float]:
+  """
+  Get the delay requested by the provider in the Retry-After (or retry-after-ms) header of a rate limit error.
+
+  Parameters:
+  error (Exception): Rate limit error
+
+  Returns:
+  Optional[float]: Delay in seconds, or None if the provider didn't send one
+  """
+
+  response = getattr(error, 'response', None)
+  headers = getattr(response, 'headers', None) or getattr(error, 'litellm_response_headers', None) or {}
+
+  try:
+    if headers.get('retry-after-ms') is not None:
+      return float(headers['retry-after-ms']) / 1000
+
+    retry_after = headers.get('retry-after')
+    if retry_after is None:
+      return None
+
+    # Retry-After can be a number of seconds or an HTTP date
+    try:
+      return max(0.0, float(retry_after))
+    except ValueError:
+      return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+
+  except (TypeError, ValueError, AttributeError):
+    return None
+
+# Scheduler shared by default between all providers in the process
+default_scheduler = LLMScheduler()
@@ -0,0 +1,324 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Deque, Dict, List, Optional, Union
+from text_to_sql_package.llm_providers.llm_provider import LLMProvider
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult
+
+class BackendStats:
+
+  """Rolling latency and error statistics of an LLM backend."""
+
+  def __init__(self, window: int):
+    """
+    Class constructor.
+
+    Parameters:
+    window (int): Number of recent requests kept in the statistics
+    """
+
+    self.latencies: Deque[float] = deque(maxlen=window)
+    self.outcomes: Deque[bool] = deque(maxlen=window)
+    self.requests = 0
+    self.hedges = 0
+    self.hedge_wins = 0
+    self.recoveries = 0
+
+    # Time (time.monotonic) when the last request was sent to the backend
+    self.last_request: Optional[float] = None
+
+  def record(self, latency: float, success: bool) -> None:
+    """
+    Record the result of a request.
+
+    Parameters:
+    latency (float): Duration of the request in seconds
+    success (bool): True if the request succeeded
+    """
+
+    self.requests += 1
+    self.outcomes.append(success)
+
+    # Only successful requests are representative of the latency
+    if success:
+      self.latencies.append(latency)
+
+  def percentile(self, percentile: float) -> Optional[float]:
+    """
+    Latency percentile of the recent successful requests.
+
+    Parameters:
+    percentile (float): Percentile between 0 and 1 (e.g. 0.95)
+
+    Returns:
+    Optional[float]: Latency in seconds, or None if there are no successful requests yet
+    """
+
+    if not self.latencies:
+      return None
+
+    latencies = sorted(self.latencies)
+    return latencies[int(percentile * (len(latencies) - 1))]
+
+  def error_rate(self) -> float:
+    """
+    Share of recent requests that failed.
+
+    Returns:
+    float: Error rate between 0 and 1
+    """
+
+    if not self.outcomes:
+      return 0.0
+
+    return 1 - sum(self.outcomes) / len(self.outcomes)
+
+class RouterLLMProvider:
+
+  def __init__(self, providers: Dict[str, LLMProvider], hedge: bool = False, hedge_percentile: float = 0.95, default_hedge_delay: float = 2.0, max_error_rate: float = 0.5, min_samples: int = 5, window: int = 100, probe_interval: float = 30.0):
+    """
+    Class constructor.
+
+    Parameters:
+    providers (Dict[str, LLMProvider]): LLM backends by name
+    hedge (bool): If True, a duplicate request is sent to the second best backend when the first one is slower than its hedge_percentile latency. Optional
+    hedge_percentile (float): Latency percentile of the first backend after which the request is hedged. Optional
+    default_hedge_delay (float): Delay in seconds before hedging while a backend has fewer than min_samples successful requests. Optional
+    max_error_rate (float): Error rate above which a backend is considered unhealthy. Optional
+    min_samples (int): Number of requests needed before latency percentiles and error rates are trusted. Optional
+    window (int): Number of recent requests per backend kept in the statistics. Optional
+    probe_interval (float): Time in seconds after which an unhealthy backend gets a request again, to check if it recovered. Optional
+    """
+
+    if not providers:
+      raise ValueError("RouterLLMProvider needs at least one LLM provider")
+
+    print(f"Router LLM provider using the following backends: {list(providers)}.")
+    self.providers = providers
+    self.hedge = hedge
+    self.hedge_percentile = hedge_percentile
+    self.default_hedge_delay = default_hedge_delay
+    self.max_error_rate = max_error_rate
+    self.min_samples = min_samples
+    self.probe_interval = probe_interval
+
+    self.stats = {name: BackendStats(window=window) for name in providers}
+    self.lock = threading.Lock()
+    self.executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(providers)), thread_name_prefix="llm-router")
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> Union[str, SQLQueryResult]:
+    """
+    Generate a SQL query with the fastest healthy LLM backend, hedging the request if enabled.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: SQL query, or structured output of the backend
+    """
+
+    return self.route('generate_sql_query', user_prompt=user_prompt, schema=schema, max_retries=max_retries, initial_delay=initial_delay)
+
+  def repair_sql_query(self, user_prompt: str, schema: str, query: str, error: str, max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> Union[str, SQLQueryResult]:
+    """
+    Fix a SQL query that failed or returned no rows with the fastest healthy LLM backend, hedging the request if enabled.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    query (str): SQL query that failed
+    error (str): Error message from the database, or a description of why the result was rejected
+    max_retries (int): Max number of times that the LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry. Optional
+    timeout (Optional[float]): Time in seconds the repair can take, after which the LLM request is abandoned. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: Fixed SQL query, or structured output of the backend
+    """
+
+    return self.route('repair_sql_query', user_prompt=user_prompt, schema=schema, query=query, error=error, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout)
+
+  def rank_backends(self) -> List[str]:
+    """
+    Rank the backends: healthy ones first, by median latency. Backends without latency data yet are tried first so they get measured.
+    An unhealthy backend that didn't get a request for probe_interval seconds is ranked first, so that it is probed (and the request fails over if it is still down).
+
+    Returns:
+    List[str]: Backend names, best first
+    """
+
+    now = time.monotonic()
+
+    with self.lock:
+      def sort_key(name: str):
+        stats = self.stats[name]
+        health = 1
+        if self.is_unhealthy(name):
+          health = 0 if stats.last_request is None or now - stats.last_request >= self.probe_interval else 2
+        median = stats.percentile(0.5)
+        return (health, median is not None, median or 0.0, stats.error_rate())
+
+      return sorted(self.providers, key=sort_key)
+
+  def is_unhealthy(self, name: str) -> bool:
+    """
+    Check if the recent error rate of a backend is above max_error_rate. Must be called with the lock held.
+
+    Parameters:
+    name (str): Backend name
+
+    Returns:
+    bool: True if the backend is unhealthy
+    """
+
+    stats = self.stats[name]
+    return len(stats.outcomes) >= self.min_samples and stats.error_rate() > self.max_error_rate
+
+  def hedge_delay(self, name: str) -> float:
+    """
+    Delay after which a request to a backend is hedged.
+
+    Parameters:
+    name (str): Backend name
+
+    Returns:
+    float: Delay in seconds
+    """
+
+    with self.lock:
+      stats = self.stats[name]
+      if len(stats.latencies) < self.min_samples:
+        return self.default_hedge_delay
+      return stats.percentile(self.hedge_percentile)
+
+  def call_backend(self, name: str, method: str, **kwargs) -> Union[str, SQLQueryResult]:
+    """
+    Call a method of a backend and record its latency and outcome.
+
+    Parameters:
+    name (str): Backend name
+    method (str): Name of the LLMProvider method to call
+    kwargs: Arguments of the method
+
+    Returns:
+    Union[str, SQLQueryResult]: Result of the method
+    """
+
+    start = time.monotonic()
+    success = False
+
+    with self.lock:
+      self.stats[name].last_request = start
+
+    try:
+      result = getattr(self.providers[name], method)(**kwargs)
+      success = result is not None
+      return result
+
+    finally:
+      with self.lock:
+        stats = self.stats[name]
+        unhealthy = self.is_unhealthy(name)
+        stats.record(latency=time.monotonic() - start, success=success)
+
+        # A successful probe of an unhealthy backend forgets its past errors, so it gets traffic again right away
+        if unhealthy and success:
+          print(f"LLM backend {name} recovered.")
+          stats.outcomes.clear()
+          stats.recoveries += 1
+
+  def route(self, method: str, **kwargs) -> Union[str, SQLQueryResult]:
+    """
+    Send a request to the best backend. With hedging, a duplicate is sent to the second best backend if the first one is slow, and the first answer wins.
+    If a backend fails, the request is sent to the next one.
+
+    Parameters:
+    method (str): Name of the LLMProvider method to call
+    kwargs: Arguments of the method
+
+    Returns:
+    Union[str, SQLQueryResult]: Result of the first backend that succeeded
+    """
+
+    ranking = self.rank_backends()
+    pending = {}
+    hedged = set()
+    last_error = None
+
+    while ranking or pending:
+      # Send the request to the next backend if nothing is running
+      if not pending:
+        name = ranking.pop(0)
+        print(f"Routing LLM request to backend {name}...")
+        pending[self.executor.submit(self.call_backend, name, method, **kwargs)] = name
+
+      # Wait for an answer, or for the hedge delay of the running backend
+      timeout = None
+      if self.hedge and ranking and len(pending) == 1:
+        timeout = self.hedge_delay(next(iter(pending.values())))
+
+      done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+      if not done:
+        # Hedge: send a duplicate to the next backend
+        name = ranking.pop(0)
+        print(f"LLM request is slow. Hedging with backend {name}...")
+        hedged.add(name)
+        with self.lock:
+          self.stats[name].hedges += 1
+        pending[self.executor.submit(self.call_backend, name, method, **kwargs)] = name
+        continue
+
+      for future in done:
+        name = pending.pop(future)
+
+        try:
+          result = future.result()
+        except Exception as e:
+          print(f"Error from LLM backend {name}: {e}")
+          last_error = e
+          continue
+
+        if result is None:
+          continue
+
+        # The other request can't be interrupted once running: cancel it if it didn't start, and ignore its answer
+        for loser in pending:
+          loser.cancel()
+
+        if name in hedged:
+          with self.lock:
+            self.stats[name].hedge_wins += 1
+
+        return result
+
+    if last_error:
+      raise last_error
+
+    raise ValueError(f"No LLM backend returned an answer for {method}")
+
+  def get_metrics(self) -> Dict:
+    """
+    Get the statistics of each backend.
+
+    Returns:
+    Dict: By backend name, number of requests, median and p95 latency in seconds, error rate, number of hedged requests and how many of them won, and number of recoveries
+    """
+
+    with self.lock:
+      return {
+        name: {
+          "requests": stats.requests,
+          "p50": stats.percentile(0.5),
+          "p95": stats.percentile(0.95),
+          "error_rate": stats.error_rate(),
+          "hedges": stats.hedges,
+          "hedge_wins": stats.hedge_wins,
+          "recoveries": stats.recoveries,
+        }
+        for name, stats in self.stats.items()
+      }
@@ -0,0 +1,332 @@
+import re
+import threading
+from typing import List, Dict, Optional, Tuple, Union
+from text_to_sql_package.llm_providers.llm_provider import LLMProvider
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult
+from text_to_sql_package.database_connectors.sql_database_connector import SQLDatabaseConnector
+from text_to_sql_package.utils.dataframe_utils import parse_schema
+
+# Max number of distinct values of a text column that are matched against prompts
+MAX_KNOWN_VALUES = 50
+
+# Words that don't change the meaning of a simple query
+STOPWORDS = {
+  'a', 'an', 'the', 'all', 'any', 'every', 'each', 'of', 'in', 'on', 'at', 'for', 'to', 'with', 'from', 'and', 'where', 'which', 'who', 'whose', 'that',
+  'is', 'are', 'was', 'were', 'be', 'has', 'have', 'do', 'does', 'me', 'my', 'our', 'us', 'i', 'we', 'you', 'please', 'can', 'could', 'would',
+  'give', 'show', 'list', 'get', 'find', 'display', 'return', 'tell', 'what', 'there', 'table', 'dataset',
+  'row', 'rows', 'record', 'records', 'entry', 'entries', 'data', 'information', 'info', 'details', 'everything', 'items', 'people', 'members', 'results',
+}
+
+# Words that change the meaning of a query in ways the rules don't handle
+NEGATIONS = {'not', 'no', 'except', 'without', 'excluding', 'never', 'neither', 'nor', 'other', 'than', 'between'}
+
+# Words that change the shape of a query (ordering, superlatives, distinct values, comparisons between groups). If the rules don't explain one, they can't answer
+SHAPE_WORDS = {
+  'most', 'least', 'distinct', 'unique', 'different', 'vs', 'versus', 'per', 'compare', 'compared', 'rank', 'ranked', 'ranking',
+  'sort', 'sorted', 'order', 'ordered', 'alphabetically', 'alphabetical', 'ascending', 'descending', 'group', 'grouped',
+}
+
+# Superlatives (oldest, highest, latest, etc.) are shape words too
+SUPERLATIVE = r'[a-z]{2,}est'
+
+# Aggregate functions and the words that ask for them
+AGGREGATES = {
+  'AVG': r'average|mean|avg',
+  'SUM': r'sum|total',
+  'MAX': r'maximum|max|highest|largest|biggest',
+  'MIN': r'minimum|min|lowest|smallest',
+}
+
+# Comparison operators and the words that ask for them
+COMPARISONS = [
+  (r'>=|at least|greater than or equal to', '>='),
+  (r'<=|at most|less than or equal to', '<='),
+  (r'>|over|above|greater than|more than|older than|bigger than|after', '>'),
+  (r'<|under|below|less than|fewer than|younger than|smaller than|before', '<'),
+  (r'=|equals?|equal to|of', '='),
+]
+
+class RuleBasedLLMProvider:
+
+  def __init__(self, database_connector: SQLDatabaseConnector, fallback_provider: Optional[LLMProvider] = None, min_confidence: float = 1.0):
+    """
+    Class constructor.
+
+    Parameters:
+    database_connector (SQLDatabaseConnector): Database with the ingested tables, used to get the known values of text columns
+    fallback_provider (Optional[LLMProvider]): Provider used when the prompt doesn't match a simple query shape with enough confidence. Optional
+    min_confidence (float): Share of the meaningful words of the prompt that must be explained by the rules to answer locally. Defaults to all of them, since an unexplained word usually changes the query. Optional
+    """
+
+    print("Rule-based provider for simple filter, aggregate, sort and limit queries.")
+    self.database_connector = database_connector
+    self.fallback_provider = fallback_provider
+    self.min_confidence = min_confidence
+
+    # Version of the table (schema version of the database and row count) and known values of its text columns, by table name, so they are only queried once per table version
+    self.known_values_cache = {}
+    self.lock = threading.Lock()
+    self.metrics = {"local": 0, "fallback": 0}
+
+  def generate_sql_query(self, user_prompt: str, schema: str, max_retries: int = 3, initial_delay: int = 1) -> Union[str, SQLQueryResult]:
+    """
+    Generate a SQL query locally for simple prompts (filters on known values, comparisons, counts, aggregates, sort and limit).
+    Otherwise, use the fallback provider.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    max_retries (int): Max number of times that the fallback LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry of the fallback LLM. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: SQL query, or structured output of the fallback provider
+    """
+
+    print(f"Generating SQL query with rules for user prompt '{user_prompt}'...")
+
+    query, confidence = self.match_query(user_prompt=user_prompt, schema=schema)
+
+    if query is not None and confidence >= self.min_confidence:
+      print(f"SQL query generated with rules (confidence {confidence:.2f}): {query}")
+      self.metrics["local"] += 1
+      return query
+
+    if self.fallback_provider is None:
+      raise ValueError(f"Prompt doesn't match a simple query (confidence {confidence:.2f}) and there is no fallback provider")
+
+    print(f"Rules not confident enough ({confidence:.2f}). Using fallback provider...")
+    self.metrics["fallback"] += 1
+    return self.fallback_provider.generate_sql_query(user_prompt=user_prompt, schema=schema, max_retries=max_retries, initial_delay=initial_delay)
+
+  def repair_sql_query(self, user_prompt: str, schema: str, query: str, error: str, max_retries: int = 3, initial_delay: int = 1, timeout: Optional[float] = None) -> Union[str, SQLQueryResult]:
+    """
+    Fix a SQL query with the fallback provider. Rules are deterministic, so they would produce the same query again.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    query (str): SQL query that failed
+    error (str): Error message from the database, or a description of why the result was rejected
+    max_retries (int): Max number of times that the fallback LLM can retry. Optional
+    initial_delay (int): Initial delay between each retry of the fallback LLM. Optional
+    timeout (Optional[float]): Time in seconds the repair can take, after which the LLM request is abandoned. Optional
+
+    Returns:
+    Union[str, SQLQueryResult]: Fixed SQL query, or structured output of the fallback provider
+    """
+
+    if self.fallback_provider is None:
+      raise ValueError(f"Can't repair SQL query without a fallback provider: {error}")
+
+    self.metrics["fallback"] += 1
+    return self.fallback_provider.repair_sql_query(user_prompt=user_prompt, schema=schema, query=query, error=error, max_retries=max_retries, initial_delay=initial_delay, timeout=timeout)
+
+  def match_query(self, user_prompt: str, schema: str) -> Tuple[Optional[str], float]:
+    """
+    Match the prompt against column names and known values of the table, and build the SQL query of the shapes that were recognized.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+
+    Returns:
+    Tuple[Optional[str], float]: SQL query (None if the schema isn't a single table), and share of the meaningful words of the prompt explained by the rules
+    """
+
+    tables = parse_schema(schema)
+
+    # Joins are left to the LLM
+    if len(tables) != 1:
+      return None, 0.0
+
+    table_name, columns = next(iter(tables.items()))
+    numeric_columns = [col for col, sql_type in columns.items() if sql_type in ('INTEGER', 'REAL')]
+    text_columns = [col for col, sql_type in columns.items() if sql_type == 'TEXT']
+
+    text = normalize(user_prompt)
+    content_words = [word for word in text.split() if word not in STOPWORDS]
+    explained = []
+
+    def find(pattern: str) -> Optional[re.Match]:
+      match = re.search(pattern, text)
+      if match:
+        explained.append(match.group(0))
+      return match
+
+    conditions = []
+    aggregates = []
+    group_by = None
+    order_by = None
+    limit = None
+
+    # Sort: "sorted by age", "order by age descending"
+    for col in columns:
+      match = find(rf'\b(?:sort(?:ed)?|order(?:ed)?)\s+by\s+(?:the\s+)?{column_pattern(col)}(?:\s+(asc|ascending|desc|descending))?\b')
+      if match:
+        order_by = f'"{col}" {"DESC" if (match.group(1) or "").startswith("desc") else "ASC"}'
+
+    # Top/bottom N by a column: "top 5 by age", "3 lowest by price"
+    for col in numeric_columns:
+      match = find(rf'\b(top|highest|largest|bottom|lowest|smallest)\s+(\d+\s+)?(?:\w+\s+)?by\s+(?:the\s+)?{column_pattern(col)}\b')
+      if match:
+        order_by = f'"{col}" {"ASC" if match.group(1) in ("bottom", "lowest", "smallest") else "DESC"}'
+        limit = int(match.group(2)) if match.group(2) else limit
+
+    # Limit: "first 10", "top 3", "5 rows"
+    match = find(r'\b(?:top|first|limit)\s+(\d+)\b') or find(r'\b(\d+)\s+(?:rows|records|results|entries)\b')
+    if match and limit is None:
+      limit = int(match.group(1))
+
+    # Aggregates on numeric columns: "average age", "total amount"
+    for col in numeric_columns:
+      for function, words in AGGREGATES.items():
+        if find(rf'\b(?:{words})\s+(?:of\s+)?(?:the\s+)?{column_pattern(col)}\b'):
+          aggregates.append(f'{function}("{col}") AS {function.lower()}_{col}')
+
+    # Count: "how many", "count", "number of"
+    if find(r'\b(?:how many|count|number of)\b'):
+      aggregates.append('COUNT(*) AS count')
+
+    # Group by: "count by gender", "average age per city"
+    if aggregates:
+      for col in columns:
+        if find(rf'\b(?:by|per|for each|grouped by)\s+(?:the\s+)?{column_pattern(col)}\b'):
+          group_by = col
+          break
+
+    # Comparisons on numeric columns: "age over 30", "price < 10"
+    for col in numeric_columns:
+      for words, operator in COMPARISONS:
+        match = find(rf'\b{column_pattern(col)}\s+(?:is\s+|are\s+)?(?:{words})\s+(-?\d+(?:\.\d+)?)\b')
+        if match:
+          conditions.append(f'"{col}" {operator} {match.group(1)}')
+          break
+
+    # Filters on known values of text columns: "female members", "city is Boston"
+    known_values = self.get_known_values(table_name=table_name, text_columns=text_columns)
+    for col, values in known_values.items():
+      matched = []
+      for value in sorted(values, key=len, reverse=True):
+        normalized = normalize(value)
+        if len(normalized) > 1 and normalized not in STOPWORDS and re.search(rf'\b{re.escape(normalized)}s?\b', text):
+          matched.append(value)
+          explained.append(normalized)
+          # Mentioning the column explains it too: "city is Boston"
+          find(rf'\b{column_pattern(col)}\b')
+
+      if len(matched) == 1:
+        conditions.append(f'"{col}" = {quote(matched[0])}')
+      elif matched:
+        conditions.append(f'"{col}" IN ({", ".join(quote(value) for value in matched)})')
+
+    if not (conditions or aggregates or order_by or limit):
+      return None, 0.0
+
+    explained_words = {word for phrase in explained for word in phrase.split()}
+    words = text.split()
+
+    # Negations, unexplained numbers, unexplained "by" clauses and unexplained shape words change the result, so the rules can't answer
+    if NEGATIONS & set(words) or ('or' in words and len(conditions) > 1):
+      return None, 0.0
+    if any(re.fullmatch(r'-?\d+(?:\.\d+)?', word) and word not in explained_words for word in words):
+      return None, 0.0
+    if any(word == 'by' and 'by' not in explained_words for word in words):
+      return None, 0.0
+    if any((word in SHAPE_WORDS or re.fullmatch(SUPERLATIVE, word)) and word not in explained_words for word in words):
+      return None, 0.0
+
+    # Share of the meaningful words explained by the rules
+    confidence = sum(word in explained_words for word in content_words) / len(content_words) if content_words else 0.0
+
+    # Build the query
+    if aggregates:
+      select = ', '.join(([f'"{group_by}"'] if group_by else []) + aggregates)
+    else:
+      select = '*'
+
+    query = f'SELECT {select} FROM "{table_name}"'
+    if conditions:
+      query += f' WHERE {" AND ".join(conditions)}'
+    if group_by:
+      query += f' GROUP BY "{group_by}"'
+    if order_by:
+      query += f' ORDER BY {order_by}'
+    if limit is not None:
+      query += f' LIMIT {limit}'
+
+    return query, confidence
+
+  def get_known_values(self, table_name: str, text_columns: List[str]) -> Dict[str, List[str]]:
+    """
+    Get the distinct values of the low-cardinality text columns of a table.
+    Statistics stored by incremental ingestion are used if available, otherwise the values are queried once per table version.
+
+    Parameters:
+    table_name (str): Name of SQL table
+    text_columns (List[str]): Text columns of the table
+
+    Returns:
+    Dict[str, List[str]]: Distinct values by column, for columns with at most MAX_KNOWN_VALUES values
+    """
+
+    with self.lock, self.database_connector as db:
+      state = db.load_ingestion_state(table_name=table_name)
+      if state and "statistics" in state:
+        return {col: stats["values"] for col, stats in state["statistics"].items() if col in text_columns and stats.get("values")}
+
+      # The schema version of the database changes whenever a table is dropped and created again (e.g. replaced by another file with the same number of rows),
+      # and the largest rowid when rows are added
+      schema_version = db.execute_sql_query('PRAGMA schema_version')[0]["schema_version"]
+      row_count = db.execute_sql_query(f'SELECT MAX(rowid) AS row_count FROM "{table_name}"')[0]["row_count"]
+      version = (schema_version, row_count)
+
+      cached = self.known_values_cache.get(table_name)
+      if cached is None or cached[0] != version:
+        known_values = {}
+        for col in text_columns:
+          values = [row["value"] for row in db.execute_sql_query(f'SELECT DISTINCT "{col}" AS value FROM "{table_name}" LIMIT {MAX_KNOWN_VALUES + 1}')]
+          if len(values) <= MAX_KNOWN_VALUES:
+            known_values[col] = [str(value) for value in values if value is not None]
+        self.known_values_cache[table_name] = (version, known_values)
+
+      return self.known_values_cache[table_name][1]
+
+def normalize(text: str) -> str:
+  """
+  Lowercase a text and keep only words, numbers and comparison operators, separated by single spaces.
+
+  Parameters:
+  text (str): Text to normalize
+
+  Returns:
+  str: Normalized text
+  """
+
+  return ' '.join(re.findall(r'-?\d+(?:\.\d+)?|[a-z0-9]+|[<>]=?|=', str(text).lower()))
+
+def column_pattern(col: str) -> str:
+  """
+  Regular expression matching a column name in a normalized prompt (e.g. first_name -> "first name" or "first names").
+
+  Parameters:
+  col (str): Column name
+
+  Returns:
+  str: Regular expression
+  """
+
+  return r'\s+'.join(re.escape(part) for part in col.split('_') if part) + 's?'
+
+def quote(value: str) -> str:
+  """
+  Quote a value as a SQL string literal.
+
+  Parameters:
+  value (str): Value to quote
+
+  Returns:
+  str: SQL string literal
+  """
+
+  return "'" + value.replace("'", "''") + "'"
@@ -0,0 +1,38 @@
+from typing import List, Union
+from pydantic import BaseModel
+
+class SQLQueryResult(BaseModel):
+  
+  """Structured output of an LLM for a SQL query generation."""
+  
+  sql: str
+  referenced_columns: List[str] = []
+  expects_aggregate: bool = False
+
+# JSON schema of SQLQueryResult, in the strict format expected for tool calling and response_format
+SQL_QUERY_RESULT_SCHEMA = {
+  "type": "object",
+  "properties": {
+    "sql": {"type": "string", "description": "SQL query, without backticks or explanation"},
+    "referenced_columns": {"type": "array", "items": {"type": "string"}, "description": "Columns used anywhere in the query (all the columns of the table for SELECT *)"},
+    "expects_aggregate": {"type": "boolean", "description": "True if the query aggregates rows (COUNT, SUM, GROUP BY, etc.)"},
+  },
+  "required": ["sql", "referenced_columns", "expects_aggregate"],
+  "additionalProperties": False,
+}
+
+def to_sql_query_result(result: Union[str, SQLQueryResult]) -> SQLQueryResult:
+  """
+  Get the structured output of an LLMProvider answer. Providers that only return the SQL query get no referenced columns.
+
+  Parameters:
+  result (Union[str, SQLQueryResult]): SQL query, or structured output of the LLM
+
+  Returns:
+  SQLQueryResult: Structured output
+  """
+
+  if isinstance(result, SQLQueryResult):
+    return result
+
+  return SQLQueryResult(sql=result)
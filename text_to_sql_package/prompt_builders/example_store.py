@@ -0,0 +1,30 @@
+from typing import Protocol, List, Dict
+
+class ExampleStore(Protocol):
+  
+  """Interface for classes that store successful (question, SQL query) pairs and retrieve the most similar ones as few-shot examples."""
+  
+  def add_example(self, user_prompt: str, sql_query: str, schema: str) -> None:
+    """
+    Store a natural language prompt and the SQL query that answered it successfully.
+    
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    sql_query (str): SQL query that answered the prompt
+    schema (str): Table schema the SQL query was run on
+    """
+    ...
+    
+  def get_examples(self, user_prompt: str, schema: str, k: int = 3) -> List[Dict]:
+    """
+    Get the stored examples most similar to a prompt, for the same schema.
+    
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    k (int): Max number of examples. Optional
+
+    Returns:
+    List[Dict]: Examples with keys user_prompt and sql_query, most similar first
+    """
+    ...
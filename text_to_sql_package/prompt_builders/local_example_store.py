@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import math
+import hashlib
+import threading
+from collections import Counter
+from typing import List, Dict, Optional
+
+class LocalExampleStore:
+
+  def __init__(self, file_path: Optional[str] = None, max_examples: int = 1000, min_similarity: float = 0.1):
+    """
+    Class constructor.
+
+    Parameters:
+    file_path (Optional[str]): JSON file where examples are persisted. If None, examples are only kept in memory. Optional
+    max_examples (int): Max number of stored examples, the oldest are removed first. Optional
+    min_similarity (float): Min cosine similarity for an example to be returned. Optional
+    """
+
+    self.file_path = file_path
+    self.max_examples = max_examples
+    self.min_similarity = min_similarity
+    self.lock = threading.Lock()
+    self.examples: List[Dict] = []
+
+    if file_path and os.path.exists(file_path):
+      with open(file_path) as file:
+        self.examples = json.load(file)
+      print(f"Loaded {len(self.examples)} examples from {file_path}.")
+
+  def add_example(self, user_prompt: str, sql_query: str, schema: str) -> None:
+    """
+    Store a natural language prompt and the SQL query that answered it successfully. An existing example for the same prompt and schema is replaced.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    sql_query (str): SQL query that answered the prompt
+    schema (str): Table schema the SQL query was run on
+    """
+
+    schema_hash = hash_schema(schema)
+
+    with self.lock:
+      self.examples = [ex for ex in self.examples if not (ex["schema_hash"] == schema_hash and ex["user_prompt"] == user_prompt)]
+      self.examples.append({"user_prompt": user_prompt, "sql_query": sql_query, "schema_hash": schema_hash})
+      self.examples = self.examples[-self.max_examples:]
+
+      if self.file_path:
+        with open(self.file_path, "w") as file:
+          json.dump(self.examples, file)
+
+    print(f"Example stored for prompt '{user_prompt}'.")
+
+  def get_examples(self, user_prompt: str, schema: str, k: int = 3) -> List[Dict]:
+    """
+    Get the stored examples most similar to a prompt, for the same schema. Similarity is the cosine between TF-IDF weighted word counts.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    k (int): Max number of examples. Optional
+
+    Returns:
+    List[Dict]: Examples with keys user_prompt and sql_query, most similar first
+    """
+
+    schema_hash = hash_schema(schema)
+
+    with self.lock:
+      candidates = [ex for ex in self.examples if ex["schema_hash"] == schema_hash]
+
+    if not candidates or k <= 0:
+      return []
+
+    # Inverse document frequency of each word among the candidates
+    documents = [Counter(tokenize(ex["user_prompt"])) for ex in candidates]
+    document_frequency = Counter(word for doc in documents for word in doc)
+    idf = {word: math.log((1 + len(documents)) / (1 + df)) + 1 for word, df in document_frequency.items()}
+
+    query_vector = weight(Counter(tokenize(user_prompt)), idf)
+    scored = [(cosine(query_vector, weight(doc, idf)), ex) for doc, ex in zip(documents, candidates)]
+    scored = [(score, ex) for score, ex in scored if score >= self.min_similarity]
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    return [{"user_prompt": ex["user_prompt"], "sql_query": ex["sql_query"]} for score, ex in scored[:k]]
+
+def hash_schema(schema: str) -> str:
+  """
+  Hash a table schema, to match examples with the dataset they were created for.
+
+  Parameters:
+  schema (str): Table schema
+
+  Returns:
+  str: Hash of the schema
+  """
+
+  return hashlib.sha256(schema.encode()).hexdigest()
+
+def tokenize(text: str) -> List[str]:
+  """
+  Split a text into lowercase words.
+
+  Parameters:
+  text (str): Text to split
+
+  Returns:
+  List[str]: Words of the text
+  """
+
+  return re.findall(r'[a-z0-9]+', text.lower())
+
+def weight(counts: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+  """
+  Weight word counts by their inverse document frequency. Unknown words get the highest weight.
+
+  Parameters:
+  counts (Counter): Word counts
+  idf (Dict[str, float]): Inverse document frequency by word
+
+  Returns:
+  Dict[str, float]: Weighted word counts
+  """
+
+  default_idf = max(idf.values(), default=1.0)
+  return {word: count * idf.get(word, default_idf) for word, count in counts.items()}
+
+def cosine(vector: Dict[str, float], other: Dict[str, float]) -> float:
+  """
+  Cosine similarity between two sparse vectors.
+
+  Parameters:
+  vector (Dict[str, float]): First vector
+  other (Dict[str, float]): Second vector
+
+  Returns:
+  float: Cosine similarity between 0 and 1
+  """
+
+  dot = sum(value * other.get(word, 0.0) for word, value in vector.items())
+  norm = math.sqrt(sum(v * v for v in vector.values())) * math.sqrt(sum(v * v for v in other.values()))
+  return dot / norm if norm else 0.0
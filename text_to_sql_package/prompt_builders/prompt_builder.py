@@ -0,0 +1,127 @@
+import copy
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+from text_to_sql_package.prompt_builders.example_store import ExampleStore
+
+# Max number of system messages (one per schema and output format) kept in memory
+PREFIX_CACHE_SIZE = 64
+
+# Instructions at the start of every prompt. They never change, so they are part of the cacheable prefix
+INSTRUCTIONS = """You translate natural language questions into SQL queries for a SQLite database.
+Only use the tables and columns of the schema below. Join hints are given as SQL comments."""
+
+class PromptBuilder:
+
+  """
+  Builds the messages sent to the LLM. The system message (instructions, schema and output format) is built once per schema and reused as-is,
+  so providers that cache prompt prefixes can skip it. The question and the few-shot examples go in the user message after it.
+  """
+
+  def __init__(self, example_store: Optional[ExampleStore] = None, num_examples: int = 3, cache_control: bool = False):
+    """
+    Class constructor.
+
+    Parameters:
+    example_store (Optional[ExampleStore]): Store of previously successful (question, SQL query) pairs used as few-shot examples. Optional
+    num_examples (int): Max number of few-shot examples per prompt. Optional
+    cache_control (bool): If True, the system message is marked with cache_control, for providers that need explicit prompt caching (e.g. Anthropic). Optional
+    """
+
+    self.example_store = example_store
+    self.num_examples = num_examples
+    self.cache_control = cache_control
+    self.prefix_cache = OrderedDict()
+    self.lock = threading.Lock()
+
+  def build_generation_messages(self, user_prompt: str, schema: str, output_instructions: str) -> List[Dict]:
+    """
+    Build the messages to generate a SQL query for a prompt.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    output_instructions (str): Instructions on how the LLM must format its answer
+
+    Returns:
+    List[Dict]: Messages in LiteLLM format
+    """
+
+    user_message = f"{self.format_examples(user_prompt=user_prompt, schema=schema)}Question: {user_prompt}"
+    return [self.build_system_message(schema=schema, output_instructions=output_instructions), {"role": "user", "content": user_message}]
+
+  def build_repair_messages(self, user_prompt: str, schema: str, query: str, error: str, output_instructions: str) -> List[Dict]:
+    """
+    Build the messages to fix a SQL query that failed or returned no rows.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+    query (str): SQL query that failed
+    error (str): Error message from the database, or a description of why the result was rejected
+    output_instructions (str): Instructions on how the LLM must format its answer
+
+    Returns:
+    List[Dict]: Messages in LiteLLM format
+    """
+
+    user_message = f"Question: {user_prompt}\nThis query did not work:\n{query}\nError: {error}\nFix the query."
+    return [self.build_system_message(schema=schema, output_instructions=output_instructions), {"role": "user", "content": user_message}]
+
+  def build_system_message(self, schema: str, output_instructions: str) -> Dict:
+    """
+    Build the system message with the instructions, schema and output format, or reuse it if it was already built.
+    A copy is returned, so callers that change their messages don't change the cached one.
+
+    Parameters:
+    schema (str): Table schema for the SQL query
+    output_instructions (str): Instructions on how the LLM must format its answer
+
+    Returns:
+    Dict: System message in LiteLLM format
+    """
+
+    key = (schema, output_instructions)
+
+    with self.lock:
+      if key in self.prefix_cache:
+        self.prefix_cache.move_to_end(key)
+        return copy.deepcopy(self.prefix_cache[key])
+
+    content = f"{INSTRUCTIONS}\n\nSchema:\n{schema}\n\n{output_instructions}"
+
+    if self.cache_control:
+      message = {"role": "system", "content": [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]}
+    else:
+      message = {"role": "system", "content": content}
+
+    with self.lock:
+      self.prefix_cache[key] = message
+      self.prefix_cache.move_to_end(key)
+      if len(self.prefix_cache) > PREFIX_CACHE_SIZE:
+        self.prefix_cache.popitem(last=False)
+
+    return copy.deepcopy(message)
+
+  def format_examples(self, user_prompt: str, schema: str) -> str:
+    """
+    Format the few-shot examples most similar to the prompt.
+
+    Parameters:
+    user_prompt (str): Natural language prompt to query the dataset.
+    schema (str): Table schema for the SQL query
+
+    Returns:
+    str: Examples as text (empty if there are none)
+    """
+
+    if self.example_store is None or self.num_examples <= 0:
+      return ""
+
+    examples = self.example_store.get_examples(user_prompt=user_prompt, schema=schema, k=self.num_examples)
+
+    if not examples:
+      return ""
+
+    formatted = "\n\n".join(f"Question: {ex['user_prompt']}\nSQL: {ex['sql_query']}" for ex in examples)
+    return f"Examples of questions answered on this schema:\n\n{formatted}\n\n"
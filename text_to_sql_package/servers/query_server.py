@@ -0,0 +1,468 @@
+import os
+import json
+import time
+import queue
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from text_to_sql_package.text_to_sql import TextToSQL
+
+# Max size of a request body, in bytes
+MAX_BODY_BYTES = 1024 * 1024
+
+class QueryServerError(Exception):
+
+  """Error returned to the client with an HTTP status code."""
+
+  def __init__(self, status: int, message: str):
+    """
+    Class constructor.
+
+    Parameters:
+    status (int): HTTP status code
+    message (str): Description of the error
+    """
+
+    super().__init__(message)
+    self.status = status
+    self.message = message
+
+class QueryServer:
+
+  """
+  Long-running HTTP/JSON server that keeps TextToSQL objects (and their tables and caches) warm between requests.
+  Each TextToSQL object handles one request at a time, so max_concurrency objects are created up front. Other requests wait in a bounded queue.
+  """
+
+  def __init__(self, text_to_sql_factory: Callable[[], TextToSQL], host: str = "127.0.0.1", port: int = 8000, max_concurrency: int = 4, max_queue_size: int = 32, queue_timeout: float = 60.0, data_dir: Optional[str] = None):
+    """
+    Class constructor.
+
+    Parameters:
+    text_to_sql_factory (Callable[[], TextToSQL]): Function that creates a TextToSQL object. It is called max_concurrency times. The objects should share a database with a DatasetCatalog, so tables are reused across requests
+    host (str): Host to listen on. Optional
+    port (int): Port to listen on (0 for any free port). Optional
+    max_concurrency (int): Max number of requests that run at the same time. Optional
+    max_queue_size (int): Max number of requests waiting for a free TextToSQL object. Other requests are rejected with status 503. Optional
+    queue_timeout (float): Max time in seconds a request waits in the queue. Optional
+    data_dir (Optional[str]): If given, only files in this folder can be queried, and relative file paths are resolved from it. Optional
+    """
+
+    if max_concurrency < 1:
+      raise ValueError("max_concurrency must be at least 1")
+
+    self.host = host
+    self.port = port
+    self.max_concurrency = max_concurrency
+    self.max_queue_size = max_queue_size
+    self.queue_timeout = queue_timeout
+    self.data_dir = os.path.realpath(data_dir) if data_dir else None
+
+    print(f"Creating {max_concurrency} TextToSQL objects...")
+    self.workers = queue.Queue()
+    for _ in range(max_concurrency):
+      self.workers.put(text_to_sql_factory())
+
+    # Without a catalog all datasets share the same table, so requests can't run at the same time
+    self.catalog_enabled = all(worker.catalog is not None for worker in self.workers.queue)
+    if not self.catalog_enabled:
+      print("TextToSQL objects have no DatasetCatalog: requests will run one at a time.")
+
+    self.lock = threading.Lock()
+    self.database_lock = threading.Lock()
+    # Lock and number of requests using it by file path. Locks are removed when no request uses them
+    self.dataset_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+    self.waiting = 0
+    self.running = 0
+    self.metrics = {"requests": 0, "completed": 0, "rejected": 0, "errors": 0}
+
+    self.http_server: Optional[ThreadingHTTPServer] = None
+    self.thread: Optional[threading.Thread] = None
+
+  def serve_forever(self) -> None:
+    """Start the HTTP server and handle requests until interrupted."""
+
+    self.create_http_server()
+    print(f"Query server listening on http://{self.host}:{self.port}...")
+
+    try:
+      self.http_server.serve_forever()
+    except KeyboardInterrupt:
+      print("Query server interrupted.")
+    finally:
+      self.http_server.server_close()
+
+  def start(self) -> Tuple[str, int]:
+    """
+    Start the HTTP server in a background thread (e.g. for tests).
+
+    Returns:
+    Tuple[str, int]: Host and port the server listens on
+    """
+
+    self.create_http_server()
+    self.thread = threading.Thread(target=self.http_server.serve_forever, name="query-server", daemon=True)
+    self.thread.start()
+    print(f"Query server listening on http://{self.host}:{self.port}...")
+    return self.host, self.port
+
+  def shutdown(self) -> None:
+    """Stop the HTTP server started with start(), and close the TextToSQL objects."""
+
+    if self.http_server:
+      self.http_server.shutdown()
+      self.http_server.server_close()
+      print("Query server stopped.")
+
+    for worker in list(self.workers.queue):
+      worker.close()
+
+  def create_http_server(self) -> None:
+    """Create the HTTP server. Each connection is handled in its own thread."""
+
+    self.http_server = ThreadingHTTPServer((self.host, self.port), QueryRequestHandler)
+    self.http_server.daemon_threads = True
+    self.http_server.query_server = self
+    self.port = self.http_server.server_address[1]
+
+  def resolve_file_path(self, file_path: str) -> str:
+    """
+    Resolve the file path of a request, and check it is allowed.
+
+    Parameters:
+    file_path (str): File path sent by the client
+
+    Returns:
+    str: Absolute file path
+    """
+
+    if not isinstance(file_path, str) or not file_path:
+      raise QueryServerError(400, "file_path must be a non-empty string")
+
+    if self.data_dir:
+      resolved = os.path.realpath(os.path.join(self.data_dir, file_path))
+      if os.path.commonpath([resolved, self.data_dir]) != self.data_dir:
+        raise QueryServerError(403, f"File {file_path} is outside of the data folder")
+    else:
+      resolved = os.path.realpath(file_path)
+
+    if not os.path.isfile(resolved):
+      raise QueryServerError(404, f"File {file_path} does not exist")
+
+    return resolved
+
+  def acquire_worker(self) -> TextToSQL:
+    """
+    Wait for a free TextToSQL object.
+
+    Returns:
+    TextToSQL: TextToSQL object, to give back with release_worker
+    """
+
+    with self.lock:
+      if self.workers.empty() and self.waiting >= self.max_queue_size:
+        self.metrics["rejected"] += 1
+        raise QueryServerError(503, "Server is busy, too many requests waiting")
+      self.waiting += 1
+
+    try:
+      worker = self.workers.get(timeout=self.queue_timeout)
+    except queue.Empty:
+      with self.lock:
+        self.metrics["rejected"] += 1
+      raise QueryServerError(503, f"No free worker after {self.queue_timeout} seconds")
+    finally:
+      with self.lock:
+        self.waiting -= 1
+
+    with self.lock:
+      self.running += 1
+
+    return worker
+
+  def release_worker(self, worker: TextToSQL) -> None:
+    """
+    Give back a TextToSQL object after a request.
+
+    Parameters:
+    worker (TextToSQL): TextToSQL object returned by acquire_worker
+    """
+
+    with self.lock:
+      self.running -= 1
+    self.workers.put(worker)
+
+  def run_query(self, worker: TextToSQL, file_path: str, user_prompt: str) -> Dict:
+    """
+    Query a file with a natural language prompt.
+
+    Parameters:
+    worker (TextToSQL): TextToSQL object returned by acquire_worker
+    file_path (str): Absolute file path for given dataset
+    user_prompt (str): Natural language prompt to query the dataset.
+
+    Returns:
+    Dict: Result with keys rows, error (TextToSQL.last_error: guardrail rejection or other error, or None) and elapsed (seconds)
+    """
+
+    start = time.monotonic()
+
+    if self.catalog_enabled:
+      # The lease keeps other workers from evicting the dataset between loading and querying it
+      lease_id = worker.acquire_dataset_lease(file_path=file_path)
+      
+      try:
+        # Load the dataset once, even if several requests for it arrive at the same time. Later requests find it in the catalog
+        dataset_lock = self.acquire_dataset_lock(file_path=file_path)
+        try:
+          with dataset_lock:
+            dataset = worker.load_dataset_with_catalog(file_path=file_path)
+        finally:
+          self.release_dataset_lock(file_path=file_path)
+          
+        # The dataset is already loaded and leased
+        result = worker.extract_data_from_file_with_prompt(file_path=file_path, user_prompt=user_prompt, dataset=dataset)
+        
+      finally:
+        worker.release_dataset_lease(lease_id=lease_id)
+
+    else:
+      with self.database_lock:
+        result = worker.extract_data_from_file_with_prompt(file_path=file_path, user_prompt=user_prompt)
+
+    return {"rows": json.loads(result), "error": worker.last_error, "elapsed": time.monotonic() - start}
+
+  def acquire_dataset_lock(self, file_path: str) -> threading.Lock:
+    """
+    Get the lock that serializes the loading of a dataset, and count the request as a user of it.
+
+    Parameters:
+    file_path (str): Absolute file path for given dataset
+
+    Returns:
+    threading.Lock: Lock of the dataset, to give back with release_dataset_lock once it is released
+    """
+
+    with self.lock:
+      dataset_lock, users = self.dataset_locks.get(file_path, (threading.Lock(), 0))
+      self.dataset_locks[file_path] = (dataset_lock, users + 1)
+      return dataset_lock
+
+  def release_dataset_lock(self, file_path: str) -> None:
+    """
+    Stop using the lock of a dataset, and remove it if no other request uses it.
+
+    Parameters:
+    file_path (str): Absolute file path for given dataset
+    """
+
+    with self.lock:
+      dataset_lock, users = self.dataset_locks[file_path]
+      if users > 1:
+        self.dataset_locks[file_path] = (dataset_lock, users - 1)
+      else:
+        del self.dataset_locks[file_path]
+
+  def get_status(self) -> Dict:
+    """
+    Get the state of the server.
+
+    Returns:
+    Dict: Number of running and waiting requests, and request counters
+    """
+
+    with self.lock:
+      return {"status": "ok", "running": self.running, "waiting": self.waiting, "max_concurrency": self.max_concurrency, **self.metrics}
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+
+  """
+  Handles the HTTP requests of a QueryServer:
+  GET /health returns the state of the server.
+  POST /query with a JSON body {"file_path": ..., "user_prompt": ..., "stream": false} queries a file.
+  With "stream": true, the answer is sent as newline-delimited JSON events (queued, running, one per row, then done or error).
+  Row events are sent once the whole result was computed and validated: the result is framed in chunks, not streamed from the database cursor.
+  """
+
+  protocol_version = "HTTP/1.1"
+  server_version = "TextToSQL"
+
+  def do_GET(self) -> None:
+    """Handle GET requests."""
+
+    if self.path == "/health":
+      self.send_json(200, self.server.query_server.get_status())
+    else:
+      self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+  def do_POST(self) -> None:
+    """Handle POST requests."""
+
+    if self.path != "/query":
+      self.send_json(404, {"error": f"Unknown path {self.path}"})
+      return
+
+    query_server = self.server.query_server
+
+    with query_server.lock:
+      query_server.metrics["requests"] += 1
+
+    try:
+      body = self.read_json_body()
+      file_path = query_server.resolve_file_path(body.get("file_path"))
+      user_prompt = body.get("user_prompt")
+      if not isinstance(user_prompt, str) or not user_prompt.strip():
+        raise QueryServerError(400, "user_prompt must be a non-empty string")
+
+    except QueryServerError as e:
+      self.send_json(e.status, {"error": e.message})
+      return
+
+    if body.get("stream"):
+      self.send_stream(self.stream_query(file_path=file_path, user_prompt=user_prompt))
+      return
+
+    try:
+      worker = query_server.acquire_worker()
+    except QueryServerError as e:
+      self.send_json(e.status, {"error": e.message}, headers={"Retry-After": "1"})
+      return
+
+    try:
+      result = query_server.run_query(worker=worker, file_path=file_path, user_prompt=user_prompt)
+      self.count("completed")
+      self.send_json(200, result)
+
+    except Exception as e:
+      print(f"Error running query: {e}")
+      self.count("errors")
+      self.send_json(500, {"error": str(e)})
+
+    finally:
+      query_server.release_worker(worker)
+
+  def stream_query(self, file_path: str, user_prompt: str) -> Iterator[Dict]:
+    """
+    Run a query and yield its progress and rows as events. The rows are yielded once the query finished.
+
+    Parameters:
+    file_path (str): Absolute file path for given dataset
+    user_prompt (str): Natural language prompt to query the dataset.
+
+    Returns:
+    Iterator[Dict]: Events with key event (queued, running, row, done or error)
+    """
+
+    query_server = self.server.query_server
+
+    with query_server.lock:
+      waiting = query_server.waiting
+    yield {"event": "queued", "waiting": waiting}
+
+    try:
+      worker = query_server.acquire_worker()
+    except QueryServerError as e:
+      yield {"event": "error", "status": e.status, "error": e.message}
+      return
+
+    try:
+      yield {"event": "running"}
+      result = query_server.run_query(worker=worker, file_path=file_path, user_prompt=user_prompt)
+
+    except Exception as e:
+      print(f"Error running query: {e}")
+      self.count("errors")
+      yield {"event": "error", "status": 500, "error": str(e)}
+      return
+
+    finally:
+      query_server.release_worker(worker)
+
+    for row in result["rows"]:
+      yield {"event": "row", "row": row}
+
+    self.count("completed")
+    yield {"event": "done", "row_count": len(result["rows"]), "error": result["error"], "elapsed": result["elapsed"]}
+
+  def read_json_body(self) -> Dict:
+    """
+    Read the JSON body of the request.
+
+    Returns:
+    Dict: Parsed body
+    """
+
+    length = int(self.headers.get("Content-Length") or 0)
+
+    if length > MAX_BODY_BYTES:
+      raise QueryServerError(413, f"Request body is larger than {MAX_BODY_BYTES} bytes")
+
+    try:
+      body = json.loads(self.rfile.read(length) or b"{}")
+    except json.JSONDecodeError as e:
+      raise QueryServerError(400, f"Request body is not valid JSON: {e}")
+
+    if not isinstance(body, dict):
+      raise QueryServerError(400, "Request body must be a JSON object")
+
+    return body
+
+  def send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+    """
+    Send a JSON response.
+
+    Parameters:
+    status (int): HTTP status code
+    body (Dict): Response body
+    headers (Optional[Dict[str, str]]): Extra response headers. Optional
+    """
+
+    data = json.dumps(body, default=str).encode()
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(data)))
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(data)
+
+  def send_stream(self, events: Iterator[Dict]) -> None:
+    """
+    Send events as newline-delimited JSON, with chunked transfer encoding so the client gets each event as soon as it is ready.
+
+    Parameters:
+    events (Iterator[Dict]): Events to send
+    """
+
+    self.send_response(200)
+    self.send_header("Content-Type", "application/x-ndjson")
+    self.send_header("Transfer-Encoding", "chunked")
+    self.end_headers()
+
+    try:
+      for event in events:
+        data = json.dumps(event, default=str).encode() + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+      self.wfile.write(b"0\r\n\r\n")
+
+    except (BrokenPipeError, ConnectionResetError):
+      print("Client disconnected during streaming.")
+      events.close()
+      self.close_connection = True
+
+  def count(self, metric: str) -> None:
+    """
+    Increment a request counter of the server.
+
+    Parameters:
+    metric (str): Name of the counter
+    """
+
+    with self.server.query_server.lock:
+      self.server.query_server.metrics[metric] += 1
+
+  def log_message(self, format: str, *args) -> None:
+    """Log each request with print, like the rest of the package."""
+
+    print(f"{self.address_string()} - {format % args}")
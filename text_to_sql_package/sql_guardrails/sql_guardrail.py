@@ -0,0 +1,53 @@
+from typing import Protocol, List, Dict, Optional
+from text_to_sql_package.database_connectors.sql_database_connector import SQLDatabaseConnector
+
+class SQLGuardrailError(Exception):
+  
+  """Error raised when a SQL query is rejected or interrupted by a SQLGuardrail. Contains structured information that can be used to re-prompt the LLM."""
+  
+  def __init__(self, reason: str, message: str, query: str, details: Optional[Dict] = None):
+    """
+    Class constructor.
+    
+    Parameters:
+    reason (str): Short error code (e.g. not_read_only, invalid_sql, too_expensive, timeout)
+    message (str): Human readable description of the error
+    query (str): SQL query that was rejected
+    details (Optional[Dict]): Additional information, such as the query plan or the estimated cost. Optional
+    """
+    
+    super().__init__(message)
+    self.reason = reason
+    self.message = message
+    self.query = query
+    self.details = details or {}
+    
+  def to_dict(self) -> Dict:
+    """
+    Convert the error to a dictionary.
+    
+    Returns:
+    Dict: Error with keys reason, message, query and details
+    """
+    
+    return {"reason": self.reason, "message": self.message, "query": self.query, "details": self.details}
+
+class SQLGuardrail(Protocol):
+  
+  """Interface for classes that check SQL queries before they are executed (read-only, cost, limits, timeout)."""
+  
+  def execute_query(self, query: str, database_connector: SQLDatabaseConnector) -> List[Dict]:
+    """
+    Check the SQL query against the guardrail policy, then run it on the database and return result as a list of dictionaries.
+    
+    Parameters:
+    query (str): SQL query to be executed.
+    database_connector (SQLDatabaseConnector): Connected database to run the query on
+
+    Returns:
+    List[Dict]: Result of the SQL query
+    
+    Raises:
+    SQLGuardrailError: If the query is rejected or interrupted
+    """
+    ...
@@ -0,0 +1,388 @@
+import re
+import math
+import time
+import sqlite3
+from typing import List, Dict, Optional, Tuple
+from text_to_sql_package.database_connectors.sqlite_connector import SQLiteDatabaseConnector
+from text_to_sql_package.sql_guardrails.sql_guardrail import SQLGuardrail, SQLGuardrailError
+
+# Authorizer actions allowed for read-only queries
+READ_ONLY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# Numeric LIMIT at the very end of a query (LIMIT count, LIMIT count OFFSET offset, or LIMIT offset, count)
+LIMIT_PATTERN = r'\bLIMIT\s+(\d+)(\s*(?:OFFSET\s+\d+|,\s*\d+))?$'
+
+# Keywords that can follow a table name in a FROM/JOIN clause, and therefore are not aliases
+CLAUSE_KEYWORDS = {'from', 'select', 'where', 'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'outer', 'on', 'using', 'group', 'order', 'limit', 'having', 'window', 'union', 'intersect', 'except', 'as'}
+
+class SQLiteGuardrail:
+
+  def __init__(self, max_rows: Optional[int] = 1000, max_estimated_cost: float = 1e8, timeout: float = 10.0, progress_steps: int = 1000):
+    """
+    Class constructor.
+
+    Parameters:
+    max_rows (Optional[int]): Max number of rows returned. A LIMIT is added to queries without one, and larger LIMITs are capped. None to disable. Optional
+    max_estimated_cost (float): Max number of rows the query plan is estimated to examine. Optional
+    timeout (float): Max execution time of the query in seconds. Optional
+    progress_steps (int): Number of SQLite virtual machine instructions between timeout checks. Optional
+    """
+
+    self.max_rows = max_rows
+    self.max_estimated_cost = max_estimated_cost
+    self.timeout = timeout
+    self.progress_steps = progress_steps
+
+  def execute_query(self, query: str, database_connector: SQLiteDatabaseConnector) -> List[Dict]:
+    """
+    Check the SQL query against the guardrail policy, then run it on the SQLite database with a timeout and return result as a list of dictionaries.
+
+    Parameters:
+    query (str): SQL query to be executed.
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database to run the query on
+
+    Returns:
+    List[Dict]: Result of the SQL query
+
+    Raises:
+    SQLGuardrailError: If the query is rejected or interrupted
+    """
+
+    safe_query, cost = self.check_query(query=query, database_connector=database_connector)
+
+    connection = database_connector.connection
+    deadline = time.monotonic() + self.timeout
+
+    try:
+      # Interrupt the query once the deadline is reached, and block anything that is not a read
+      connection.set_progress_handler(lambda: time.monotonic() > deadline, self.progress_steps)
+      connection.set_authorizer(read_only_authorizer)
+      return database_connector.execute_sql_query(safe_query)
+
+    except sqlite3.OperationalError as e:
+      if 'interrupted' in str(e):
+        raise SQLGuardrailError(reason="timeout", message=f"SQL query took longer than {self.timeout} seconds and was interrupted.", query=safe_query, details=cost) from e
+      # Operations only blocked while running (e.g. load_extension)
+      if 'not authorized' in str(e):
+        raise SQLGuardrailError(reason="not_read_only", message=f"Only read-only queries are allowed: {e}.", query=safe_query, details=cost) from e
+      raise
+
+    finally:
+      connection.set_progress_handler(None, self.progress_steps)
+      connection.set_authorizer(None)
+
+  def check_query(self, query: str, database_connector: SQLiteDatabaseConnector) -> Tuple[str, Dict]:
+    """
+    Check that the SQL query is a single read-only statement with an acceptable estimated cost, and apply the row limit policy.
+
+    Parameters:
+    query (str): SQL query to check
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database the query will run on
+
+    Returns:
+    Tuple[str, Dict]: Query with the row limit applied, and its estimated cost
+
+    Raises:
+    SQLGuardrailError: If the query is rejected
+    """
+
+    print("Checking SQL query with guardrail...")
+
+    query = strip_sql(query or '')
+
+    if not query:
+      raise SQLGuardrailError(reason="empty_query", message="SQL query is empty.", query=query)
+
+    first_keyword = query.split(None, 1)[0].lower()
+    if first_keyword not in ('select', 'with'):
+      raise SQLGuardrailError(reason="not_read_only", message=f"Only SELECT queries are allowed, got a query starting with {first_keyword.upper()}.", query=query)
+
+    safe_query = self.apply_limit(query)
+    cost = self.estimate_cost(query=safe_query, database_connector=database_connector)
+
+    if cost["estimated_rows_examined"] > self.max_estimated_cost:
+      raise SQLGuardrailError(
+        reason="too_expensive",
+        message=f"SQL query is estimated to examine {cost['estimated_rows_examined']:.0f} rows (max {self.max_estimated_cost:.0f}). Avoid cartesian joins and full scans of large tables.",
+        query=safe_query,
+        details=cost
+      )
+
+    print(f"SQL query accepted by guardrail: {safe_query}")
+    return safe_query, cost
+
+  def apply_limit(self, query: str) -> str:
+    """
+    Add a LIMIT to the query if it has none, or cap its LIMIT, according to max_rows.
+
+    Parameters:
+    query (str): SQL query without comments nor trailing semicolon
+
+    Returns:
+    str: SQL query with the row limit applied
+    """
+
+    if self.max_rows is None:
+      return query
+
+    # Only the LIMIT at the very end of the query applies to the returned rows
+    match = re.search(LIMIT_PATTERN, query, flags=re.IGNORECASE)
+
+    if match is None:
+      # A LIMIT that isn't a number (e.g. LIMIT (SELECT ...)) can't be capped in place, so the query is wrapped
+      if has_top_level_limit(query):
+        return f"SELECT * FROM ({query}) LIMIT {self.max_rows}"
+      return f"{query} LIMIT {self.max_rows}"
+
+    # LIMIT offset, count syntax
+    if match.group(2) and match.group(2).strip().startswith(','):
+      count = int(match.group(2).strip()[1:])
+      if count > self.max_rows:
+        return f"{query[:match.start(2)]}, {self.max_rows}"
+      return query
+
+    if int(match.group(1)) > self.max_rows:
+      return f"{query[:match.start(1)]}{self.max_rows}{query[match.end(1):]}"
+
+    return query
+
+  def estimate_cost(self, query: str, database_connector: SQLiteDatabaseConnector) -> Dict:
+    """
+    Estimate the cost of a SQL query with EXPLAIN QUERY PLAN.
+    Loops at the same level of the plan are nested, so their row counts are multiplied: a full scan counts all rows of the table, an index search counts log2 of them.
+    A temporary B-tree (ORDER BY, GROUP BY, DISTINCT) counts log2 of the rows it keeps for each row examined. With a LIMIT, only that many rows are kept (top-k sort).
+
+    Parameters:
+    query (str): SQL query to estimate
+    database_connector (SQLiteDatabaseConnector): Connected SQLite database the query will run on
+
+    Returns:
+    Dict: Estimated cost with keys estimated_rows_examined, full_scans, temp_b_trees, max_nested_loops and plan
+
+    Raises:
+    SQLGuardrailError: If the query can't be planned (invalid SQL, unknown column, write operation)
+    """
+
+    connection = database_connector.connection
+
+    try:
+      connection.set_authorizer(read_only_authorizer)
+      plan = explain_query_plan(connection, query)
+
+    except sqlite3.DatabaseError as e:
+      if 'not authorized' in str(e):
+        raise SQLGuardrailError(reason="not_read_only", message="Only read-only queries are allowed.", query=query) from e
+      raise SQLGuardrailError(reason="invalid_sql", message=f"SQL query is invalid: {e}", query=query) from e
+
+    finally:
+      connection.set_authorizer(None)
+
+    table_rows = get_table_row_counts(connection)
+    aliases = get_table_aliases(query)
+    default_rows = max(table_rows.values(), default=1)
+
+    loops_by_parent = {}
+    full_scans = []
+    temp_b_trees = []
+
+    for node_id, parent_id, _, detail in plan:
+      match = re.match(r'(SCAN|SEARCH) (?:TABLE )?(\w+)', detail)
+
+      if detail.startswith('USE TEMP B-TREE'):
+        temp_b_trees.append(detail)
+
+      if match is None or detail == 'SCAN CONSTANT ROW':
+        continue
+
+      operation, name = match.groups()
+      rows = table_rows.get(aliases.get(name.lower(), name.lower()), default_rows)
+
+      if operation == 'SCAN':
+        full_scans.append(detail)
+        factor = max(rows, 1)
+      else:
+        factor = math.log2(rows + 1) + 1
+
+      loops_by_parent.setdefault(parent_id, []).append(factor)
+
+    estimated_rows_examined = sum(math.prod(factors) for factors in loops_by_parent.values())
+
+    # Sorting with a temporary B-tree costs n log k, where k is the number of rows produced: all of them, or the LIMIT
+    if temp_b_trees:
+      limit = get_row_limit(query)
+      rows_produced = estimated_rows_examined if limit is None else min(limit, estimated_rows_examined)
+      estimated_rows_examined += len(temp_b_trees) * estimated_rows_examined * math.log2(rows_produced + 1)
+
+    cost = {
+      "estimated_rows_examined": estimated_rows_examined,
+      "full_scans": full_scans,
+      "temp_b_trees": temp_b_trees,
+      "max_nested_loops": max((len(factors) for factors in loops_by_parent.values()), default=0),
+      "plan": [detail for _, _, _, detail in plan],
+    }
+
+    print(f"SQL query cost estimated: {cost}")
+    return cost
+
+def read_only_authorizer(action: int, arg1, arg2, db_name, trigger_name) -> int:
+  """
+  SQLite authorizer that only allows read operations.
+  Reference: https://docs.python.org/3/library/sqlite3.html#sqlite3.Connection.set_authorizer
+
+  Parameters:
+  action (int): SQLite action code
+
+  Returns:
+  int: SQLITE_OK if the action is allowed, SQLITE_DENY otherwise
+  """
+
+  return sqlite3.SQLITE_OK if action in READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+def strip_sql(query: str) -> str:
+  """
+  Remove comments, surrounding whitespace and trailing semicolons from a SQL query. Quoted strings and identifiers are kept as-is.
+
+  Parameters:
+  query (str): SQL query
+
+  Returns:
+  str: Stripped SQL query
+  """
+
+  result = []
+  i = 0
+
+  while i < len(query):
+    char = query[i]
+
+    if char in ("'", '"', '`', '['):
+      # Copy quoted string or identifier until its closing character
+      closing = ']' if char == '[' else char
+      end = query.find(closing, i + 1)
+      end = len(query) if end == -1 else end + 1
+      result.append(query[i:end])
+      i = end
+    elif query.startswith('--', i):
+      end = query.find('\n', i)
+      i = len(query) if end == -1 else end
+    elif query.startswith('/*', i):
+      end = query.find('*/', i + 2)
+      i = len(query) if end == -1 else end + 2
+      result.append(' ')
+    else:
+      result.append(char)
+      i += 1
+
+  return ''.join(result).strip().rstrip(';').strip()
+
+def explain_query_plan(connection: sqlite3.Connection, query: str) -> List[Tuple]:
+  """
+  Get the query plan of a SQL query.
+
+  Parameters:
+  connection (sqlite3.Connection): Connection to the SQLite database
+  query (str): SQL query
+
+  Returns:
+  List[Tuple]: Plan nodes (id, parent id, unused, detail)
+  """
+
+  return connection.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+
+def get_row_limit(query: str) -> Optional[int]:
+  """
+  Get the number of rows a query returns at most, from the numeric LIMIT at its end.
+
+  Parameters:
+  query (str): SQL query without comments nor trailing semicolon
+
+  Returns:
+  Optional[int]: Max number of rows, or None if the query has no numeric LIMIT at its end
+  """
+
+  match = re.search(LIMIT_PATTERN, query, flags=re.IGNORECASE)
+
+  if match is None:
+    return None
+
+  # LIMIT offset, count syntax
+  if match.group(2) and match.group(2).strip().startswith(','):
+    return int(match.group(2).strip()[1:])
+
+  return int(match.group(1))
+
+def has_top_level_limit(query: str) -> bool:
+  """
+  Check if a query has a LIMIT clause outside of parentheses (i.e. not in a subquery). Quoted strings and identifiers are skipped.
+
+  Parameters:
+  query (str): SQL query without comments nor trailing semicolon
+
+  Returns:
+  bool: True if the query has a top-level LIMIT
+  """
+
+  depth = 0
+  i = 0
+
+  while i < len(query):
+    char = query[i]
+
+    if char in ("'", '"', '`', '['):
+      closing = ']' if char == '[' else char
+      end = query.find(closing, i + 1)
+      i = len(query) if end == -1 else end + 1
+      continue
+
+    if char == '(':
+      depth += 1
+    elif char == ')':
+      depth -= 1
+    elif depth == 0 and re.match(r'LIMIT\b', query[i:], flags=re.IGNORECASE) and (i == 0 or not (query[i - 1].isalnum() or query[i - 1] == '_')):
+      return True
+
+    i += 1
+
+  return False
+
+def get_table_row_counts(connection: sqlite3.Connection) -> Dict[str, int]:
+  """
+  Get the approximate number of rows of each table in the SQLite database, using the largest rowid (no full scan).
+
+  Parameters:
+  connection (sqlite3.Connection): Connection to the SQLite database
+
+  Returns:
+  Dict[str, int]: Number of rows by lowercase table name
+  """
+
+  table_rows = {}
+  tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+  for table in tables:
+    try:
+      table_rows[table.lower()] = connection.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    except sqlite3.Error:
+      # WITHOUT ROWID tables
+      table_rows[table.lower()] = connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+  return table_rows
+
+def get_table_aliases(query: str) -> Dict[str, str]:
+  """
+  Get the table aliases used in the FROM and JOIN clauses of a SQL query (e.g. FROM orders o -> {'o': 'orders'}).
+
+  Parameters:
+  query (str): SQL query
+
+  Returns:
+  Dict[str, str]: Lowercase table name by lowercase alias
+  """
+
+  aliases = {}
+
+  for table, alias in re.findall(r'\b(?:FROM|JOIN|,)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?', query, flags=re.IGNORECASE):
+    if alias and alias.lower() not in CLAUSE_KEYWORDS:
+      aliases[alias.lower()] = table.lower()
+
+  return aliases
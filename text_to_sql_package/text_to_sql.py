@@ -1,17 +1,34 @@
+import os
+import time
 import pandas as pd
 import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Self, Tuple
 from text_to_sql_package.data_loaders.data_loader import DataLoader
 from text_to_sql_package.llm_providers.llm_provider import LLMProvider
+from text_to_sql_package.llm_providers.sql_query_result import SQLQueryResult, to_sql_query_result
 from text_to_sql_package.database_connectors.sql_database_connector import SQLDatabaseConnector
 from text_to_sql_package.data_validators.data_validator import DataValidator
-from text_to_sql_package.utils.dataframe_utils import generate_schema_from_dataframe
+from text_to_sql_package.sql_guardrails.sql_guardrail import SQLGuardrail, SQLGuardrailError
+from text_to_sql_package.prompt_builders.example_store import ExampleStore
+from text_to_sql_package.catalogs.dataset_catalog import DatasetCatalog
+from text_to_sql_package.utils.dataframe_utils import generate_schema_from_dataframe, generate_schema_from_dataframes, detect_foreign_keys, parse_schema, quote_identifier
+from text_to_sql_package.utils.file_utils import table_name_from_file_path, dataset_id_for_file
+from text_to_sql_package.utils.ingestion_utils import delimiter_for_file, fingerprint_file, fingerprint_source, read_rows_from_offset, ends_without_newline, compute_column_statistics, merge_column_statistics, is_append_only
+
+# Max number of repaired SQL queries kept in memory
+REPAIR_CACHE_SIZE = 256
+
+# Max number of times a file is loaded for a full incremental ingestion, if it keeps growing while being loaded
+FULL_LOAD_ATTEMPTS = 3
 
 class TextToSQL:
   
   """Class in charge of bringing together the different interfaces of this package to be able to connect to a SQL database, generate a SQL query from a natural language prompt using an LLM, extract data from the database, validate the output, and return it in JSON format.
   """
   
-  def __init__(self, data_loader: DataLoader, llm_provider: LLMProvider, database_connector: SQLDatabaseConnector, data_validator: DataValidator):
+  def __init__(self, data_loader: DataLoader, llm_provider: LLMProvider, database_connector: SQLDatabaseConnector, data_validator: DataValidator, incremental: bool = False, sql_guardrail: Optional[SQLGuardrail] = None, max_repair_attempts: int = 2, repair_time_budget: float = 30.0, repair_empty_results: bool = False, example_store: Optional[ExampleStore] = None, catalog: Optional[DatasetCatalog] = None):
     
     """Class constructor.
     
@@ -20,37 +37,169 @@ class TextToSQL:
     llm_provider (LLMProvider): Object that implement the LLMProvider interface, in charge of providing and prompting an LLM.
     database_connector (SQLDatabaseConnector): Object that implements the SQLDatabaseConnector interface, in charge of connecting to a SQL database.
     data_validator (DataValidator): Object that implements the DataValidator interface, in charge of validating the output data.
+    incremental (bool): If True, CSV/TSV files are treated as append-only logs (one newline-terminated line per row) and only the rows added since the last call are ingested. Optional
+    sql_guardrail (Optional[SQLGuardrail]): Object that implements the SQLGuardrail interface, in charge of checking generated SQL queries before they are executed. Optional
+    max_repair_attempts (int): Max number of extra LLM round-trips to fix a SQL query that failed or returned no rows. Optional
+    repair_time_budget (float): Time in seconds that the repairs of a prompt can take. A repair that is still running when the budget is spent is abandoned. Optional
+    repair_empty_results (bool): If True, a SQL query that returns no rows is also sent back to the LLM to be fixed. Those repairs are neither cached nor stored as examples, since no rows may be the right answer. Optional
+    example_store (Optional[ExampleStore]): Object that implements the ExampleStore interface, where prompts with the SQL query that answered them are stored to be used as few-shot examples. Optional
+    catalog (Optional[DatasetCatalog]): Object that implements the DatasetCatalog interface. If given, each file gets its own table in the database, which is reused while the file doesn't change, instead of the temporary table. Optional
     """
     
     self.data_loader = data_loader
     self.llm_provider = llm_provider
     self.database_connector = database_connector
     self.data_validator = data_validator
+    self.incremental = incremental
+    self.sql_guardrail = sql_guardrail
+    self.max_repair_attempts = max_repair_attempts
+    self.repair_time_budget = repair_time_budget
+    self.repair_empty_results = repair_empty_results
+    self.example_store = example_store
+    self.catalog = catalog
+    
+    # Fixed queries by (schema, failing query), so a known failure doesn't cost another LLM round-trip
+    self.repair_cache = OrderedDict()
+    
+    # Repairs run in this executor, so that they can be abandoned when the time budget is spent. It is shut down by close()
+    self.repair_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sql-repair")
+    
+    # Number of user prompts answered and of attempts (SQL queries executed) for them, and repair counters
+    self.metrics = {"queries": 0, "attempts": 0, "repairs": 0, "repair_cache_hits": 0, "failed_repairs": 0}
+    
+    # Structured error of the last failed call (see SQLGuardrailError.to_dict), to be able to re-prompt. The reason is 'error' for errors other than guardrail rejections
+    self.last_error = None
+    
+  def __enter__(self) -> Self:
+    """
+    Enter runtime context.
+    Reference: https://docs.python.org/3/reference/datamodel.html#with-statement-context-managers
+    
+    Returns:
+    Self: TextToSQL object
+    """
     
-  def extract_data_from_file_with_prompt(self, file_path: str, user_prompt: str) -> str:
+    return self
+    
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    """
+    Exit runtime context (release resources with close()).
+    Reference: https://docs.python.org/3/reference/datamodel.html#with-statement-context-managers
+    """
+    
+    self.close()
+    
+  def close(self) -> None:
+    """Shut down the repair executor. Repairs that haven't started are cancelled, and running ones are not waited for."""
+    
+    self.repair_executor.shutdown(wait=False, cancel_futures=True)
+    
+  def extract_data_from_file_with_prompt(self, file_path: str, user_prompt: str, dataset: Optional[Tuple[pd.DataFrame, str]] = None) -> str:
     """
     Main entry point for the package. From any given dataset, allow for user to prompt with natural language, and extract rows in the form of list of validated JSONs.
 
     Parameters:
     file_path (str): File path for given dataset
     user_prompt (str): Natural language prompt from the user that will be used to generate query
+    dataset (Optional[Tuple[pd.DataFrame, str]]): Dataframe and schema returned by load_dataset_with_catalog, if the caller already loaded the dataset and holds its lease. It isn't loaded and leased again. Optional
+    
+    Returns:
+    str: JSON string with extracted data
+    """ 
+ 
+    self.last_error = None
+    lease_id = None
+    
+    try:
+      if dataset is not None:
+        df, schema = dataset
+      elif self.catalog:
+        # The dataset can't be evicted by another TextToSQL object sharing the database while it is queried
+        lease_id = self.acquire_dataset_lease(file_path=file_path)
+        df, schema = self.load_dataset_with_catalog(file_path=file_path)
+      elif self.incremental and delimiter_for_file(file_path):
+        df = self.ingest_file_incrementally(file_path=file_path)
+        schema = generate_schema_from_dataframe(df=df, table_name="text_to_sql_temp")
+      else:
+        df = self.load_and_prepare_data(file_path=file_path)
+        schema = self.create_table_and_schema(df=df)
+        
+      results, query_result = self.generate_and_execute_sql_query(user_prompt=user_prompt, schema=schema)
+      json_str = self.validate_and_format_results(df=df, results=results, query_result=query_result)
+      return json_str
+    
+    except SQLGuardrailError as e:
+      print(f"SQL query rejected by guardrail: {e}")
+      self.last_error = e.to_dict()
+      empty_json_str = "[]"
+      return empty_json_str
+          
+    except Exception as e:
+      print(f"Error extracting data: {e}")
+      self.last_error = {"reason": "error", "message": str(e) or type(e).__name__, "query": None, "details": None}
+      empty_json_str = "[]"
+      return empty_json_str
+    
+    finally:
+      if lease_id:
+        self.release_dataset_lease(lease_id=lease_id)
+    
+  def extract_data_from_files_with_prompt(self, file_paths: List[str], user_prompt: str) -> str:
+    """
+    From several related datasets, allow for user to prompt with natural language, and extract rows in the form of list of validated JSONs.
+    Each file is registered as a table named after the file (e.g. orders.csv -> orders), so that the generated query can join them.
+    With a DatasetCatalog, each file gets its own table in the catalog (e.g. orders_1a2b3c4d), leased while it is queried, so files of concurrent requests don't overwrite each other.
+
+    Parameters:
+    file_paths (List[str]): File paths for given datasets
+    user_prompt (str): Natural language prompt from the user that will be used to generate query
     
     Returns:
     str: JSON string with extracted data
     """ 
  
+    self.last_error = None
+    lease_ids = []
+    
     try:
-      df = self.load_and_prepare_data(file_path=file_path)
-      schema = self.create_table_and_schema(df=df)
-      results = self.generate_and_execute_sql_query(user_prompt=user_prompt, schema=schema)
-      json_str = self.validate_and_format_results(df=df, results=results)
+      # Files with the same name (e.g. 2023/orders.csv and 2024/orders.csv) would get the same table
+      table_names = [table_name_from_file_path(file_path) for file_path in file_paths]
+      duplicates = sorted({table_name for table_name in table_names if table_names.count(table_name) > 1})
+      if duplicates:
+        raise ValueError(f"Several files have the same table name: {', '.join(duplicates)}. Rename the files so their names are unique.")
+      
+      if self.catalog:
+        for file_path in file_paths:
+          lease_ids.append(self.acquire_dataset_lease(file_path=file_path))
+        dfs, schema = self.load_datasets_with_catalog(file_paths=file_paths)
+      else:
+        dfs = {table_name: self.load_and_prepare_data(file_path=file_path) for table_name, file_path in zip(table_names, file_paths)}
+        schema = self.create_tables_and_schema(dfs=dfs)
+        
+      results, query_result = self.generate_and_execute_sql_query(user_prompt=user_prompt, schema=schema)
+      
+      # Validate against the columns of all tables (first occurrence wins for shared column names)
+      combined_df = pd.concat([df.head(0) for df in dfs.values()], axis=1)
+      combined_df = combined_df.loc[:, ~combined_df.columns.duplicated()]
+      json_str = self.validate_and_format_results(df=combined_df, results=results, query_result=query_result)
       return json_str
+    
+    except SQLGuardrailError as e:
+      print(f"SQL query rejected by guardrail: {e}")
+      self.last_error = e.to_dict()
+      empty_json_str = "[]"
+      return empty_json_str
           
     except Exception as e:
       print(f"Error extracting data: {e}")
+      self.last_error = {"reason": "error", "message": str(e) or type(e).__name__, "query": None, "details": None}
       empty_json_str = "[]"
       return empty_json_str
     
+    finally:
+      for lease_id in lease_ids:
+        self.release_dataset_lease(lease_id=lease_id)
+    
   ### Functions below are all helper functions for extract_data_from_file_with_prompt().
     
   def load_and_prepare_data(self, file_path: str) -> pd.DataFrame:
@@ -73,12 +222,13 @@ class TextToSQL:
       print(f"Error loading data with DataLoader: {e}")
       raise
     
-  def create_table_and_schema(self, df: pd.DataFrame) -> str:
+  def create_table_and_schema(self, df: pd.DataFrame, table_name: str = "text_to_sql_temp") -> str:
     """
     Creates a temporary SQL table using the SQLDatabaseConnector and the schema of the table in a string
     
     Parameters:
     df (pd.DataFrame): Pandas dataframe to create table
+    table_name (str): Name of SQL table. Optional
     
     Returns:
     str: Schema of the table  
@@ -88,7 +238,6 @@ class TextToSQL:
       with self.database_connector as db:
       
         # Create a temporary table for the dataframe
-        table_name = "text_to_sql_temp"
         db.create_table_from_df(df=df, table_name=table_name)
         
         # Generate a schema for the table
@@ -100,34 +249,363 @@ class TextToSQL:
       print(f"Error creating table and generating schema with SQLDatabaseConnector: {e}")
       raise
     
-  def generate_and_execute_sql_query(self, user_prompt: str, schema: str):
+  def load_dataset_with_catalog(self, file_path: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Gets the table of a file from the DatasetCatalog, or (re)creates it if the file is new or changed.
+    Then, evicts the least recently used tables (except the ones in use) if the database is too large, and runs the scheduled maintenance.
+    
+    Parameters:
+    file_path (str): File path for given dataset
+    
+    Returns:
+    Tuple[pd.DataFrame, str]: Dataframe with the columns and data types of the table (empty if the table was reused), and schema of the table
+    """
+    
+    dataset_id = dataset_id_for_file(file_path)
+    fingerprint = fingerprint_source(file_path)
+    
+    try:
+      with self.database_connector as db:
+        dataset = self.catalog.get_dataset(dataset_id=dataset_id, fingerprint=fingerprint, database_connector=db)
+        
+      if dataset:
+        df = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dataset["dtypes"].items()})
+        return df, dataset["schema"]
+      
+      # Each dataset has its own table, so datasets don't overwrite each other
+      table_name = f"{table_name_from_file_path(file_path)}_{dataset_id[:8]}"
+      
+      if self.incremental and delimiter_for_file(file_path):
+        df = self.ingest_file_incrementally(file_path=file_path, table_name=table_name)
+        schema = generate_schema_from_dataframe(df=df, table_name=table_name)
+        with self.database_connector as db:
+          statistics = db.load_ingestion_state(table_name=table_name)["statistics"]
+      else:
+        df = self.load_and_prepare_data(file_path=file_path)
+        schema = self.create_table_and_schema(df=df, table_name=table_name)
+        statistics = compute_column_statistics(df)
+      
+      with self.database_connector as db:
+        dtypes = {col: dtype.name for col, dtype in df.dtypes.items()}
+        self.catalog.register_dataset(dataset_id=dataset_id, table_name=table_name, schema=schema, dtypes=dtypes, statistics=statistics, fingerprint=fingerprint, database_connector=db)
+        self.catalog.evict_cold_datasets(database_connector=db, keep=[dataset_id])
+        self.catalog.run_maintenance(database_connector=db)
+        
+      return df, schema
+      
+    except Exception as e:
+      print(f"Error loading dataset with DatasetCatalog: {e}")
+      raise
+    
+  def load_datasets_with_catalog(self, file_paths: List[str]) -> Tuple[Dict[str, pd.DataFrame], str]:
+    """
+    Gets the tables of several files from the DatasetCatalog, (re)creating the ones that are new or changed, and a combined schema with join hints in a string.
+    Candidate foreign keys are detected from the key columns (id and *_id) read from the tables, as reused tables aren't loaded.
+    
+    Parameters:
+    file_paths (List[str]): File paths for given datasets, with unique table names
+    
+    Returns:
+    Tuple[Dict[str, pd.DataFrame], str]: Dataframes with the columns and data types of the tables by table name in the catalog, and schema of all tables
+    """
+    
+    dfs = {}
+    key_dfs = {}
+    catalog_table_names = {}
+    
+    try:
+      for file_path in file_paths:
+        df, schema = self.load_dataset_with_catalog(file_path=file_path)
+        table_name = next(iter(parse_schema(schema)))
+        dfs[table_name] = df.head(0)
+        
+        # Foreign keys are matched by the table names of the files (e.g. customer_id -> customers.id), not the ones in the catalog
+        file_table_name = table_name_from_file_path(file_path)
+        catalog_table_names[file_table_name] = table_name
+        key_columns = [col for col in df.columns if col == 'id' or col.endswith('_id')]
+        
+        if key_columns:
+          with self.database_connector as db:
+            key_rows = db.execute_sql_query(f"SELECT {', '.join(quote_identifier(col) for col in key_columns)} FROM {quote_identifier(table_name)}")
+          key_dfs[file_table_name] = pd.DataFrame(key_rows, columns=key_columns)
+        else:
+          key_dfs[file_table_name] = df.head(0)
+      
+      foreign_keys = detect_foreign_keys(dfs=key_dfs)
+      for fk in foreign_keys:
+        fk["table"], fk["ref_table"] = catalog_table_names[fk["table"]], catalog_table_names[fk["ref_table"]]
+        
+      schema = generate_schema_from_dataframes(dfs=dfs, foreign_keys=foreign_keys)
+      return dfs, schema
+      
+    except Exception as e:
+      print(f"Error loading datasets with DatasetCatalog: {e}")
+      raise
+    
+  def acquire_dataset_lease(self, file_path: str) -> str:
+    """
+    Mark the dataset of a file as in use in the DatasetCatalog, so that its table isn't evicted until the lease is released.
+    
+    Parameters:
+    file_path (str): File path for given dataset
+    
+    Returns:
+    str: Lease identifier, to give back with release_dataset_lease
+    """
+    
+    with self.database_connector as db:
+      return self.catalog.acquire_lease(dataset_id=dataset_id_for_file(file_path), database_connector=db)
+    
+  def release_dataset_lease(self, lease_id: str) -> None:
+    """
+    Release the lease of a dataset in the DatasetCatalog.
+    
+    Parameters:
+    lease_id (str): Lease identifier returned by acquire_dataset_lease
+    """
+    
+    try:
+      with self.database_connector as db:
+        self.catalog.release_lease(lease_id=lease_id, database_connector=db)
+        
+    except Exception as e:
+      # The lease expires anyway
+      print(f"Error releasing dataset lease: {e}")
+    
+  def ingest_file_incrementally(self, file_path: str, table_name: str = "text_to_sql_temp") -> pd.DataFrame:
+    """
+    Ingests an append-only CSV/TSV file into a SQL table using the SQLDatabaseConnector.
+    If the file only grew since the last ingestion, only the new rows are parsed and appended, and the stored column statistics are updated.
+    Otherwise (first call, different file, rewritten or truncated file, incompatible data types), the table is fully rebuilt.
+    
+    Parameters:
+    file_path (str): File path for given dataset (.csv or .tsv file)
+    table_name (str): Name of SQL table. Optional
+    
+    Returns:
+    pd.DataFrame: Empty dataframe with the columns and data types of the table
+    """
+    
+    sep = delimiter_for_file(file_path)
+    
+    try:
+      with self.database_connector as db:
+        state = db.load_ingestion_state(table_name=table_name)
+        
+        # Only reuse the state if the same file was only appended to
+        if state and (state["file_path"] != os.path.abspath(file_path) or not is_append_only(file_path=file_path, state=state)):
+          print(f"File {file_path} changed since last ingestion. Rebuilding table {table_name}...")
+          state = None
+        
+        if state and os.path.getsize(file_path) > state["offset"]:
+          try:
+            # New rows are read with the data types of the table, instead of inferring them again from a few rows
+            df, offset, ends_mid_line = read_rows_from_offset(file_path=file_path, offset=state["offset"], sep=sep, dtypes=state["dtypes"], fill_na=not getattr(self.data_loader, "compact", False))
+            
+          except (ValueError, TypeError) as e:
+            print(f"New rows don't match data types of table {table_name}: {e}. Rebuilding table...")
+            state = None
+            
+          if state and not df.empty:
+            db.append_df_to_table(df=df, table_name=table_name)
+            state["row_count"] += len(df)
+            state["statistics"] = merge_column_statistics(statistics=state["statistics"], new_statistics=compute_column_statistics(df))
+            
+          if state:
+            state["offset"] = offset
+            state["ends_mid_line"] = ends_mid_line
+            state.update(fingerprint_file(file_path=file_path, offset=offset))
+            
+        elif state:
+          print(f"No new rows in {file_path}.")
+        
+        if state is None:
+          # Full ingestion of the file with the DataLoader, as in a normal load. The file is loaded again if it grew meanwhile, so the offset matches the rows
+          for _ in range(FULL_LOAD_ATTEMPTS):
+            offset = os.path.getsize(file_path)
+            df = self.load_and_prepare_data(file_path=file_path)
+            if os.path.getsize(file_path) == offset:
+              break
+            
+          db.create_table_from_df(df=df, table_name=table_name)
+          state = {
+            "file_path": os.path.abspath(file_path),
+            "offset": offset,
+            "ends_mid_line": ends_without_newline(file_path=file_path, offset=offset),
+            "row_count": len(df),
+            "dtypes": {col: dtype.name for col, dtype in df.dtypes.items()},
+            "statistics": compute_column_statistics(df),
+            **fingerprint_file(file_path=file_path, offset=offset),
+          }
+        
+        db.save_ingestion_state(table_name=table_name, state=state)
+        print(f"Table {table_name} has {state['row_count']} rows ingested from {file_path}.")
+        
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in state["dtypes"].items()})
+      
+    except Exception as e:
+      print(f"Error ingesting file incrementally with SQLDatabaseConnector: {e}")
+      raise
+    
+  def create_tables_and_schema(self, dfs: Dict[str, pd.DataFrame]) -> str:
+    """
+    Creates one SQL table per dataframe using the SQLDatabaseConnector, and a combined schema with join hints in a string
+    
+    Parameters:
+    dfs (Dict[str, pd.DataFrame]): Pandas dataframes by table name
+    
+    Returns:
+    str: Schema of all tables, with the candidate foreign keys as join hints
+    """
+    
+    try:
+      with self.database_connector as db:
+      
+        # Create a table for each dataframe
+        for table_name, df in dfs.items():
+          db.create_table_from_df(df=df, table_name=table_name)
+        
+        # Detect candidate foreign keys and generate the combined schema
+        foreign_keys = detect_foreign_keys(dfs=dfs)
+        schema = generate_schema_from_dataframes(dfs=dfs, foreign_keys=foreign_keys)
+        
+        return schema
+      
+    except Exception as e:
+      print(f"Error creating tables and generating schema with SQLDatabaseConnector: {e}")
+      raise
+    
+  def generate_and_execute_sql_query(self, user_prompt: str, schema: str) -> Tuple[List[Dict], SQLQueryResult]:
     """
     Generates the SQL query using the LLMProvider.
     Then, runs SQL query using the SQLDatabaseConnector and return result as a list of dictionaries.
+    If the query fails or returns no rows, the error and the query are sent back to the LLMProvider to be fixed, within max_repair_attempts and repair_time_budget.
     
     Parameters:
     user_prompt (str): Natural language prompt to query the dataset.
     schema (str): Table schema for the SQL query
 
     Returns:
-    List[Dict]: Result of the SQL query
+    Tuple[List[Dict], SQLQueryResult]: Result of the SQL query, and the query that produced it (with its referenced columns and whether it aggregates rows, if the LLMProvider returned them)
     """
     try:
+      start = time.monotonic()
+      
       # Send the prompt and schema to the LLM using the LLMProvider to generate the SQL query
-      query = self.llm_provider.generate_sql_query(user_prompt=user_prompt, schema=schema)
+      query_result = to_sql_query_result(self.llm_provider.generate_sql_query(user_prompt=user_prompt, schema=schema))
+      query = query_result.sql
+      failed_queries = []
+      attempts = 0
+      empty_result_repair = False
       
       with self.database_connector as db:
-      
-        # Query the database
-        results = db.execute_sql_query(query)
         
-        return results
+        while True:
+          # Use the known fix if this query already failed before
+          if (schema, query) in self.repair_cache:
+            print("Using cached repair of SQL query.")
+            self.repair_cache.move_to_end((schema, query))
+            failed_queries.append(query)
+            query_result = self.repair_cache[(schema, query)]
+            query = query_result.sql
+            self.metrics["repair_cache_hits"] += 1
+          
+          attempts += 1
+          results, error = None, None
+          
+          try:
+            results = self.execute_sql_query(query=query, db=db)
+            if not results and self.repair_empty_results:
+              error = "The query returned no rows. Check the filters (e.g. exact values, letter case) against the schema."
+              
+          except Exception as e:
+            error = str(e) or type(e).__name__
+            last_exception = e
+          
+          if error is None:
+            # Remember the fix of every query that failed on the way, and store the query as a few-shot example if it returned rows.
+            # A repair of a query that returned no rows may have dropped a correct filter, so it isn't trusted
+            if not empty_result_repair:
+              for failed_query in failed_queries:
+                self.cache_repair(schema=schema, failed_query=failed_query, query_result=query_result)
+                
+              if self.example_store and results:
+                self.example_store.add_example(user_prompt=user_prompt, sql_query=query, schema=schema)
+            break
+          
+          # Stop when the round-trip or latency budget is spent
+          remaining = self.repair_time_budget - (time.monotonic() - start)
+          if attempts > self.max_repair_attempts or remaining <= 0:
+            if failed_queries:
+              self.metrics["failed_repairs"] += 1
+            print(f"SQL query not repaired after {attempts} attempt(s) and {time.monotonic() - start:.1f} seconds.")
+            if results is None:
+              raise last_exception
+            break
+          
+          print(f"SQL query failed ({error}). Sending it back to the LLM to be fixed...")
+          failed_queries.append(query)
+          empty_result_repair = empty_result_repair or results is not None
+          
+          # The repair gets the remaining time as a timeout, and is abandoned if it takes longer
+          future = self.repair_executor.submit(self.llm_provider.repair_sql_query, user_prompt=user_prompt, schema=schema, query=query, error=error, timeout=remaining)
+          try:
+            query_result = to_sql_query_result(future.result(timeout=remaining))
+            query = query_result.sql
+          except TimeoutError:
+            self.metrics["failed_repairs"] += 1
+            print(f"SQL query repair abandoned after {time.monotonic() - start:.1f} seconds.")
+            if results is None:
+              raise last_exception
+            break
+          
+          self.metrics["repairs"] += 1
+          
+      self.metrics["queries"] += 1
+      self.metrics["attempts"] += attempts
+      return results, query_result
 
     except Exception as e:
       print(f"Error generating or executing query: {e}")
       raise
   
-  def validate_and_format_results(self, df: pd.DataFrame, results: list) -> str:
+  def execute_sql_query(self, query: str, db: SQLDatabaseConnector) -> List[Dict]:
+    """
+    Runs SQL query on a connected database, through the SQLGuardrail if there is one.
+    
+    Parameters:
+    query (str): SQL query to be executed.
+    db (SQLDatabaseConnector): Connected database
+
+    Returns:
+    List[Dict]: Result of the SQL query
+    """
+    
+    if self.sql_guardrail:
+      return self.sql_guardrail.execute_query(query=query, database_connector=db)
+    
+    return db.execute_sql_query(query)
+    
+  def cache_repair(self, schema: str, failed_query: str, query_result: SQLQueryResult) -> None:
+    """
+    Store the fixed version of a SQL query that failed, evicting the least recently used repair when the cache is full.
+    
+    Parameters:
+    schema (str): Table schema for the SQL query
+    failed_query (str): SQL query that failed
+    query_result (SQLQueryResult): Fixed SQL query
+    """
+    
+    if failed_query == query_result.sql:
+      return
+    
+    self.repair_cache[(schema, failed_query)] = query_result
+    self.repair_cache.move_to_end((schema, failed_query))
+    
+    if len(self.repair_cache) > REPAIR_CACHE_SIZE:
+      self.repair_cache.popitem(last=False)
+    
+  def validate_and_format_results(self, df: pd.DataFrame, results: list, query_result: Optional[SQLQueryResult] = None) -> str:
     """
     Create a data validation model based on provided dataframe using the DataValidator.
     Then, validates data based on provided model type.
@@ -135,13 +613,36 @@ class TextToSQL:
     Parameters:
     df (pd.DataFrame): Dataframe to create the Pydantic model from
     results (list): List with output from the SQL query
+    query_result (Optional[SQLQueryResult]): SQL query that produced the results. If it has referenced columns that cover the columns of the results, only those are validated, and if it aggregates rows, the model is created from the results. Optional
 
     Returns:
     str: JSON string with extracted data
     """
     try:
-      # Create Pydantic model to validate results
-      pydantic_model = self.data_validator.create_model_from_df(df)
+      # Create Pydantic model to validate results. Aggregated values (e.g. COUNT(*) AS total) are not columns of the dataframe
+      result_columns = {column.lower() for column in results[0]} if results else set()
+      df_columns = {column.lower() for column in df.columns}
+      
+      if query_result and query_result.expects_aggregate or not result_columns <= df_columns:
+        model_df = pd.DataFrame(results)
+      elif query_result and query_result.referenced_columns:
+        # The referenced columns listed by the LLM can be incomplete (e.g. SELECT *): columns of the results they don't cover are validated too
+        referenced_columns = {column.split('.')[-1].lower() for column in query_result.referenced_columns}
+        if result_columns and not result_columns <= referenced_columns:
+          referenced_columns = result_columns
+        elif result_columns:
+          referenced_columns &= result_columns
+        model_df = df[[column for column in df.columns if column.lower() in referenced_columns]]
+      elif result_columns:
+        # Columns that aren't selected are not added to the results
+        model_df = df[[column for column in df.columns if column.lower() in result_columns]]
+      else:
+        model_df = df
+        
+      if model_df.columns.empty:
+        model_df = df
+        
+      pydantic_model = self.data_validator.create_model_from_df(model_df)
       validated_results = self.data_validator.validate(json.dumps(results), pydantic_model)
     
       # Convert validated output to a JSON string
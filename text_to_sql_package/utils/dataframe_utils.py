@@ -1,12 +1,21 @@
 import pandas as pd
 import re
+import importlib.util
+from typing import Dict, List
 
-def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+# Max share of distinct values for a text column to be stored as category in compact mode
+CATEGORY_MAX_RATIO = 0.5
+
+# Text columns with many distinct values are stored as Arrow-backed strings in compact mode, or Python-backed ones if pyarrow isn't installed
+COMPACT_STRING_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'string'
+
+def clean_dataframe(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
   """
   Basic data cleaning for a Pandas dataframe.
   
   Parameters: 
   df (pd.DataFrame): Pandas dataframe to clean
+  compact (bool): If True, data types are inferred with compact_dataframe (smallest types, nullable types instead of filled null values). Optional
   
   Returns: 
   pd.DataFrame: Clean dataframe
@@ -24,6 +33,9 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     print(f"Error cleaning dataframe column names: {e}")
     raise
   
+  if compact:
+    return compact_dataframe(df)
+  
   try:
     # Remove leading/trailing whitespace from strings
     df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
@@ -102,6 +114,111 @@ def infer_data_types(df: pd.DataFrame) -> pd.DataFrame:
     
   return df
 
+def compact_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+  """
+  Infer memory-compact data types of a Pandas dataframe: downcast numbers, category or Arrow-backed strings for text,
+  and nullable types instead of filling null values. The memory used by each column before and after is printed,
+  and stored in df.attrs["memory_report"].
+  
+  Parameters: 
+  df (pd.DataFrame): Pandas dataframe with clean column names
+  
+  Returns: 
+  pd.DataFrame: Dataframe with compact data types
+  """
+  
+  dtypes_before = df.dtypes
+  memory_before = df.memory_usage(deep=True, index=False)
+  
+  for col in df.columns:
+    try:
+      df[col] = compact_column(df[col])
+      
+    except Exception as e:
+      print(f"Error compacting column {col}: {e}")
+      raise
+  
+  memory_after = df.memory_usage(deep=True, index=False)
+  
+  report = {
+    col: {"dtype_before": dtypes_before[col].name, "dtype_after": df[col].dtype.name, "bytes_before": int(memory_before[col]), "bytes_after": int(memory_after[col])}
+    for col in df.columns
+  }
+  df.attrs["memory_report"] = report
+  
+  print("Dataframe memory usage by column (before -> after):")
+  for col, usage in report.items():
+    print(f"  {col}: {usage['dtype_before']} {usage['bytes_before']} bytes -> {usage['dtype_after']} {usage['bytes_after']} bytes")
+  print(f"Dataframe memory usage: {int(memory_before.sum())} bytes -> {int(memory_after.sum())} bytes.")
+  
+  return df
+
+def compact_column(series: pd.Series) -> pd.Series:
+  """
+  Infer the most compact data type of a column, in the same order as infer_data_types (numeric, datetime, boolean, then text).
+  
+  Parameters: 
+  series (pd.Series): Column to convert
+  
+  Returns: 
+  pd.Series: Converted column
+  """
+  
+  # Remove leading/trailing whitespace from strings, without converting other values
+  if pd.api.types.is_string_dtype(series) or series.dtype == object:
+    try:
+      stripped = series.str.strip()
+      series = stripped.where(stripped.notna() | series.isna(), series)
+    except AttributeError:
+      # Object columns without any string
+      pass
+  
+  # True/False values read by Pandas are an object column if some are missing, and would be converted to numbers.
+  # They get the same type as true/false strings (e.g. read by pyarrow or polars)
+  values = series.dropna()
+  if not values.empty and (pd.api.types.is_bool_dtype(series) or values.map(pd.api.types.is_bool).all()):
+    return series.astype('boolean')
+  
+  try:
+    series = pd.to_numeric(series)
+    
+    if pd.api.types.is_integer_dtype(series):
+      return pd.to_numeric(series, downcast='integer')
+    
+    values = series.dropna()
+    
+    # Integer columns with null values are read as floats: use a nullable integer type instead
+    if series.hasnans and not values.empty and (values % 1 == 0).all():
+      return pd.to_numeric(series.astype('Int64'), downcast='integer')
+    
+    # Only downcast floats that don't lose precision
+    if pd.api.types.is_float_dtype(series) and (values.astype('float32').astype(series.dtype) == values).all():
+      return series.astype('float32')
+    
+    return series
+  
+  except (ValueError, TypeError) as e:
+    pass
+  
+  try:
+    return pd.to_datetime(series, format='%Y-%m-%d %H:%M:%S')
+  
+  except (ValueError, TypeError) as e:
+    pass
+  
+  values = series.dropna()
+  lowered = values.astype(str).str.strip().str.lower()
+  
+  if lowered.isin(['true', 'false']).all():
+    return (lowered == 'true').reindex(series.index).astype('boolean')
+  
+  # Low-cardinality text is stored once per distinct value
+  series = series.astype(COMPACT_STRING_DTYPE)
+  if len(values) and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+    return series.astype('category')
+  
+  return series
+
 def fill_na_by_dtype(df: pd.DataFrame) -> pd.DataFrame:
   """
   Fill null values depending on the data type
@@ -142,7 +259,7 @@ def fill_na_by_dtype(df: pd.DataFrame) -> pd.DataFrame:
 
 def generate_schema_from_dataframe(df: pd.DataFrame, table_name: str) -> str:
   """
-  Generate a schema from a Pandas dataframe. 
+  Generate a schema from a Pandas dataframe. Identifiers are quoted, as table and column names can be SQL keywords (e.g. order.csv -> order).
   
   Parameters: 
   df (pd.DataFrame): Pandas dataframe to generate schema from 
@@ -156,26 +273,146 @@ def generate_schema_from_dataframe(df: pd.DataFrame, table_name: str) -> str:
   
   #Iterate through the data types in the dataframe and add to list
   for col, dtype in df.dtypes.items(): 
-    dtype_str = dtype.name.lower()
-    
-    # Map to a SQL type
-    # Note: Using startswith because Pandas can have int32, int64, datetime64[ns], etc. 
-    if dtype_str.startswith('int'):
-      sql_type = 'INTEGER'
-    elif dtype_str.startswith('float'):
-      sql_type = 'REAL'
-    elif dtype_str.startswith('bool'):
-      sql_type = 'BOOLEAN'
-    elif dtype_str.startswith('datetime'):
-      sql_type = 'DATETIME'
-    elif dtype_str.startswith('date'):
-      sql_type = 'DATE'
-    else:
-      sql_type = 'TEXT'
-    
-    col_types.append(f'{col.lower()} {sql_type}')
+    col_types.append(f'{quote_identifier(col.lower())} {sql_type_for_dtype(dtype)}')
   
   #Create a string from the list that represents the schema
-  schema = f"CREATE TABLE {table_name} ({', '.join(col_types)});"
+  schema = f"CREATE TABLE {quote_identifier(table_name)} ({', '.join(col_types)});"
   print(f"Schema inferred from dataframe: {schema}")
-  return schema
\ No newline at end of file
+  return schema
+
+def quote_identifier(name: str) -> str:
+  """
+  Quote a SQL identifier (table or column name).
+  
+  Parameters: 
+  name (str): Table or column name
+  
+  Returns: 
+  str: Quoted identifier
+  """
+  
+  return '"' + name.replace('"', '""') + '"'
+
+def sql_type_for_dtype(dtype) -> str:
+  """
+  Map a Pandas data type to a SQL type.
+  
+  Parameters: 
+  dtype: Pandas data type (numpy, nullable or category)
+  
+  Returns: 
+  str: SQL type
+  """
+  
+  # Categories are stored as their values
+  if isinstance(dtype, pd.CategoricalDtype):
+    dtype = dtype.categories.dtype
+  
+  dtype_str = dtype.name.lower()
+  
+  # Note: Using startswith because Pandas can have int32, int64, datetime64[ns], nullable Int8, etc. 
+  if dtype_str.startswith('int'):
+    return 'INTEGER'
+  elif dtype_str.startswith('float'):
+    return 'REAL'
+  elif dtype_str.startswith('bool'):
+    return 'BOOLEAN'
+  elif dtype_str.startswith('datetime'):
+    return 'DATETIME'
+  elif dtype_str.startswith('date'):
+    return 'DATE'
+  else:
+    return 'TEXT'
+
+def detect_foreign_keys(dfs: Dict[str, pd.DataFrame], min_overlap: float = 0.9) -> List[Dict]:
+  """
+  Detect candidate foreign keys between several dataframes, using column names and value overlap.
+  A column is a candidate if its name matches a column of another table (e.g. customer_id -> customers.customer_id or customers.id),
+  the referenced column has unique values, and most of its values are found in the referenced column.
+  
+  Parameters: 
+  dfs (Dict[str, pd.DataFrame]): Dataframes by table name
+  min_overlap (float): Minimum share of distinct values that must be found in the referenced column. Optional
+  
+  Returns: 
+  List[Dict]: Candidate foreign keys with keys table, column, ref_table, ref_column and overlap
+  """
+  
+  foreign_keys = []
+  
+  for table, df in dfs.items():
+    for ref_table, ref_df in dfs.items():
+      if table == ref_table:
+        continue
+      
+      # Singular form of the referenced table name (e.g. customers -> customer)
+      ref_singular = ref_table[:-1] if ref_table.endswith('s') else ref_table
+      
+      for col in df.columns:
+        for ref_col in ref_df.columns:
+          
+          # Check if the column names suggest a relationship
+          # Surrogate keys (id) of two tables are never related, only named keys (e.g. customer_id, not paid) are matched by name
+          same_key = col == ref_col and col.endswith('_id')
+          prefixed_key = ref_col == 'id' and col in (f'{ref_singular}_id', f'{ref_table}_id')
+          if not (same_key or prefixed_key):
+            continue
+          
+          # Referenced column must be a candidate key
+          ref_values = ref_df[ref_col].dropna()
+          if ref_values.empty or not ref_values.is_unique:
+            continue
+          
+          # Share of distinct values found in the referenced column
+          values = pd.Series(df[col].dropna().unique())
+          if values.empty:
+            continue
+          
+          overlap = float(values.isin(ref_values).mean())
+          if overlap >= min_overlap:
+            foreign_keys.append({"table": table, "column": col, "ref_table": ref_table, "ref_column": ref_col, "overlap": round(overlap, 2)})
+  
+  print(f"Candidate foreign keys detected: {foreign_keys}")
+  return foreign_keys
+
+def generate_schema_from_dataframes(dfs: Dict[str, pd.DataFrame], foreign_keys: List[Dict]) -> str:
+  """
+  Generate a combined schema for several Pandas dataframes, with join hints for the detected foreign keys.
+  
+  Parameters: 
+  dfs (Dict[str, pd.DataFrame]): Dataframes by table name
+  foreign_keys (List[Dict]): Candidate foreign keys, as returned by detect_foreign_keys()
+  
+  Returns: 
+  str: String representing the schema of all tables
+  """
+  
+  # One CREATE TABLE statement per table
+  lines = [generate_schema_from_dataframe(df=df, table_name=table_name) for table_name, df in dfs.items()]
+  
+  # Add the join hints as SQL comments
+  for fk in foreign_keys:
+    lines.append(f"-- JOIN {quote_identifier(fk['table'])}.{quote_identifier(fk['column'])} = {quote_identifier(fk['ref_table'])}.{quote_identifier(fk['ref_column'])} ({fk['overlap']:.0%} of values match)")
+  
+  schema = '\n'.join(lines)
+  print(f"Combined schema inferred from dataframes: {schema}")
+  return schema
+
+def parse_schema(schema: str) -> Dict[str, Dict[str, str]]:
+  """
+  Parse a schema generated by generate_schema_from_dataframe() or generate_schema_from_dataframes(). 
+  
+  Parameters: 
+  schema (str): String representing the schema of one or more tables
+  
+  Returns: 
+  Dict[str, Dict[str, str]]: SQL type by column name, by table name
+  """
+  
+  tables = {}
+  
+  # Identifiers are quoted, except in schemas stored before they were
+  for table_name, columns in re.findall(r'CREATE TABLE "?(\w+)"? \((.*?)\);', schema):
+    tables[table_name] = {col.strip('"'): sql_type for col, sql_type in (col.rsplit(' ', 1) for col in columns.split(', ') if col)}
+    
+  return tables
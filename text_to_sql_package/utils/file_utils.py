@@ -1,5 +1,7 @@
 import os
+import re
 import json
+import hashlib
 
 def check_file_exists(file_path: str):
   """
@@ -42,6 +44,44 @@ def replace_file_type_with_json(file_path: str):
   path, file_type = os.path.splitext(file_path)
   return f"{path}.json"
   
+def table_name_from_file_path(file_path: str) -> str:
+  """
+  Creates a SQL table name from the file name, without the file type.
+  
+  Parameters:
+  file_path (str): File path to given dataset (e.g. /docs/Orders 2024.csv)
+  
+  Returns:
+  str: Table name (e.g. orders_2024)
+  """
+  
+  file_name, file_type = os.path.splitext(os.path.basename(file_path))
+  
+  # Compressed files have two file types (e.g. orders.csv.gz)
+  if file_type.lower() in ('.gz', '.zst'):
+    file_name, file_type = os.path.splitext(file_name)
+    
+  table_name = re.sub(r'[^A-Z0-9_]+', '_', file_name, flags=re.IGNORECASE).strip('_').lower()
+  
+  # Table names can't start with a digit
+  if not table_name or table_name[0].isdigit():
+    table_name = f"t_{table_name}"
+    
+  return table_name
+
+def dataset_id_for_file(file_path: str) -> str:
+  """
+  Creates a dataset identifier from the absolute file path, so the same file always maps to the same dataset.
+  
+  Parameters:
+  file_path (str): File path to given dataset
+  
+  Returns:
+  str: Dataset identifier (16 hexadecimal characters)
+  """
+  
+  return hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+
 def save_json_to_file(json_str: str, file_path: str) -> None:
   """
   Write JSON string into a file.
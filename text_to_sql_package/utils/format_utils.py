@@ -0,0 +1,124 @@
+import io
+import csv
+import gzip
+from typing import BinaryIO, Optional, Tuple
+
+# Magic bytes at the start of compressed and Excel files
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+XLSX_MAGIC = b'PK\x03\x04'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Number of bytes read to sniff the delimiter of a text file
+SNIFF_SIZE = 64 * 1024
+
+# Delimiters that are detected in text files
+DELIMITERS = ',\t;|'
+
+def sniff_compression(file_path: str) -> Optional[str]:
+  """
+  Detect the compression of a file from its first bytes.
+
+  Parameters:
+  file_path (str): File path to given dataset
+
+  Returns:
+  Optional[str]: 'gzip', 'zstd', or None if the file isn't compressed
+  """
+
+  with open(file_path, 'rb') as file:
+    magic = file.read(4)
+
+  if magic.startswith(GZIP_MAGIC):
+    return 'gzip'
+  elif magic.startswith(ZSTD_MAGIC):
+    return 'zstd'
+  else:
+    return None
+
+def open_decompressed(file_path: str, compression: Optional[str] = None) -> BinaryIO:
+  """
+  Open a file as a binary stream, decompressing it on the fly. Nothing is written to disk.
+
+  Parameters:
+  file_path (str): File path to given dataset
+  compression (Optional[str]): 'gzip', 'zstd', or None if the file isn't compressed. Optional
+
+  Returns:
+  BinaryIO: Stream with the decompressed content, to be closed by the caller
+  """
+
+  if compression == 'gzip':
+    return gzip.open(file_path, 'rb')
+
+  if compression == 'zstd':
+    # zstd is in the standard library from Python 3.14, and in the zstandard package before
+    try:
+      from compression import zstd
+      return zstd.open(file_path, 'rb')
+    except ImportError:
+      pass
+
+    try:
+      import zstandard
+    except ImportError:
+      raise ImportError("Reading .zst files needs Python 3.14+ or the zstandard package (pip install zstandard)")
+
+    # The reader closes the file when it is closed
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True))
+
+  return open(file_path, 'rb')
+
+def sniff_delimiter(sample: bytes, default: str = ',') -> str:
+  """
+  Detect the delimiter of a text file from a sample of its content.
+
+  Parameters:
+  sample (bytes): First bytes of the (decompressed) file
+  default (str): Delimiter used if none is detected. Optional
+
+  Returns:
+  str: Delimiter
+  """
+
+  text = sample.decode('utf-8', errors='replace')
+
+  # Only complete lines are used, since the last one may be cut
+  if '\n' in text and len(sample) >= SNIFF_SIZE:
+    text = text[:text.rindex('\n')]
+
+  try:
+    return csv.Sniffer().sniff(text, delimiters=DELIMITERS).delimiter
+  except csv.Error:
+    return default
+
+def sniff_file_format(file_path: str) -> Tuple[str, Optional[str], Optional[str]]:
+  """
+  Detect the format of a file from its content: Excel from its magic bytes, otherwise delimited text, with its compression and delimiter.
+  The file extension is only used when the content is ambiguous (e.g. a single column file).
+
+  Parameters:
+  file_path (str): File path to given dataset
+
+  Returns:
+  Tuple[str, Optional[str], Optional[str]]: Format ('excel' or 'delimited'), compression ('gzip', 'zstd' or None) and delimiter (None for Excel)
+  """
+
+  with open(file_path, 'rb') as file:
+    magic = file.read(8)
+
+  if magic.startswith(XLSX_MAGIC) or magic.startswith(XLS_MAGIC):
+    return 'excel', None, None
+
+  compression = sniff_compression(file_path)
+
+  with open_decompressed(file_path, compression) as stream:
+    sample = stream.read(SNIFF_SIZE)
+
+  # The extension before the compression one (e.g. .tsv for data.tsv.gz)
+  name = file_path.lower()
+  for extension in ('.gz', '.zst'):
+    name = name.removesuffix(extension)
+
+  delimiter = sniff_delimiter(sample, default='\t' if name.endswith('.tsv') else ',')
+  return 'delimited', compression, delimiter
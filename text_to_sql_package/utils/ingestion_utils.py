@@ -0,0 +1,295 @@
+import os
+import io
+import csv
+import hashlib
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from text_to_sql_package.utils.dataframe_utils import clean_dataframe, fill_na_by_dtype
+
+# Number of bytes before the last ingested offset used to check that the file was only appended to
+TAIL_HASH_SIZE = 4096
+
+# Max number of distinct values kept in the statistics of a column
+MAX_DISTINCT_VALUES = 50
+
+def delimiter_for_file(file_path: str) -> Optional[str]:
+  """
+  Get the delimiter for a text dataset that supports incremental ingestion.
+
+  Parameters:
+  file_path (str): File path to given dataset
+
+  Returns:
+  Optional[str]: Delimiter of the file, or None if the file type can't be ingested incrementally (e.g. Excel)
+  """
+
+  if file_path.lower().endswith('.csv'):
+    return ','
+  elif file_path.lower().endswith('.tsv'):
+    return '\t'
+  else:
+    return None
+
+def fingerprint_file(file_path: str, offset: int) -> Dict:
+  """
+  Fingerprint a file up to a byte offset: hash of the header line and hash of the bytes just before the offset.
+
+  Parameters:
+  file_path (str): File path to given dataset
+  offset (int): Byte offset up to which the file was ingested
+
+  Returns:
+  Dict: Fingerprint with keys header_hash and tail_hash
+  """
+
+  with open(file_path, 'rb') as file:
+    header = file.readline()
+
+    tail_start = max(0, offset - TAIL_HASH_SIZE)
+    file.seek(tail_start)
+    tail = file.read(offset - tail_start)
+
+  return {"header_hash": hashlib.sha256(header).hexdigest(), "tail_hash": hashlib.sha256(tail).hexdigest()}
+
+def fingerprint_source(file_path: str, sample_size: int = 65536) -> str:
+  """
+  Fingerprint a whole file from its size, modification time, and a hash of its first and last bytes, without reading all of it.
+
+  Parameters:
+  file_path (str): File path to given dataset
+  sample_size (int): Number of bytes hashed at the start and at the end of the file. Optional
+
+  Returns:
+  str: Fingerprint of the file
+  """
+
+  stat = os.stat(file_path)
+  digest = hashlib.sha256()
+
+  with open(file_path, 'rb') as file:
+    digest.update(file.read(sample_size))
+    file.seek(max(0, stat.st_size - sample_size))
+    digest.update(file.read(sample_size))
+
+  return f"{stat.st_size}-{stat.st_mtime_ns}-{digest.hexdigest()[:16]}"
+
+def read_rows_from_offset(file_path: str, offset: int, sep: str, dtypes: Optional[Dict[str, str]] = None, fill_na: bool = True) -> Tuple[pd.DataFrame, int, bool]:
+  """
+  Read the complete rows of a CSV/TSV file starting at a byte offset, and clean them.
+  A last line without a newline is kept if it has all the columns (files don't always end with a newline). Otherwise, it is left for the next call.
+  If the data types of the table are given, the rows are read as strings and converted to them, instead of inferring the types of each chunk again
+  (e.g. "00123" in a text column would be read as the number 123).
+
+  Parameters:
+  file_path (str): File path to given dataset
+  offset (int): Byte offset to start reading from (0 to read the whole file)
+  sep (str): Delimiter of the file
+  dtypes (Dict[str, str]): Data type names by column name, in the order of the columns of the file. Optional
+  fill_na (bool): If True, null values are filled as in a full load with clean_dataframe. Only used with dtypes. Optional
+
+  Returns:
+  Tuple[pd.DataFrame, int, bool]: Clean dataframe with the new rows, the byte offset up to which the file was read, and True if that offset is at the end of a line without a newline
+  """
+
+  with open(file_path, 'rb') as file:
+    header = file.readline()
+
+    if offset == 0:
+      offset = len(header)
+
+    file.seek(offset)
+    data = file.read()
+
+  # Only keep complete lines
+  end = data.rfind(b'\n') + 1
+  ends_mid_line = False
+
+  if data[end:].strip() and is_complete_row(header=header, line=data[end:], sep=sep):
+    end = len(data)
+    ends_mid_line = True
+
+  data = data[:end]
+
+  if dtypes is not None:
+    df = pd.read_csv(io.BytesIO(header + data), sep=sep, dtype=str)
+    df = cast_to_dtypes(df=df, dtypes=dtypes, fill_na=fill_na)
+    return df, offset + end, ends_mid_line
+
+  # Parse the new rows with the header, so columns are named and cleaned as in a full load
+  df = pd.read_csv(io.BytesIO(header + data), sep=sep)
+  df = clean_dataframe(df)
+
+  return df, offset + end, ends_mid_line
+
+def cast_to_dtypes(df: pd.DataFrame, dtypes: Dict[str, str], fill_na: bool = True) -> pd.DataFrame:
+  """
+  Convert a dataframe read as strings to the data types of a table, parsing values as clean_dataframe does.
+
+  Parameters:
+  df (pd.DataFrame): Pandas dataframe read as strings, with the columns of the table in the same order
+  dtypes (Dict[str, str]): Data type names by column name
+  fill_na (bool): If True, null values are filled with fill_na_by_dtype. Optional
+
+  Returns:
+  pd.DataFrame: Dataframe with the data types of the table
+
+  Raises:
+  ValueError: If the columns don't match, or a value can't be converted to the data type of its column
+  """
+
+  if len(df.columns) != len(dtypes):
+    raise ValueError(f"Expected {len(dtypes)} columns, got {len(df.columns)}")
+
+  df.columns = list(dtypes)
+
+  for col, dtype in dtypes.items():
+    values = df[col].str.strip()
+    dtype_str = dtype.lower()
+
+    if dtype_str.startswith(('int', 'uint', 'float')):
+      values = pd.to_numeric(values)
+    elif dtype_str.startswith('bool'):
+      lowered = values.dropna().str.lower()
+      if not lowered.isin(['true', 'false']).all():
+        raise ValueError(f"Column {col} has values that aren't true or false")
+      values = (lowered == 'true').reindex(values.index)
+    elif dtype_str.startswith('datetime'):
+      values = pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S')
+
+    df[col] = values.astype(dtype)
+
+  if fill_na:
+    df = fill_na_by_dtype(df)
+
+  return df
+
+def ends_without_newline(file_path: str, offset: int) -> bool:
+  """
+  Check if the byte just before an offset isn't a newline, i.e. the offset is at the end of a line without a newline.
+
+  Parameters:
+  file_path (str): File path to given dataset
+  offset (int): Byte offset
+
+  Returns:
+  bool: True if the offset is at the end of a line without a newline
+  """
+
+  if offset == 0:
+    return False
+
+  with open(file_path, 'rb') as file:
+    file.seek(offset - 1)
+    return file.read(1) != b'\n'
+
+def is_complete_row(header: bytes, line: bytes, sep: str) -> bool:
+  """
+  Check if a line without a newline has as many fields as the header, i.e. it isn't being written.
+
+  Parameters:
+  header (bytes): Header line of the file
+  line (bytes): Last line of the file
+  sep (str): Delimiter of the file
+
+  Returns:
+  bool: True if the line has all the columns
+  """
+
+  header_fields = next(csv.reader([header.decode('utf-8', errors='replace').rstrip('\r\n')], delimiter=sep), [])
+  line_fields = next(csv.reader([line.decode('utf-8', errors='replace').rstrip('\r')], delimiter=sep), [])
+  return len(line_fields) == len(header_fields)
+
+def compute_column_statistics(df: pd.DataFrame) -> Dict:
+  """
+  Compute statistics for each column of a dataframe that can be updated incrementally.
+  Numeric columns keep count, min, max and sum. Other columns keep count and their distinct values (None if there are too many).
+
+  Parameters:
+  df (pd.DataFrame): Pandas dataframe to compute statistics from
+
+  Returns:
+  Dict: Statistics by column name
+  """
+
+  statistics = {}
+
+  for col in df.columns:
+    values = df[col].dropna()
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+      statistics[col] = {
+        "count": int(values.count()),
+        "min": values.min().item() if not values.empty else None,
+        "max": values.max().item() if not values.empty else None,
+        "sum": values.sum().item(),
+      }
+    else:
+      distinct = values.astype(str).unique().tolist()
+      statistics[col] = {
+        "count": int(values.count()),
+        "values": sorted(distinct) if len(distinct) <= MAX_DISTINCT_VALUES else None,
+      }
+
+  return statistics
+
+def merge_column_statistics(statistics: Dict, new_statistics: Dict) -> Dict:
+  """
+  Merge the statistics of newly ingested rows into the stored statistics.
+
+  Parameters:
+  statistics (Dict): Stored statistics by column name
+  new_statistics (Dict): Statistics of the new rows by column name
+
+  Returns:
+  Dict: Merged statistics by column name
+  """
+
+  merged = {}
+
+  for col, new_stats in new_statistics.items():
+    stats = statistics.get(col)
+
+    if stats is None:
+      merged[col] = new_stats
+      continue
+
+    merged_stats = {"count": stats["count"] + new_stats["count"]}
+
+    if "sum" in stats and "sum" in new_stats:
+      merged_stats["min"] = min((v for v in (stats["min"], new_stats["min"]) if v is not None), default=None)
+      merged_stats["max"] = max((v for v in (stats["max"], new_stats["max"]) if v is not None), default=None)
+      merged_stats["sum"] = stats["sum"] + new_stats["sum"]
+    else:
+      values = None
+      if stats.get("values") is not None and new_stats.get("values") is not None:
+        values = sorted(set(stats["values"]) | set(new_stats["values"]))
+      merged_stats["values"] = values if values is not None and len(values) <= MAX_DISTINCT_VALUES else None
+
+    merged[col] = merged_stats
+
+  return merged
+
+def is_append_only(file_path: str, state: Dict) -> bool:
+  """
+  Check if a file was only appended to since it was last ingested.
+
+  Parameters:
+  file_path (str): File path to given dataset
+  state (Dict): Stored ingestion state, with keys offset, header_hash, tail_hash and ends_mid_line
+
+  Returns:
+  bool: True if the ingested bytes are unchanged and the file did not shrink
+  """
+
+  if os.path.getsize(file_path) < state["offset"]:
+    return False
+
+  # If the last ingested line had no newline, it was only complete if the new bytes start a new line
+  if state.get("ends_mid_line") and os.path.getsize(file_path) > state["offset"]:
+    with open(file_path, 'rb') as file:
+      file.seek(state["offset"])
+      if not file.read(2).startswith((b'\n', b'\r\n')):
+        return False
+
+  fingerprint = fingerprint_file(file_path=file_path, offset=state["offset"])
+  return fingerprint["header_hash"] == state["header_hash"] and fingerprint["tail_hash"] == state["tail_hash"]